@@ -0,0 +1,113 @@
+"""
+Time matching one days snapshot against many applicant date windows.
+
+Usage (from nextvisa-api/):
+
+    python -m benchmarks.date_match_benchmark --applicants 1000 5000 20000 --days 60 --runs 5
+
+Three ways of resolving the candidate dates of every applicant for one
+snapshot are compared:
+
+    strptime   what each monitor used to do on every tick: parse the
+               applicant's min/max dates and every days entry with strptime
+    per-window parse the snapshot once, then one DaysIndex lookup per
+               applicant with windows compiled up front
+    batch      DaysIndex.match_all over all windows, as the shared poller
+               does; applicants with the same window share one lookup
+
+Windows are drawn from --distinct-windows distinct ranges, since many
+applicants ask for the same months.
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List
+
+from lib.date_windows import CANDIDATE_DATES, DateWindow, DaysIndex
+
+
+def legacy_candidates(dates: List[dict], applicant: dict, limit: int) -> List[str]:
+    """The matcher the monitors used before windows were compiled"""
+    min_date = datetime.strptime(applicant.get('min_date'), '%Y-%m-%d')
+    max_date = datetime.strptime(applicant.get('max_date'), '%Y-%m-%d')
+    matches = []
+    for d in dates:
+        current_date = datetime.strptime(d.get('date'), '%Y-%m-%d')
+        if min_date <= current_date <= max_date:
+            matches.append(current_date)
+    return [match.strftime('%Y-%m-%d') for match in sorted(matches)[:limit]]
+
+
+def build_data(applicants: int, days: int, distinct_windows: int, seed: int):
+    rng = random.Random(seed)
+    today = date.today()
+    snapshot = sorted(
+        {(today + timedelta(days=rng.randint(1, 540))).isoformat() for _ in range(days * 2)}
+    )[:days]
+    dates = [{"date": day, "business_day": True} for day in snapshot]
+
+    ranges = []
+    for _ in range(distinct_windows):
+        start = today + timedelta(days=rng.randint(1, 360))
+        ranges.append((start.isoformat(), (start + timedelta(days=rng.randint(7, 120))).isoformat()))
+    people = {
+        i: dict(zip(("min_date", "max_date"), rng.choice(ranges)), id=i)
+        for i in range(1, applicants + 1)
+    }
+    return dates, people
+
+
+def timed(function: Callable[[], Dict[int, List[str]]], runs: int):
+    samples = []
+    result = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = function()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), result
+
+
+def run(applicants: int, days: int, distinct_windows: int, runs: int, seed: int) -> Dict[str, float]:
+    dates, people = build_data(applicants, days, distinct_windows, seed)
+    windows = {i: DateWindow.compile(applicant) for i, applicant in people.items()}
+
+    def strptime_all():
+        return {i: legacy_candidates(dates, applicant, CANDIDATE_DATES) for i, applicant in people.items()}
+
+    def per_window():
+        index = DaysIndex(dates)
+        return {i: index.candidates(window) for i, window in windows.items()}
+
+    def batch():
+        return DaysIndex(dates).match_all(windows)
+
+    legacy_seconds, expected = timed(strptime_all, runs)
+    per_window_seconds, per_window_result = timed(per_window, runs)
+    batch_seconds, batch_result = timed(batch, runs)
+    if per_window_result != expected or batch_result != expected:
+        raise AssertionError("Matchers disagree")
+
+    return {"strptime": legacy_seconds, "per-window": per_window_seconds, "batch": batch_seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--applicants", type=int, nargs="+", default=[100, 1000, 5000, 20000])
+    parser.add_argument("--days", type=int, default=60, help="Entries in the days snapshot")
+    parser.add_argument("--distinct-windows", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    methods = ("strptime", "per-window", "batch")
+    print(f"{'applicants':>10}" + "".join(f"{method + ' ms':>16}" for method in methods) + f"{'speedup':>10}")
+    for applicants in args.applicants:
+        result = run(applicants, args.days, args.distinct_windows, args.runs, args.seed)
+        row = "".join(f"{result[method] * 1000:>16.2f}" for method in methods)
+        print(f"{applicants:>10}{row}{result['strptime'] / result['batch']:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Compare page-load time and browser memory of the "default" and "lean" driver profiles.
+
+Usage (from nextvisa-api/):
+
+    python -m benchmarks.driver_profile_benchmark --hub http://localhost:4444 \
+        --url https://ais.usvisa-info.com/es-hn/niv/users/sign_in --runs 5
+
+    # Local Chrome + chromedriver instead of a hub, adds Chrome RSS (needs psutil)
+    python -m benchmarks.driver_profile_benchmark --local --url ... --runs 5
+
+Each profile gets a fresh session. Every run clears the browser cache first,
+then times driver.get() and reads the transferred bytes from the Resource
+Timing API. The JS heap comes from CDP Performance.getMetrics.
+"""
+import argparse
+import statistics
+import time
+from typing import Dict, List, Optional
+
+from selenium import webdriver
+from selenium.webdriver.chromium.remote_connection import ChromiumRemoteConnection
+
+from lib.webdriver import apply_profile, build_options
+
+PROFILES = ("default", "lean")
+
+TRANSFER_SCRIPT = """
+const entries = performance.getEntriesByType('resource').concat(performance.getEntriesByType('navigation'));
+return {
+    requests: entries.length,
+    bytes: entries.reduce((total, entry) => total + (entry.transferSize || 0), 0)
+};
+"""
+
+
+def _start(profile: str, hub: Optional[str]):
+    options = build_options(profile)
+    if hub:
+        driver = webdriver.Remote(
+            command_executor=ChromiumRemoteConnection(remote_server_addr=hub, vendor_prefix="goog", browser_name="chrome"),
+            options=options
+        )
+    else:
+        driver = webdriver.Chrome(options=options)
+    apply_profile(driver, profile)
+    return driver
+
+
+def _cdp(driver, cmd: str, params: Optional[dict] = None) -> dict:
+    return driver.execute("executeCdpCommand", {"cmd": cmd, "params": params or {}})["value"]
+
+
+def _chrome_rss_mb(driver) -> Optional[float]:
+    """Resident memory of chromedriver's Chrome process tree, local runs only"""
+    try:
+        import psutil
+    except ImportError:
+        return None
+
+    service = getattr(driver, "service", None)
+    if not service or not service.process:
+        return None
+    root = psutil.Process(service.process.pid)
+    processes = [root] + root.children(recursive=True)
+    return sum(process.memory_info().rss for process in processes) / (1024 * 1024)
+
+
+def run_profile(profile: str, url: str, runs: int, hub: Optional[str]) -> Dict[str, float]:
+    started = time.perf_counter()
+    driver = _start(profile, hub)
+    session_start = time.perf_counter() - started
+
+    load_times: List[float] = []
+    transfers: List[dict] = []
+    try:
+        for _ in range(runs):
+            _cdp(driver, "Network.clearBrowserCache")
+            driver.get("about:blank")
+            started = time.perf_counter()
+            driver.get(url)
+            load_times.append(time.perf_counter() - started)
+            transfers.append(driver.execute_script(TRANSFER_SCRIPT))
+
+        _cdp(driver, "Performance.enable")
+        metrics = {metric["name"]: metric["value"] for metric in _cdp(driver, "Performance.getMetrics")["metrics"]}
+        rss = _chrome_rss_mb(driver)
+    finally:
+        driver.quit()
+
+    return {
+        "session_start_s": session_start,
+        "load_p50_s": statistics.median(load_times),
+        "load_max_s": max(load_times),
+        "requests": statistics.median(transfer["requests"] for transfer in transfers),
+        "transferred_kb": statistics.median(transfer["bytes"] for transfer in transfers) / 1024,
+        "js_heap_mb": metrics.get("JSHeapUsedSize", 0) / (1024 * 1024),
+        "chrome_rss_mb": rss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", required=True, help="Page to load, e.g. the portal sign-in page")
+    parser.add_argument("--runs", type=int, default=5)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--hub", help="Selenium hub address")
+    target.add_argument("--local", action="store_true", help="Use a local chromedriver")
+    args = parser.parse_args()
+
+    results = {profile: run_profile(profile, args.url, args.runs, None if args.local else args.hub) for profile in PROFILES}
+
+    columns = list(results["default"].keys())
+    print(f"{'metric':<18}" + "".join(f"{profile:>12}" for profile in PROFILES))
+    for column in columns:
+        row = "".join(
+            f"{results[profile][column]:>12.2f}" if results[profile][column] is not None else f"{'n/a':>12}"
+            for profile in PROFILES
+        )
+        print(f"{column:<18}{row}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,607 @@
+"""
+Local stand-in for the visa portal, for load tests and benchmarks.
+
+Serves the pages and JSON endpoints the monitors use:
+
+    GET  /users/sign_in                                       sign-in form, redirects once signed in
+    POST /users/sign_in                                       any email with --password
+    GET  /groups/{n}                                          account page linking the schedule
+    GET  /schedule/{n}/appointment                            appointment form
+    GET  /schedule/{n}/appointment/days/{facility}.json       available dates
+    GET  /schedule/{n}/appointment/times/{facility}.json      available times of ?date=
+    POST /schedule/{n}/appointment                            booking, 200 when the slot was still free
+
+Usage (from nextvisa-api/), then point the configuration's base_url at it:
+
+    python -m benchmarks.fake_portal --port 8090 --latency-ms 150 --session-ttl 600 --pattern burst
+
+Every response is delayed by --latency-ms +/- --jitter-ms. Sessions expire
+--session-ttl seconds after login; requests with an expired session are
+redirected to the sign-in page, or answered with a 401 when
+--expiry-response is 401. The days list always holds --baseline-dates far
+away dates; the release pattern adds earlier ones between --release-from
+and --release-from + --release-days days ahead. A released date opens
+--release-slots time slots of one booking each and is withdrawn when booked
+out or after --release-hold seconds. With --validators the days list carries
+an ETag and/or Last-Modified and conditional requests get a 304 while the
+list is unchanged. --days-cache serves the days list from a cache refreshed
+that often, like a portal whose date list lags behind the live time slots:
+a booked out date stays listed with no times until the next refresh.
+--outside-share of the released dates are booked out by applicants outside
+the benchmark --outside-after seconds after release. A booking must carry an
+authenticity token issued to its session by the appointment page, like Rails
+CSRF protection. --facilities lists the facilities the appointment page
+offers; each has its own days list and releases are spread over them.
+--outage-at starts an outage that many seconds after start: for
+--outage-seconds every request is answered with --outage-status, with a
+Retry-After header when --retry-after is set. --rate-limit answers 429
+with Retry-After: 1 to every request beyond that many in the last second.
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import random
+import secrets
+import threading
+import time
+from collections import deque
+from datetime import date, timedelta
+from email.utils import formatdate, parsedate_to_datetime
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+PATTERNS = ("steady", "burst", "random", "none")
+VALIDATORS = ("none", "etag", "last-modified", "both")
+TIMES = ["07:30", "08:00", "08:30", "09:00", "09:30", "10:00"]
+SESSION_COOKIE = "_yatri_session"
+FACILITY_NAMES = {"143": "Tegucigalpa", "144": "San Pedro Sula"}
+
+SIGN_IN_PAGE = """<html><head><meta name="csrf-token" content="{token}"></head><body>
+<form id="sign_in_form" action="/users/sign_in" method="post">
+<input name="utf8" type="hidden" value="&#x2713;"><input type="hidden" name="authenticity_token" value="{token}">
+<input type="email" id="user_email" name="user[email]"><input type="password" id="user_password" name="user[password]">
+<input type="checkbox" id="policy_confirmed" name="policy_confirmed" value="1">
+<input type="submit" name="commit" value="Iniciar sesión"></form></body></html>"""
+
+GROUP_PAGE = """<html><body><a href="/schedule/{schedule}/continue_actions">Continuar</a></body></html>"""
+
+APPOINTMENT_PAGE = """<html><head><meta name="csrf-token" content="{token}"></head><body>
+<form id="appointment-form" action="/schedule/{schedule}/appointment" method="post">
+<input name="utf8" type="hidden" value="&#x2713;"><input type="hidden" name="authenticity_token" value="{token}">
+<input type="hidden" name="confirmed_limit_message" value="1">
+<input type="hidden" name="use_consulate_appointment_capacity" value="true">
+<select id="appointments_consulate_appointment_facility_id" name="appointments[consulate_appointment][facility_id]">
+{facility_options}</select>
+<input type="text" id="appointments_consulate_appointment_date" name="appointments[consulate_appointment][date]">
+<select id="appointments_consulate_appointment_time" name="appointments[consulate_appointment][time]"></select>
+<input type="submit" name="commit" value="Reprogramar"></form></body></html>"""
+
+
+class Release:
+    """One date opened by the release pattern and what happened to it"""
+
+    def __init__(self, facility: str, day: str, slots: int, released_at: float, hold: Optional[float]):
+        self.facility = facility
+        self.day = day
+        # Each time slot takes one booking
+        self.times = sorted(random.sample(TIMES, min(slots, len(TIMES))))
+        self.released_at = released_at
+        self.expires_at = released_at + hold if hold else None
+        self.first_seen_at: Optional[float] = None
+        self.bookings: List[float] = []
+
+    def open(self, now: float) -> bool:
+        return bool(self.times) and (self.expires_at is None or now < self.expires_at)
+
+
+class FakePortal:
+    """
+    In-process fake portal. ``start()`` serves it on a background thread and
+    returns its base URL; ``metrics()`` reports request counts and what
+    happened to every released date.
+    """
+
+    def __init__(self, latency: float = 0.1, jitter: float = 0.05, session_ttl: float = 1200,
+                 expiry_response: str = "redirect", pattern: str = "steady", release_every: float = 10,
+                 burst_size: int = 3, release_slots: int = 1, release_hold: Optional[float] = None,
+                 release_from_days: int = 30, release_days: int = 60, baseline_dates: int = 20,
+                 password: str = "secret", validators: str = "none", days_cache: float = 0,
+                 outside_share: float = 0, outside_after: float = 0.5, facilities: Tuple[str, ...] = ("143",),
+                 outage_at: Optional[float] = None, outage_seconds: float = 20, outage_status: int = 503,
+                 retry_after: Optional[int] = None, rate_limit: Optional[float] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.session_ttl = session_ttl
+        self.expiry_response = expiry_response
+        self.pattern = pattern
+        self.release_every = release_every
+        self.burst_size = burst_size
+        self.release_slots = release_slots
+        self.release_hold = release_hold
+        self.password = password
+        self.validators = validators
+        self.days_cache = days_cache
+        self.outside_share = outside_share
+        self.outside_after = outside_after
+        self.facilities = tuple(facilities)
+        self.outage_at = outage_at
+        self.outage_seconds = outage_seconds
+        self.outage_status = outage_status
+        self.retry_after = retry_after
+        self.rate_limit = rate_limit
+
+        today = date.today()
+        self.release_from = today + timedelta(days=release_from_days)
+        self.release_days = release_days
+        self.baseline = [(today + timedelta(days=400 + 7 * i)).isoformat() for i in range(baseline_dates)]
+
+        self._lock = threading.Lock()
+        # session id -> (expiry (monotonic), schedule number), no expiry for anonymous sessions
+        self._sessions: Dict[str, Tuple[Optional[float], Optional[int]]] = {}
+        # Latest release of each (facility, date), and every release for the metrics
+        self._releases: Dict[Tuple[str, str], Release] = {}
+        self._history: List[Release] = []
+        # session id -> authenticity tokens issued to it
+        self._tokens: Dict[str, set] = {}
+        # email -> schedule number
+        self._accounts: Dict[str, int] = {}
+        self._schedules = itertools.count(10001)
+        self._counts: Dict[str, int] = {}
+        self._connections = 0
+        # When the requests of the last second were accepted, for --rate-limit
+        self._accepted = deque()
+        # Per facility: last days list served and when it changed (epoch), for Last-Modified
+        self._days_body: Dict[str, str] = {}
+        self._days_modified: Dict[str, float] = {}
+        self._days_cached: Dict[str, List[dict]] = {}
+        self._days_cached_at: Dict[str, float] = {}
+        self._started_at = 0.0
+        self._stop = threading.Event()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    # Lifecycle
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self._server = ThreadingHTTPServer((host, port), _handler(self))
+        self._server.daemon_threads = True
+        self._started_at = time.monotonic()
+        threading.Thread(target=self._server.serve_forever, name="fake-portal", daemon=True).start()
+        threading.Thread(target=self._release_loop, name="fake-portal-releases", daemon=True).start()
+        return f"http://{host}:{self._server.server_port}"
+
+    def stop(self):
+        self._stop.set()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    # Slot releases
+
+    def release(self, count: int = 1) -> List[str]:
+        """Open ``count`` new dates now, each at a random facility; returns them"""
+        opened = []
+        now = time.monotonic()
+        with self._lock:
+            for _ in range(count):
+                facility = random.choice(self.facilities)
+                free_days = [
+                    day for day in (
+                        (self.release_from + timedelta(days=offset)).isoformat() for offset in range(self.release_days)
+                    )
+                    if (facility, day) not in self._releases or not self._releases[(facility, day)].open(now)
+                ]
+                if not free_days:
+                    break
+                day = random.choice(free_days)
+                release = Release(facility, day, self.release_slots, now, self.release_hold)
+                self._releases[(facility, day)] = release
+                self._history.append(release)
+                opened.append(day)
+                if random.random() < self.outside_share:
+                    threading.Timer(self.outside_after, self._book_outside, args=(release,)).start()
+        return opened
+
+    def _book_outside(self, release: Release):
+        """Someone outside the benchmark takes every slot of a released date"""
+        with self._lock:
+            release.times = []
+            self._counts["outside_booked"] = self._counts.get("outside_booked", 0) + 1
+
+    def _release_loop(self):
+        if self.pattern == "none":
+            return
+        while True:
+            if self.pattern == "random":
+                delay = random.expovariate(1 / self.release_every)
+            else:
+                delay = self.release_every
+            if self._stop.wait(delay):
+                return
+            self.release(self.burst_size if self.pattern == "burst" else 1)
+
+    # Request handling, called from the handler threads
+
+    def delay(self):
+        time.sleep(max(self.latency + random.uniform(-self.jitter, self.jitter), 0))
+
+    def in_outage(self) -> bool:
+        if self.outage_at is None:
+            return False
+        elapsed = time.monotonic() - self._started_at
+        return self.outage_at <= elapsed < self.outage_at + self.outage_seconds
+
+    def over_rate_limit(self) -> bool:
+        """Whether a request now is one too many for --rate-limit; counts it as accepted otherwise"""
+        if self.rate_limit is None:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            while self._accepted and now - self._accepted[0] >= 1:
+                self._accepted.popleft()
+            if len(self._accepted) >= self.rate_limit:
+                return True
+            self._accepted.append(now)
+            return False
+
+    def count(self, endpoint: str):
+        with self._lock:
+            self._counts[endpoint] = self._counts.get(endpoint, 0) + 1
+
+    def connected(self):
+        with self._lock:
+            self._connections += 1
+
+    def new_session(self, email: Optional[str] = None) -> str:
+        """Anonymous session, or a signed-in one for ``email``"""
+        session = secrets.token_hex(16)
+        with self._lock:
+            if email is None:
+                self._sessions[session] = (None, None)
+            else:
+                if email not in self._accounts:
+                    self._accounts[email] = next(self._schedules)
+                self._sessions[session] = (time.monotonic() + self.session_ttl, self._accounts[email])
+        return session
+
+    def issue_token(self, session: Optional[str]) -> str:
+        token = secrets.token_hex(8)
+        with self._lock:
+            self._tokens.setdefault(session or "", set()).add(token)
+        return token
+
+    def valid_token(self, session: Optional[str], token: str) -> bool:
+        with self._lock:
+            return token in self._tokens.get(session or "", ())
+
+    def session_state(self, session: Optional[str]) -> Tuple[str, Optional[int]]:
+        """"signed_in", "expired" or "anonymous", with the account's schedule number"""
+        with self._lock:
+            expires_at, schedule = self._sessions.get(session, (None, None)) if session else (None, None)
+        if expires_at is None:
+            return "anonymous", None
+        return ("signed_in" if time.monotonic() < expires_at else "expired"), schedule
+
+    def open_days(self, facility: str) -> List[dict]:
+        now = time.monotonic()
+        with self._lock:
+            if facility in self._days_cached and now - self._days_cached_at[facility] < self.days_cache:
+                return self._days_cached[facility]
+            released = [release for release in self._releases.values() if release.facility == facility and release.open(now)]
+            for release in released:
+                if release.first_seen_at is None:
+                    release.first_seen_at = now
+        days = sorted([release.day for release in released] + self.baseline)
+        days = [{"date": day, "business_day": True} for day in days]
+        with self._lock:
+            self._days_cached[facility], self._days_cached_at[facility] = days, now
+        return days
+
+    def days_response(self, facility: str, if_none_match: Optional[str],
+                      if_modified_since: Optional[str]) -> Tuple[int, str, Dict[str, str]]:
+        """Status, body and validator headers of a days.json request"""
+        body = json.dumps(self.open_days(facility))
+        with self._lock:
+            if body != self._days_body.get(facility):
+                self._days_body[facility] = body
+                self._days_modified[facility] = time.time()
+            modified = self._days_modified[facility]
+
+        headers = {}
+        etag = f'"{hashlib.md5(body.encode()).hexdigest()}"'
+        if self.validators in ("etag", "both"):
+            headers["ETag"] = etag
+            if if_none_match == etag:
+                return 304, "", headers
+        if self.validators in ("last-modified", "both"):
+            headers["Last-Modified"] = formatdate(modified, usegmt=True)
+            # If-None-Match takes precedence when both are sent
+            if if_modified_since and not if_none_match:
+                try:
+                    if int(modified) <= parsedate_to_datetime(if_modified_since).timestamp():
+                        return 304, "", headers
+                except (TypeError, ValueError):
+                    pass
+        return 200, body, headers
+
+    def open_times(self, facility: str, day: str) -> List[str]:
+        now = time.monotonic()
+        with self._lock:
+            release = self._releases.get((facility, day))
+            if release and release.open(now):
+                return sorted(release.times)
+        return list(TIMES) if day in self.baseline else []
+
+    def book(self, facility: str, day: str, slot: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            release = self._releases.get((facility, day))
+            if not release or not release.open(now) or slot not in release.times:
+                return False
+            release.times.remove(slot)
+            release.bookings.append(now)
+            return True
+
+    # Results
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+            releases = list(self._history)
+            connections = self._connections
+        elapsed = time.monotonic() - self._started_at
+        return {
+            "elapsed_seconds": elapsed,
+            "requests": counts,
+            "connections": connections,
+            "releases": [
+                {
+                    "facility": release.facility,
+                    "date": release.day,
+                    "released_at": release.released_at - self._started_at,
+                    "detect_seconds": release.first_seen_at - release.released_at if release.first_seen_at else None,
+                    "book_seconds": [booked - release.released_at for booked in release.bookings],
+                }
+                for release in releases
+            ],
+        }
+
+
+def _handler(portal: FakePortal):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            portal.connected()
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body: str = "", content_type: str = "text/html; charset=utf-8",
+                  headers: Optional[Dict[str, str]] = None):
+            payload = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _json(self, data):
+            self._send(200, json.dumps(data), "application/json; charset=utf-8")
+
+        def _redirect(self, location: str, headers: Optional[Dict[str, str]] = None):
+            self._send(302, "", headers={"Location": location, **(headers or {})})
+
+        def _outage(self) -> bool:
+            """Answer with the outage status while the portal is down"""
+            if not portal.in_outage():
+                return False
+            portal.count("outage")
+            headers = {"Retry-After": str(portal.retry_after)} if portal.retry_after is not None else None
+            self._send(portal.outage_status, "<html><body>Service Unavailable</body></html>", headers=headers)
+            return True
+
+        def _throttled(self) -> bool:
+            """Answer 429 to requests beyond the rate limit"""
+            if not portal.over_rate_limit():
+                return False
+            portal.count("rate_limited")
+            self._send(429, "<html><body>Too Many Requests</body></html>", headers={"Retry-After": "1"})
+            return True
+
+        def _session(self) -> Optional[str]:
+            cookie = SimpleCookie(self.headers.get("Cookie", ""))
+            return cookie[SESSION_COOKIE].value if SESSION_COOKIE in cookie else None
+
+        def _require_session(self, json_endpoint: bool) -> bool:
+            state, _ = portal.session_state(self._session())
+            if state == "signed_in":
+                return True
+            portal.count(f"session_{state}")
+            if json_endpoint and portal.expiry_response == "401":
+                self._send(401, json.dumps({"error": "You need to sign in or sign up before continuing."}),
+                           "application/json; charset=utf-8")
+            else:
+                self._redirect("/users/sign_in")
+            return False
+
+        def do_GET(self):
+            portal.delay()
+            if self._outage() or self._throttled():
+                return
+            url = urlparse(self.path)
+            path = url.path.rstrip("/")
+            parts = path.split("/")
+
+            if path.endswith("/users/sign_in"):
+                portal.count("sign_in_page")
+                state, schedule = portal.session_state(self._session())
+                if state == "signed_in":
+                    return self._redirect(f"/groups/{schedule}")
+                token = secrets.token_hex(8)
+                session = portal.new_session()
+                return self._send(200, SIGN_IN_PAGE.format(token=token),
+                                  headers={"Set-Cookie": f"{SESSION_COOKIE}={session}; Path=/; HttpOnly"})
+
+            if "/groups/" in path:
+                portal.count("group_page")
+                if not self._require_session(json_endpoint=False):
+                    return
+                return self._send(200, GROUP_PAGE.format(schedule=parts[-1]))
+
+            if "/schedule/" not in path:
+                portal.count("not_found")
+                return self._send(404, "Not found")
+
+            schedule = parts[parts.index("schedule") + 1]
+            facility = parts[-1].removesuffix(".json")
+            if ("/days/" in path or "/times/" in path) and facility not in portal.facilities:
+                portal.count("not_found")
+                return self._send(404, "Not found")
+            if "/days/" in path:
+                portal.count("days")
+                if self._require_session(json_endpoint=True):
+                    status, body, headers = portal.days_response(
+                        facility, self.headers.get("If-None-Match"), self.headers.get("If-Modified-Since")
+                    )
+                    if status == 304:
+                        portal.count("days_not_modified")
+                    self._send(status, body, "application/json; charset=utf-8", headers)
+                return
+            if "/times/" in path:
+                portal.count("times")
+                if self._require_session(json_endpoint=True):
+                    day = parse_qs(url.query).get("date", [""])[0]
+                    times = portal.open_times(facility, day)
+                    self._json({"available_times": times, "business_times": times})
+                return
+
+            portal.count("appointment_page")
+            if self._require_session(json_endpoint=False):
+                facility_options = "\n".join(
+                    f'<option value="{facility}"{" selected" if i == 0 else ""}>{FACILITY_NAMES.get(facility, f"Facility {facility}")}</option>'
+                    for i, facility in enumerate(portal.facilities)
+                )
+                self._send(200, APPOINTMENT_PAGE.format(
+                    token=portal.issue_token(self._session()), schedule=schedule, facility_options=facility_options
+                ))
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            form = parse_qs(self.rfile.read(length).decode("utf-8"))
+            portal.delay()
+            if self._outage() or self._throttled():
+                return
+
+            if self.path.startswith("/users/sign_in") or self.path.endswith("/users/sign_in"):
+                portal.count("sign_in")
+                if not form.get("authenticity_token"):
+                    return self._send(422, "Can't verify CSRF token authenticity.")
+                if form.get("user[password]", [""])[0] != portal.password:
+                    return self._send(200, "alert('Invalid email or password.');", "text/javascript")
+                session = portal.new_session(form.get("user[email]", [""])[0])
+                _, schedule = portal.session_state(session)
+                return self._send(200, f"window.location = '/groups/{schedule}';", "text/javascript",
+                                  headers={"Set-Cookie": f"{SESSION_COOKIE}={session}; Path=/; HttpOnly"})
+
+            portal.count("booking")
+            if not self._require_session(json_endpoint=False):
+                return
+            if not portal.valid_token(self._session(), form.get("authenticity_token", [""])[0]):
+                portal.count("booking_csrf_rejected")
+                return self._send(422, "Can't verify CSRF token authenticity.")
+            facility = form.get("appointments[consulate_appointment][facility_id]", [""])[0]
+            day = form.get("appointments[consulate_appointment][date]", [""])[0]
+            slot = form.get("appointments[consulate_appointment][time]", [""])[0]
+            if portal.book(facility, day, slot):
+                portal.count("booked")
+                return self._send(200, "<html><body>Usted ha programado exitosamente su cita</body></html>")
+            portal.count("booking_rejected")
+            self._send(422, "<html><body>La fecha u hora seleccionada ya no está disponible</body></html>")
+
+    return Handler
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Portal options, shared with the load benchmark"""
+    parser.add_argument("--latency-ms", type=float, default=100, help="Mean response delay")
+    parser.add_argument("--jitter-ms", type=float, default=50, help="Uniform jitter around the mean delay")
+    parser.add_argument("--session-ttl", type=float, default=1200, help="Seconds a login stays valid")
+    parser.add_argument("--expiry-response", choices=("redirect", "401"), default="redirect",
+                        help="Answer to JSON requests with an expired session")
+    parser.add_argument("--pattern", choices=PATTERNS, default="steady", help="How dates are released")
+    parser.add_argument("--release-every", type=float, default=10, help="Seconds between releases (mean for random)")
+    parser.add_argument("--burst-size", type=int, default=3, help="Dates per release with --pattern burst")
+    parser.add_argument("--release-slots", type=int, default=1, help="Time slots (one booking each) per released date, up to 6")
+    parser.add_argument("--release-hold", type=float, default=None, help="Seconds before an unbooked date is withdrawn")
+    parser.add_argument("--release-from", type=int, default=30, help="First day offset of released dates")
+    parser.add_argument("--release-days", type=int, default=60, help="Days over which dates are released")
+    parser.add_argument("--baseline-dates", type=int, default=20, help="Far away dates that are always listed")
+    parser.add_argument("--password", default="secret", help="Password every account accepts")
+    parser.add_argument("--validators", choices=VALIDATORS, default="none",
+                        help="Validators sent with the days list for conditional requests")
+    parser.add_argument("--days-cache", type=float, default=0, help="Seconds the days list is served from cache")
+    parser.add_argument("--outside-share", type=float, default=0, help="Share of released dates booked out by others")
+    parser.add_argument("--outside-after", type=float, default=0.5, help="Seconds after release others book them out")
+    parser.add_argument("--facilities", default="143", help="Comma separated facility ids the portal offers")
+    parser.add_argument("--outage-at", type=float, default=None, help="Seconds after start the portal goes down")
+    parser.add_argument("--outage-seconds", type=float, default=20, help="How long the outage lasts")
+    parser.add_argument("--outage-status", type=int, default=503, help="Status of every response during the outage")
+    parser.add_argument("--retry-after", type=int, default=None, help="Retry-After seconds sent during the outage")
+    parser.add_argument("--rate-limit", type=float, default=None, help="Requests per second served before answering 429")
+
+
+def from_arguments(args: argparse.Namespace) -> FakePortal:
+    return FakePortal(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        session_ttl=args.session_ttl,
+        expiry_response=args.expiry_response,
+        pattern=args.pattern,
+        release_every=args.release_every,
+        burst_size=args.burst_size,
+        release_slots=args.release_slots,
+        release_hold=args.release_hold,
+        release_from_days=args.release_from,
+        release_days=args.release_days,
+        baseline_dates=args.baseline_dates,
+        password=args.password,
+        validators=args.validators,
+        days_cache=args.days_cache,
+        outside_share=args.outside_share,
+        outside_after=args.outside_after,
+        facilities=tuple(facility.strip() for facility in args.facilities.split(",") if facility.strip()),
+        outage_at=args.outage_at,
+        outage_seconds=args.outage_seconds,
+        outage_status=args.outage_status,
+        retry_after=args.retry_after,
+        rate_limit=args.rate_limit,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    portal = from_arguments(args)
+    base_url = portal.start(args.host, args.port)
+    print(f"Fake portal listening on {base_url}, releasing dates from {portal.release_from} ({args.pattern})")
+    try:
+        while True:
+            time.sleep(60)
+            metrics = portal.metrics()
+            print(f"{metrics['elapsed_seconds']:.0f}s requests={metrics['requests']} releases={len(metrics['releases'])}")
+    except KeyboardInterrupt:
+        portal.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Check lease ownership of re_schedule rows against a real database.
+
+Usage (from nextvisa-api/, with SUPABASE_URL / SUPABASE_KEY pointing at a
+local stack started with `supabase start` and migrations/001_re_schedule_lease.sql
+applied):
+
+    python -m benchmarks.lease_check --applicant 1 --rows 5 --nodes 8
+
+Inserts --rows LOGIN_PENDING re-schedules for an existing --applicant, runs
+the checks below through the production lease functions of
+services.re_schedule_services, and deletes the rows again. LOGIN_PENDING rows
+are never picked up by running scheduler nodes, which only take over
+SCHEDULED, PROCESSING and deferred PENDING rows, so the check can share a
+database with them.
+
+    exclusive claim  --nodes threads race to claim every row, one wins each
+    reclaim          the owner can claim again, any other node cannot
+    renew            renew_leases extends only the caller's own leases
+    orphans          owned rows are not orphaned; expired and released ones are,
+                     and another node can then claim them
+
+Exits with status 1 if any check fails.
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import List
+
+from models.re_schedule import ScheduleStatus
+from services import re_schedule_services
+from services.re_schedule_services import TABLE_NAME, _get_db
+
+# Only this status is used, so running nodes leave the rows alone
+STATUS = ScheduleStatus.LOGIN_PENDING.value
+
+
+class LeaseCheck:
+    def __init__(self, ids: List[int], nodes: int, lease_seconds: int):
+        self.ids = ids
+        self.nodes = [f"lease-check-{i}" for i in range(nodes)]
+        self.lease_seconds = lease_seconds
+        self.failures = 0
+
+    def expect(self, name: str, passed: bool, detail: str = ""):
+        print(f"{'PASS' if passed else 'FAIL':<6}{name}{f' - {detail}' if detail else ''}")
+        if not passed:
+            self.failures += 1
+
+    def orphaned(self) -> set:
+        ids = set(self.ids)
+        return {row.get("id") for row in re_schedule_services.get_orphaned_re_schedules([STATUS]) if row.get("id") in ids}
+
+    def owners(self) -> dict:
+        rows = _get_db().table(TABLE_NAME).select("id, claimed_by").in_("id", self.ids).execute().data
+        return {row.get("id"): row.get("claimed_by") for row in rows}
+
+    def exclusive_claim(self):
+        def claim(task):
+            re_schedule_id, node = task
+            return re_schedule_id, node, re_schedule_services.claim_re_schedule(re_schedule_id, node, self.lease_seconds)
+
+        tasks = [(re_schedule_id, node) for re_schedule_id in self.ids for node in self.nodes]
+        with ThreadPoolExecutor(max_workers=len(self.nodes)) as executor:
+            results = list(executor.map(claim, tasks))
+
+        owners = self.owners()
+        for re_schedule_id in self.ids:
+            winners = [node for rid, node, won in results if rid == re_schedule_id and won]
+            self.expect(
+                f"exclusive claim of {re_schedule_id}",
+                len(winners) == 1 and owners.get(re_schedule_id) == winners[0],
+                f"winners={winners} claimed_by={owners.get(re_schedule_id)}"
+            )
+        return owners
+
+    def reclaim(self, owners: dict):
+        for re_schedule_id, owner in owners.items():
+            other = next(node for node in self.nodes if node != owner)
+            self.expect(f"owner reclaims {re_schedule_id}", re_schedule_services.claim_re_schedule(re_schedule_id, owner, self.lease_seconds))
+            self.expect(f"other node cannot claim {re_schedule_id}",
+                        not re_schedule_services.claim_re_schedule(re_schedule_id, other, self.lease_seconds))
+
+    def renew(self, owners: dict):
+        for node in set(owners.values()):
+            own = sorted(rid for rid, owner in owners.items() if owner == node)
+            renewed = sorted(row.get("id") for row in re_schedule_services.renew_leases(self.ids, node, self.lease_seconds))
+            self.expect(f"renew by {node}", renewed == own, f"renewed={renewed} owned={own}")
+        stranger = re_schedule_services.renew_leases(self.ids, "lease-check-stranger", self.lease_seconds)
+        self.expect("renew by a node owning nothing", stranger == [], f"renewed={stranger}")
+
+    def orphans(self, owners: dict):
+        self.expect("owned rows are not orphaned", not self.orphaned(), f"orphaned={sorted(self.orphaned())}")
+
+        # Let the first row's lease run out
+        expiring = self.ids[0]
+        re_schedule_services.claim_re_schedule(expiring, owners[expiring], 1)
+        time.sleep(2.5)
+        self.expect(f"expired lease of {expiring} is orphaned", self.orphaned() == {expiring}, f"orphaned={sorted(self.orphaned())}")
+        self.expect(f"expired lease of {expiring} cannot be renewed by a stranger",
+                    not re_schedule_services.renew_leases([expiring], "lease-check-stranger", self.lease_seconds))
+        self.expect(f"takeover of expired {expiring}", re_schedule_services.claim_re_schedule(expiring, "lease-check-takeover", self.lease_seconds))
+        self.expect(f"old owner lost {expiring}", not re_schedule_services.renew_leases([expiring], owners[expiring], self.lease_seconds))
+
+        if len(self.ids) > 1:
+            released = self.ids[1]
+            self.expect(f"release of {released}", re_schedule_services.release_re_schedule(released, owners[released]))
+            self.expect(f"released {released} is orphaned", released in self.orphaned())
+            self.expect(f"takeover of released {released}",
+                        re_schedule_services.claim_re_schedule(released, "lease-check-takeover", self.lease_seconds))
+
+    def run(self) -> bool:
+        owners = self.exclusive_claim()
+        if len(set(owners)) != len(self.ids) or None in owners.values():
+            return False
+        self.reclaim(owners)
+        self.renew(owners)
+        self.orphans(owners)
+        return self.failures == 0
+
+
+def insert_rows(applicant: int, rows: int) -> List[int]:
+    start = datetime.now() + timedelta(days=1)
+    data = [{
+        "applicant": applicant, "status": STATUS,
+        "start_datetime": start.isoformat(), "end_datetime": (start + timedelta(hours=1)).isoformat(),
+    } for _ in range(rows)]
+    return [row.get("id") for row in _get_db().table(TABLE_NAME).insert(data).execute().data]
+
+
+def delete_rows(ids: List[int]):
+    if ids:
+        _get_db().table(TABLE_NAME).delete().in_("id", ids).execute()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--applicant", type=int, required=True, help="Existing applicant the test rows belong to")
+    parser.add_argument("--rows", type=int, default=5)
+    parser.add_argument("--nodes", type=int, default=8, help="Simulated scheduler nodes racing for each row")
+    parser.add_argument("--lease-seconds", type=int, default=60)
+    args = parser.parse_args()
+
+    ids = insert_rows(args.applicant, max(args.rows, 1))
+    try:
+        check = LeaseCheck(ids, max(args.nodes, 2), args.lease_seconds)
+        passed = check.run()
+        print(f"Lease check {'passed' if passed else 'failed'}: {check.failures} failed checks")
+    finally:
+        delete_rows(ids)
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
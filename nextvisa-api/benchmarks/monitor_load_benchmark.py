@@ -0,0 +1,262 @@
+"""
+Run N re-schedule monitors against the fake portal and report poll rate,
+time-to-detect and time-to-book.
+
+Usage (from nextvisa-api/):
+
+    python -m benchmarks.monitor_load_benchmark --monitors 50 --duration 120 --sleep-time 2 \
+        --latency-ms 150 --pattern burst --release-every 15
+
+    # Against a portal started separately with benchmarks.fake_portal (its release window must match)
+    python -m benchmarks.monitor_load_benchmark --portal http://127.0.0.1:8090 --monitors 20
+
+    # Two facilities released into, every applicant watching both
+    python -m benchmarks.monitor_load_benchmark --facilities 143,144 --applicant-facilities 143,144
+
+Monitors log in over HTTP, so no Selenium hub is needed. Re-schedules,
+applicants, logs and the configuration are kept in memory instead of
+Supabase; everything else is the production monitor code. Every applicant
+accepts the whole release window, so the monitors compete for the slots.
+
+    poll rate       days.json requests per second served by the portal, and
+                    availability checks per second made by the monitors
+    time-to-detect  date released -> first days.json response listing it
+    time-to-book    date released -> booking accepted
+    booking         per attempt: slot chosen -> POST sent, and the POST round trip
+    breaker         retries and circuit breaker activity of the portal host
+    governor        request governor rate of the portal host, and the requests
+                    of each priority it held back
+
+    # A 30s outage 20s in, answered with 503 and Retry-After: 5
+    python -m benchmarks.monitor_load_benchmark --monitors 20 --duration 90 --outage-at 20 --outage-seconds 30 --retry-after 5
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from cryptography.fernet import Fernet
+
+# Read by the service modules at import time
+os.environ.setdefault("FERNET_KEY", Fernet.generate_key().decode())
+os.environ.setdefault("SESSION_CACHE_ENABLED", "false")
+os.environ.setdefault("HTTP_LOGIN", "true")
+
+from benchmarks import fake_portal  # noqa: E402
+from lib import security  # noqa: E402
+from lib.monitor_stats import monitor_stats  # noqa: E402
+from lib.portal_resilience import portal_resilience  # noqa: E402
+from lib.request_governor import request_governor  # noqa: E402
+from services import (  # noqa: E402
+    applicant_services,
+    applicant_web_services,
+    configuration_services,
+    re_schedule_log_services,
+    re_schedule_services,
+)
+
+
+class InMemoryBackend:
+    """Stands in for the Supabase backed services the monitors call"""
+
+    def __init__(self, base_url: str, sleep_time: float, password: str, monitors: int, duration: float,
+                 min_date: date, max_date: date, facilities: Optional[str] = None):
+        self.configuration = SimpleNamespace(
+            base_url=base_url, hub_address="http://localhost:4444", sleep_time=sleep_time,
+            push_token="", push_user="", df_msg=""
+        )
+        now = datetime.now()
+        encrypted = security.encrypt_password(password)
+        self.applicants: Dict[int, dict] = {}
+        self.re_schedules: Dict[int, dict] = {}
+        for i in range(1, monitors + 1):
+            self.applicants[i] = {
+                "id": i, "name": "Applicant", "last_name": str(i), "email": f"applicant{i}@example.com",
+                "password": encrypted, "schedule": str(10000 + i),
+                "min_date": min_date.isoformat(), "max_date": max_date.isoformat(), "facilities": facilities,
+            }
+            self.re_schedules[i] = {
+                "id": i, "applicant": i, "status": "SCHEDULED",
+                "start_datetime": now.strftime("%Y-%m-%dT%H:%M:%S"),
+                "end_datetime": (now + timedelta(seconds=duration)).strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+        self.logs = 0
+        self.stats = []
+
+    def install(self):
+        re_schedule_services.get_re_schedule_by_id = lambda re_schedule_id: dict(self.re_schedules[re_schedule_id])
+        re_schedule_services.update_re_schedule = self._update_re_schedule
+        applicant_services.get_applicant_with_password = lambda applicant_id: dict(self.applicants[applicant_id])
+        configuration_services.get_configuration = lambda: self.configuration
+        re_schedule_log_services.create_re_schedule_log = self._create_log
+        applicant_web_services.pushhover.send_message = lambda message: None
+
+        # Keep every monitor's counters after it finished
+        track = monitor_stats.track
+
+        def track_and_keep(re_schedule_id: int):
+            stats = track(re_schedule_id)
+            self.stats.append(stats)
+            return stats
+        monitor_stats.track = track_and_keep
+
+    def _update_re_schedule(self, re_schedule_id: int, update):
+        values = update.model_dump(exclude_unset=True)
+        if "status" in values:
+            values["status"] = getattr(values["status"], "value", values["status"])
+        self.re_schedules[re_schedule_id].update(values)
+        return self.re_schedules[re_schedule_id]
+
+    def _create_log(self, log):
+        self.logs += 1
+        return log
+
+    def outcomes(self) -> Dict[str, int]:
+        outcomes: Dict[str, int] = {}
+        for re_schedule in self.re_schedules.values():
+            outcomes[re_schedule["status"]] = outcomes.get(re_schedule["status"], 0) + 1
+        return outcomes
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"n": 0, "p50": None, "p95": None, "max": None}
+    ordered = sorted(values)
+    return {
+        "n": len(ordered),
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)],
+        "max": ordered[-1],
+    }
+
+
+def run_monitors(ids: List[int], backend: str):
+    if backend == "asyncio":
+        async def run_all():
+            # Started at start_datetime like a prewarm job, so their start lag is measured
+            await asyncio.gather(*(applicant_web_services.process_re_schedule_async(i, True) for i in ids))
+        asyncio.run(run_all())
+    else:
+        with ThreadPoolExecutor(max_workers=len(ids)) as executor:
+            list(executor.map(applicant_web_services.process_re_schedule, ids, [True] * len(ids)))
+
+
+def report(backend: InMemoryBackend, portal_metrics: Optional[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    checks = sum(stats.polls for stats in backend.stats)
+    result = {
+        "monitors": len(backend.re_schedules),
+        "elapsed_seconds": elapsed,
+        "outcomes": backend.outcomes(),
+        "monitor_checks_per_second": checks / elapsed if elapsed else 0.0,
+        "start_lag": percentiles([lag for lag in (stats.start_lag() for stats in backend.stats) if lag is not None]),
+        "logs": backend.logs,
+        "booking_prepare": percentiles([a["prepare_seconds"] for stats in backend.stats for a in stats.booking_attempts]),
+        "booking_post": percentiles([
+            a["post_seconds"] for stats in backend.stats for a in stats.booking_attempts if a["post_seconds"] is not None
+        ]),
+        "breakers": portal_resilience.stats(),
+        "governor": request_governor.stats(),
+    }
+    if portal_metrics:
+        releases = portal_metrics["releases"]
+        result.update({
+            "portal_requests": portal_metrics["requests"],
+            "portal_connections": portal_metrics["connections"],
+            "portal_days_per_second": portal_metrics["requests"].get("days", 0) / elapsed if elapsed else 0.0,
+            "released": len(releases),
+            "time_to_detect": percentiles([r["detect_seconds"] for r in releases if r["detect_seconds"] is not None]),
+            "time_to_book": percentiles([seconds for r in releases for seconds in r["book_seconds"]]),
+        })
+    return result
+
+
+def print_report(result: Dict[str, Any]):
+    def row(name: str, value: str):
+        print(f"{name:<18}{value}")
+
+    def timing(values: Dict[str, Optional[float]]) -> str:
+        if not values["n"]:
+            return "n=0"
+        return f"n={values['n']} p50={values['p50']:.2f}s p95={values['p95']:.2f}s max={values['max']:.2f}s"
+
+    row("monitors", f"{result['monitors']} in {result['elapsed_seconds']:.1f}s")
+    row("outcomes", ", ".join(f"{status}={count}" for status, count in sorted(result["outcomes"].items())))
+    row("start lag", timing(result["start_lag"]))
+    checks = result["monitor_checks_per_second"]
+    row("monitor checks", f"{checks:.2f}/s ({checks / max(result['monitors'], 1):.3f}/s per monitor)")
+    row("log rows", str(result["logs"]))
+    if result["booking_prepare"]["n"]:
+        prepare = result["booking_prepare"]
+        row("booking prepare", f"n={prepare['n']} p50={prepare['p50'] * 1000:.2f}ms p95={prepare['p95'] * 1000:.2f}ms max={prepare['max'] * 1000:.2f}ms")
+        row("booking POST", timing(result["booking_post"]))
+    for host, breaker in result["breakers"].items():
+        row("breaker", f"{host} {breaker['state']}, opened={breaker['opened']} short_circuited={breaker['short_circuited']} "
+                       f"retries={breaker['retries']} failures={breaker['failures']}")
+    governor = result["governor"]
+    if governor["enabled"]:
+        for host, bucket in governor["hosts"].items():
+            row("governor", f"{host} rate={bucket['rate']}/s of {bucket['max_rate']}/s")
+        for name, counts in governor["priorities"].items():
+            if counts["requests"]:
+                row(f"  {name}", f"requests={counts['requests']} throttled={counts['throttled']} "
+                               f"wait={counts['wait_seconds']:.2f}s max_wait={counts['max_wait_seconds']:.2f}s")
+    if "portal_requests" in result:
+        row("portal days.json", f"{result['portal_days_per_second']:.2f}/s")
+        row("portal requests", ", ".join(f"{name}={count}" for name, count in sorted(result["portal_requests"].items())))
+        row("connections", str(result["portal_connections"]))
+        row("released dates", str(result["released"]))
+        row("time-to-detect", timing(result["time_to_detect"]))
+        row("time-to-book", timing(result["time_to_book"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--monitors", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=60, help="Seconds each monitor runs")
+    parser.add_argument("--sleep-time", type=float, default=2, help="Configured poll interval")
+    parser.add_argument("--backend", choices=("asyncio", "thread"), default="asyncio")
+    parser.add_argument("--portal", help="Use a running fake portal instead of an in-process one")
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="Show the monitors' logs")
+    parser.add_argument("--applicant-facilities", help="Facilities every applicant watches, the default facility if unset")
+    fake_portal.add_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL)
+
+    portal = None
+    base_url = args.portal
+    if not base_url:
+        portal = fake_portal.from_arguments(args)
+        base_url = portal.start()
+
+    release_from = date.today() + timedelta(days=args.release_from)
+    backend = InMemoryBackend(
+        base_url, args.sleep_time, args.password, args.monitors, args.duration,
+        release_from, release_from + timedelta(days=args.release_days), args.applicant_facilities
+    )
+    backend.install()
+
+    started = time.monotonic()
+    try:
+        run_monitors(list(backend.re_schedules), args.backend)
+    finally:
+        elapsed = time.monotonic() - started
+        if portal:
+            portal.stop()
+
+    result = report(backend, portal.metrics() if portal else None, elapsed)
+    print_report(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, HTTPException, status, Query
-from models.re_schedule import ReScheduleCreate, ReScheduleUpdate, ReScheduleResponse
-from services import re_schedule_services, applicant_web_services
+from models.re_schedule import ReScheduleCreate, ReScheduleUpdate, ReScheduleResponse, TERMINAL_STATUSES
+from services import re_schedule_services
 from services.re_schedule_services import ReScheduleNotFoundException
 from lib.exceptions import DatabaseException
+from lib.scheduler import scheduler
 from typing import List, Optional
 import logging
 
@@ -133,6 +134,11 @@ def update_re_schedule(re_schedule_id: int, re_schedule: ReScheduleUpdate):
     """
     try:
         updated_re_schedule = re_schedule_services.update_re_schedule(re_schedule_id, re_schedule)
+
+        # A running monitor has nothing left to do once the status is terminal
+        if re_schedule.status in TERMINAL_STATUSES:
+            re_schedule_services.stop_re_schedule(re_schedule_id, f"Status changed to {re_schedule.status.value}")
+
         return updated_re_schedule
     except ReScheduleNotFoundException as e:
         raise HTTPException(
@@ -184,14 +190,15 @@ def delete_re_schedule(re_schedule_id: int):
 @router.post("/{reschedule_id}/process_reschedule")
 def process_reschedule(reschedule_id: int):
     """
-    Try to reschedule directly using Selenium and extract a schedule number
+    Start monitoring a re-schedule right away, on this node
 
-    - **applicant_id**: The ID of the applicant to test
+    The monitor runs through the scheduler, which claims the re-schedule's
+    lease first so no other node or heartbeat starts a second monitor for it.
 
-    Returns:
-        - success: Whether login was successful
-        - schedule: Extracted schedule number (if found)
-        - error: Error message (if any)
+    - **reschedule_id**: The ID of the re-schedule to process
+
+    Raises:
+        409: If the re-schedule is already being monitored here or owned by another node
     """
     if not reschedule_id:
         raise ValueError("Reschedule ID is required")
@@ -207,6 +214,13 @@ def process_reschedule(reschedule_id: int):
         if not applicant_id:
             raise Exception("Missing applicant id")
 
-        applicant_web_services.process_re_schedule(reschedule_id)
+        started = scheduler.start_now(reschedule_id)
     except Exception as e:
-        logger.error(f"Error processing reschedule {reschedule_id}: {str(e)}", exc_info=True)
\ No newline at end of file
+        logger.error(f"Error processing reschedule {reschedule_id}: {str(e)}", exc_info=True)
+        return None
+
+    if not started:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Re-schedule {reschedule_id} is already being monitored"
+        )
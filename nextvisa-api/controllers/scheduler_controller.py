@@ -0,0 +1,26 @@
+from fastapi import APIRouter, HTTPException, status
+from lib.scheduler import scheduler
+import logging
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+@router.get("/stats")
+def get_scheduler_stats():
+    """
+    Get a live view of the scheduler on this node
+
+    - **pending_jobs**: Scheduled monitors and when they will start
+    - **running_monitors**: Uptime, start lag, poll count and last poll latency per monitor
+    - **selenium_sessions**: Selenium sessions currently held by monitors and pre-checks
+    - **queues**, **pollers**, **cancellation**: Stage, shared poller and cancellation counters
+    """
+    try:
+        return scheduler.get_stats()
+    except Exception as e:
+        logger.error(f"Unexpected error while collecting scheduler stats: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred"
+        )
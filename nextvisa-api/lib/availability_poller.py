@@ -0,0 +1,314 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from threading import Event, Lock, Thread
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import httpx
+
+from lib import portal_http
+from lib.portal_resilience import portal_resilience
+from lib.cadence import CadencePolicy
+from lib.date_windows import DateWindow, DaysIndex, days_list
+from lib.days_changes import DaysTracker
+from lib.exceptions import PortalUnavailableException
+
+logger = logging.getLogger(__name__)
+
+PollerKey = Tuple[str, str]
+
+
+class DaysSnapshot(NamedTuple):
+    """One days.json response shared with every monitor of a facility"""
+    facility: str
+    data: Any
+    fetched_at: float
+    error: Optional[str] = None
+    latency: Optional[float] = None
+    # Re-schedule whose session made the request, and whether the portal had ended that session
+    source: Optional[int] = None
+    session_expired: bool = False
+    # Hash of the days list; monitors skip a list they already acted on
+    digest: Optional[str] = None
+    # Candidate dates of every subscriber with a date window, by re-schedule id
+    matches: Optional[Dict[int, List[str]]] = None
+
+
+class Subscription:
+    """
+    A monitor's registration with the pollers of the facilities it watches.
+
+    The poller threads publish snapshots with ``publish``; the monitor awaits
+    them on its own event loop with ``next_snapshots``. Only the latest
+    snapshot of each facility is kept, a slow monitor never works through a
+    backlog of stale ones.
+    """
+
+    def __init__(self, re_schedule_id: int, days_urls: Dict[str, str], appointment_url: str,
+                 user_agent: str, cookies: httpx.Cookies, end_datetime: datetime,
+                 window: Optional[DateWindow] = None, account: Optional[str] = None):
+        self.re_schedule_id = re_schedule_id
+        # Applicant email; polls sent with this session count against its request budget
+        self.account = account
+        self.end_datetime = end_datetime
+        self.window = window
+        # days.json URL by facility id
+        self.days_urls = days_urls
+        self.appointment_url = appointment_url
+        self.user_agent = user_agent
+        self.cookies = httpx.Cookies(cookies)
+        # Bumped on every re-login so the poller knows to take the new cookies
+        self.session_version = 0
+        self._loop = asyncio.get_running_loop()
+        self._latest: Dict[str, DaysSnapshot] = {}
+        self._published = asyncio.Event()
+
+    def update_session(self, cookies: httpx.Cookies):
+        """Share fresh cookies after the monitor logged in again"""
+        self.cookies = httpx.Cookies(cookies)
+        self.session_version += 1
+
+    def publish(self, snapshot: DaysSnapshot):
+        try:
+            self._loop.call_soon_threadsafe(self._put_latest, snapshot)
+        except RuntimeError:
+            # The monitor's event loop already closed
+            pass
+
+    def _put_latest(self, snapshot: DaysSnapshot):
+        self._latest[snapshot.facility] = snapshot
+        self._published.set()
+
+    async def next_snapshots(self, timeout: float) -> List[DaysSnapshot]:
+        """
+        Wait for the next days snapshots
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            The latest snapshot of every facility published since the last
+            call, empty if none arrived in time
+        """
+        try:
+            await asyncio.wait_for(self._published.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return []
+        self._published.clear()
+        snapshots = list(self._latest.values())
+        self._latest.clear()
+        return snapshots
+
+
+class FacilityPoller:
+    """
+    Fetches the days list of one facility once per tick and fans it out.
+
+    Requests are made with the session of one subscribed monitor over one
+    keep-alive connection. The poller's cookie jar follows the cookies the
+    portal rotates and is only reloaded when the source monitor logged in
+    again. When the portal ends that session the snapshot says so, its
+    monitor logs in again, and the poller keeps using it once it has;
+    otherwise, and on other failures, the poller moves on to the next
+    subscriber. Requests are conditional when the portal supports it and
+    every snapshot carries the hash of its days list, and the candidate
+    dates of all subscribers, matched once per distinct list.
+    The tick follows a CadencePolicy seeded with the configured sleep time.
+    """
+
+    def __init__(self, key: PollerKey, interval: float):
+        self.key = key
+        self.cadence = CadencePolicy(interval)
+        self.tracker = DaysTracker(key)
+        self.errors = 0
+        self.session_expiries = 0
+        self._subscribers: List[Subscription] = []
+        self._source: Optional[Subscription] = None
+        # Days list the matches were resolved against
+        self._index: Optional[DaysIndex] = None
+        self._index_digest: Optional[str] = None
+        self._matches: Dict[int, List[str]] = {}
+        self._lock = Lock()
+        self._stop = Event()
+        self._thread = Thread(target=self._run, name=f"poller-{key[1]}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def add(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.append(subscription)
+
+    def remove(self, subscription: Subscription) -> int:
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+            if self._source is subscription:
+                self._source = None
+            return len(self._subscribers)
+
+    def _subscribers_copy(self) -> List[Subscription]:
+        with self._lock:
+            return list(self._subscribers)
+
+    def _seconds_left(self) -> Optional[float]:
+        """Seconds until the earliest subscriber window closes"""
+        subscribers = self._subscribers_copy()
+        if not subscribers:
+            return None
+        earliest = min(subscription.end_datetime for subscription in subscribers)
+        return (earliest - datetime.now()).total_seconds()
+
+    def _next_source(self, failed: bool = False) -> Optional[Subscription]:
+        with self._lock:
+            if not self._subscribers:
+                return None
+            if self._source in self._subscribers and not failed:
+                return self._source
+
+            index = self._subscribers.index(self._source) + 1 if self._source in self._subscribers else 0
+            self._source = self._subscribers[index % len(self._subscribers)]
+            return self._source
+
+    def _run(self):
+        logger.info(f"Availability poller started for facility {self.key[1]}")
+        with httpx.Client(follow_redirects=True, timeout=15, limits=portal_http.connection_limits()) as client:
+            source = None
+            session_version = None
+            failed = False
+            delay = self.cadence.next_delay()
+            while not self._stop.wait(delay):
+                # A source that logged in again since its failed request gets another try
+                next_source = self._next_source(failed and source.session_version == session_version)
+                if not next_source:
+                    break
+                if next_source is not source or next_source.session_version != session_version:
+                    source = next_source
+                    session_version = source.session_version
+                    client.cookies = httpx.Cookies(source.cookies)
+
+                snapshot = self._fetch(client, source)
+                failed = snapshot.error is not None
+                self.cadence.observe(snapshot.digest, error=failed)
+                subscribers = self._subscribers_copy()
+                if not failed:
+                    snapshot = snapshot._replace(matches=self._match(snapshot, subscribers))
+                for subscription in subscribers:
+                    subscription.publish(snapshot)
+
+                delay = self.cadence.next_delay(self._seconds_left())
+        logger.info(f"Availability poller stopped for facility {self.key[1]}")
+
+    def _match(self, snapshot: DaysSnapshot, subscribers: List[Subscription]) -> Optional[Dict[int, List[str]]]:
+        """Candidate dates of every subscriber, resolved only for a new list or a new subscriber"""
+        if snapshot.digest is None or snapshot.digest != self._index_digest:
+            entries = days_list(snapshot.data)
+            if entries is None:
+                return None
+            self._index = DaysIndex(entries)
+            self._index_digest = snapshot.digest
+            self._matches = {}
+
+        missing = {
+            subscription.re_schedule_id: subscription.window for subscription in subscribers
+            if subscription.window and subscription.re_schedule_id not in self._matches
+        }
+        if missing:
+            # A copy, snapshots already published keep the matches they were sent with
+            self._matches = {**self._matches, **self._index.match_all(missing)}
+        return self._matches
+
+    def _fetch(self, client: httpx.Client, source: Subscription) -> DaysSnapshot:
+        headers = {
+            "Accept": "application/json, text/javascript, */*; q=0.01",
+            "X-Requested-With": "XMLHttpRequest",
+            "Referer": source.appointment_url,
+            "User-Agent": source.user_agent
+        }
+
+        started = time.monotonic()
+        try:
+            days_url = source.days_urls[self.key[1]]
+            r = portal_resilience.request_sync(client, "GET", days_url, source.account, headers={**headers, **self.tracker.request_headers(days_url)})
+            logger.info(f"Shared poll facility {self.key[1]} - status: {r.status_code}")
+        except PortalUnavailableException as e:
+            logger.info(f"Shared poll for facility {self.key[1]} held back: {e.message}")
+            return DaysSnapshot(facility=self.key[1], data=[], fetched_at=time.time(), error=e.message, source=source.re_schedule_id)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Shared poll failed for facility {self.key[1]}: {e}")
+            return DaysSnapshot(facility=self.key[1], data=[], fetched_at=time.time(), error=str(e), latency=time.monotonic() - started,
+                                source=source.re_schedule_id)
+
+        latency = time.monotonic() - started
+        if portal_http.is_portal_error(r):
+            self.errors += 1
+            logger.warning(f"Shared poll for facility {self.key[1]}: portal error (status: {r.status_code})")
+            return DaysSnapshot(facility=self.key[1], data=[], fetched_at=time.time(), error=f"Portal error ({r.status_code})",
+                                latency=latency, source=source.re_schedule_id)
+        if r.status_code != 304 and portal_http.is_session_expired(r):
+            self.errors += 1
+            self.session_expiries += 1
+            logger.warning(f"Shared poll for facility {self.key[1]}: session of re-schedule {source.re_schedule_id} expired (status: {r.status_code})")
+            return DaysSnapshot(facility=self.key[1], data=[], fetched_at=time.time(), error=f"Session expired ({r.status_code})", latency=latency,
+                                source=source.re_schedule_id, session_expired=True)
+
+        try:
+            data = self.tracker.update(r)
+            return DaysSnapshot(facility=self.key[1], data=data, fetched_at=time.time(), latency=latency, source=source.re_schedule_id,
+                                digest=self.tracker.digest)
+        except ValueError:
+            self.errors += 1
+            logger.warning(f"Shared poll for facility {self.key[1]} did not return JSON. status: {r.status_code}")
+            return DaysSnapshot(facility=self.key[1], data=r.text, fetched_at=time.time(), error=f"Non JSON response ({r.status_code})", latency=latency,
+                                source=source.re_schedule_id)
+
+
+class AvailabilityPollers:
+    """Registry with at most one running poller per (base_url, facility)"""
+
+    def __init__(self):
+        self.enabled = os.getenv("SHARED_POLLER", "true").lower() == "true"
+        self._pollers: Dict[PollerKey, FacilityPoller] = {}
+        self._lock = Lock()
+
+    def subscribe(self, key: PollerKey, subscription: Subscription, interval: float):
+        """Add a monitor to the poller of a facility, starting it for the first subscriber"""
+        with self._lock:
+            poller = self._pollers.get(key)
+            if not poller:
+                poller = FacilityPoller(key, interval)
+                self._pollers[key] = poller
+                poller.add(subscription)
+                poller.start()
+            else:
+                poller.add(subscription)
+        logger.info(f"Re-schedule {subscription.re_schedule_id} subscribed to facility {key[1]} poller")
+
+    def unsubscribe(self, key: PollerKey, subscription: Subscription):
+        with self._lock:
+            poller = self._pollers.get(key)
+            if poller and poller.remove(subscription) == 0:
+                poller.stop()
+                del self._pollers[key]
+
+    def stats(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                f"{base_url}#{facility}": {
+                    "subscribers": len(poller._subscribers_copy()),
+                    "errors": poller.errors,
+                    "session_expiries": poller.session_expiries,
+                    **poller.cadence.stats(),
+                }
+                for (base_url, facility), poller in self._pollers.items()
+            }
+
+
+# Singleton instance
+pollers = AvailabilityPollers()
@@ -0,0 +1,111 @@
+import logging
+import os
+import statistics
+import time
+from collections import deque
+from contextlib import contextmanager
+from threading import Lock
+from typing import Any, Callable, Deque, Dict, List, Tuple
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait as Wait
+
+from lib.exceptions import StepBudgetExceededException
+
+logger = logging.getLogger(__name__)
+
+# Wait on page conditions instead of fixed sleeps; false restores the old pacing
+FAST_INTERACTIONS = os.getenv("BROWSER_FAST_INTERACTIONS", "true").lower() == "true"
+
+
+class StepStats:
+    """Rolling per-step timings of browser flows, to see where login time goes"""
+
+    def __init__(self, window: int = 200):
+        self._window = window
+        self._samples: Dict[Tuple[str, str], Deque[float]] = {}
+        self._lock = Lock()
+
+    def record(self, flow: str, step: str, seconds: float):
+        with self._lock:
+            samples = self._samples.setdefault((flow, step), deque(maxlen=self._window))
+            samples.append(seconds)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            samples = {key: list(values) for key, values in self._samples.items()}
+
+        result = {}
+        for (flow, step), values in samples.items():
+            ordered = sorted(values)
+            result[f"{flow}.{step}"] = {
+                "count": len(ordered),
+                "p50": round(statistics.median(ordered), 3),
+                "p95": round(ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)], 3),
+                "max": round(ordered[-1], 3),
+            }
+        return result
+
+
+class BrowserFlow:
+    """
+    Times the steps of one Selenium interaction against a latency budget each.
+
+    ``wait`` polls a DOM condition until it holds, for at most the step's
+    budget, so a step takes as long as the page needs rather than a fixed
+    sleep. ``step`` times work that has no condition to wait on and warns
+    when it runs over budget. Every timing is added to ``step_stats``.
+    """
+
+    def __init__(self, name: str, driver):
+        self.name = name
+        self.driver = driver
+        self.timings: List[Tuple[str, float]] = []
+
+    @contextmanager
+    def step(self, name: str, budget: float):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.timings.append((name, elapsed))
+            step_stats.record(self.name, name, elapsed)
+            if elapsed > budget:
+                logger.warning(f"Browser flow '{self.name}' step '{name}' took {elapsed:.2f}s, over its {budget:.1f}s budget")
+
+    def wait(self, name: str, condition: Callable, budget: float):
+        """
+        Wait until a condition holds, for at most the step budget
+
+        Args:
+            name: Step name
+            condition: Selenium expected condition or callable taking the driver
+            budget: Seconds the step may take
+
+        Returns:
+            The condition's result
+
+        Raises:
+            StepBudgetExceededException: If the condition did not hold within the budget
+        """
+        with self.step(name, budget):
+            try:
+                return Wait(self.driver, budget, poll_frequency=0.1).until(condition)
+            except TimeoutException:
+                raise StepBudgetExceededException(self.name, name, budget)
+
+    @staticmethod
+    def pause(seconds: float):
+        """Fixed pause kept only for the legacy pacing (BROWSER_FAST_INTERACTIONS=false)"""
+        if not FAST_INTERACTIONS:
+            time.sleep(seconds)
+
+    def summary(self) -> str:
+        total = sum(elapsed for _, elapsed in self.timings)
+        steps = ", ".join(f"{name}={elapsed:.2f}s" for name, elapsed in self.timings)
+        return f"{total:.2f}s ({steps})"
+
+
+# Singleton instance
+step_stats = StepStats()
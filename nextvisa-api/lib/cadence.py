@@ -0,0 +1,116 @@
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CadencePolicy:
+    """
+    Adaptive, drift-free polling cadence around ConfigurationBase.sleep_time.
+
+    - Polls at ``fast_factor`` x base right after the days response changed
+      or when the monitoring window is about to close
+    - Stretches toward ``slow_factor`` x base while responses stay the same
+    - Backs off exponentially (up to ``max_backoff_factor`` x base) on errors
+
+    Fast polls are paid for with credit earned by slow ones, so the average
+    request rate never rises above one request per ``base_interval``. Ticks are
+    scheduled on absolute deadlines so request time does not push them later.
+    """
+
+    def __init__(self, base_interval: float, fast_factor: float = 0.5, slow_factor: float = 1.25,
+                 max_backoff_factor: float = 8.0, hot_ticks: int = 3, end_window: float = 300.0):
+        self.base_interval = base_interval
+        self.fast_factor = fast_factor
+        self.slow_factor = slow_factor
+        self.max_backoff_factor = max_backoff_factor
+        self.hot_ticks = hot_ticks
+        self.end_window = end_window
+        self.adaptive = os.getenv("ADAPTIVE_POLLING", "true").lower() == "true"
+
+        self.changes = 0
+        self.polls = 0
+        self.last_interval = base_interval
+        self._last_data: Any = None
+        self._ticks_since_change: Optional[int] = None
+        self._static_streak = 0
+        self._errors = 0
+        self._credit = 0.0
+        self._deadline: Optional[float] = None
+
+    def observe(self, data: Any, error: bool = False):
+        """
+        Record the outcome of one poll
+
+        Args:
+            data: Days response, or its hash
+            error: Whether the poll failed
+        """
+        self.polls += 1
+        if error:
+            self._errors += 1
+            return
+
+        self._errors = 0
+        if self._last_data is not None and data != self._last_data:
+            self.changes += 1
+            self._ticks_since_change = 0
+            self._static_streak = 0
+        else:
+            self._static_streak += 1
+            if self._ticks_since_change is not None:
+                self._ticks_since_change += 1
+        self._last_data = data
+
+    def next_delay(self, seconds_left: Optional[float] = None) -> float:
+        """
+        Seconds to wait before the next poll; the first call returns 0
+
+        Args:
+            seconds_left: Seconds until the monitoring window closes
+
+        Returns:
+            Delay in seconds until the next tick deadline
+        """
+        now = time.monotonic()
+        if self._deadline is None:
+            self._deadline = now
+            return 0.0
+
+        interval = self._next_interval(seconds_left)
+        self.last_interval = interval
+        self._deadline += interval
+
+        # A slow request must not turn into a burst of catch-up polls
+        if self._deadline < now:
+            self._deadline = now
+        return self._deadline - now
+
+    def _next_interval(self, seconds_left: Optional[float]) -> float:
+        base = self.base_interval
+        if not self.adaptive:
+            return base
+
+        if self._errors:
+            interval = min(base * (2 ** self._errors), base * self.max_backoff_factor)
+        elif self._is_hot() or (seconds_left is not None and seconds_left <= self.end_window):
+            fast = base * self.fast_factor
+            interval = fast if self._credit >= base - fast else base
+        else:
+            interval = min(base * (1 + 0.05 * self._static_streak), base * self.slow_factor)
+
+        self._credit = min(max(self._credit + interval - base, 0.0), base * 10)
+        return interval
+
+    def _is_hot(self) -> bool:
+        return self._ticks_since_change is not None and self._ticks_since_change < self.hot_ticks
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "polls": self.polls,
+            "changes": self.changes,
+            "last_interval": round(self.last_interval, 3),
+            "consecutive_errors": self._errors,
+        }
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import time
+from threading import Lock
+from typing import Awaitable, Dict, Optional
+
+from lib.exceptions import MonitorCancelledException
+
+logger = logging.getLogger(__name__)
+
+
+class CancellationToken:
+    """
+    Cooperative cancellation flag for one running re-schedule monitor.
+
+    ``cancel`` may be called from any thread. The monitor checks the token
+    between steps and awaits sleeps, snapshots and logins through ``guard`` so
+    a cancellation interrupts them right away instead of after a full tick.
+    """
+
+    def __init__(self, re_schedule_id: int):
+        self.re_schedule_id = re_schedule_id
+        self.reason: Optional[str] = None
+        self.requested_at: Optional[float] = None
+        self.finished = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._event: Optional[asyncio.Event] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    @property
+    def running(self) -> bool:
+        """Whether the monitor started (bound the token) and has not finished yet"""
+        return self._loop is not None and not self.finished
+
+    def bind(self):
+        """Attach the token to the monitor's running event loop"""
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+        if self.cancelled:
+            self._event.set()
+
+    def cancel(self, reason: str):
+        if self.cancelled:
+            return
+        self.reason = reason
+        self.requested_at = time.monotonic()
+        if self._loop:
+            try:
+                self._loop.call_soon_threadsafe(self._event.set)
+            except RuntimeError:
+                # The monitor's event loop already closed
+                pass
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise MonitorCancelledException(self.re_schedule_id, self.reason)
+
+    async def guard(self, awaitable: Awaitable):
+        """
+        Await a step, giving up on it as soon as the token is cancelled
+
+        Args:
+            awaitable: Step to await (sleep, snapshot wait, blocking call in a thread)
+
+        Returns:
+            The step result
+
+        Raises:
+            MonitorCancelledException: If the token was cancelled first
+        """
+        self.raise_if_cancelled()
+        step = asyncio.ensure_future(awaitable)
+        cancelled = asyncio.ensure_future(self._event.wait())
+        try:
+            await asyncio.wait({step, cancelled}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            cancelled.cancel()
+
+        if not step.done():
+            step.cancel()
+        self.raise_if_cancelled()
+        return step.result()
+
+
+class CancellationRegistry:
+    """Cancellation tokens of running monitors, keyed by re-schedule id"""
+
+    def __init__(self):
+        self._tokens: Dict[int, CancellationToken] = {}
+        self._lock = Lock()
+        self._cancelled = 0
+        self._latency_total = 0.0
+        self._latency_last: Optional[float] = None
+        self._latency_max = 0.0
+
+    def register(self, re_schedule_id: int) -> CancellationToken:
+        """
+        Create (or pick up a pre-cancelled) token for a starting monitor
+
+        Must be called from the monitor coroutine.
+        """
+        with self._lock:
+            token = self._tokens.get(re_schedule_id)
+            if not token or token.finished:
+                token = CancellationToken(re_schedule_id)
+                self._tokens[re_schedule_id] = token
+        token.bind()
+        return token
+
+    def cancel(self, re_schedule_id: int, reason: str, pending: bool = False) -> bool:
+        """
+        Request cancellation of a monitor
+
+        Args:
+            re_schedule_id: ID of the re-schedule
+            reason: Why the monitor is being stopped
+            pending: Also cancel a monitor that is queued but not started yet
+
+        Returns:
+            True if a token was cancelled
+        """
+        with self._lock:
+            token = self._tokens.get(re_schedule_id)
+            if not token and pending:
+                token = CancellationToken(re_schedule_id)
+                self._tokens[re_schedule_id] = token
+
+        if not token or token.finished or token.cancelled:
+            return False
+
+        logger.info(f"Cancelling monitor for re-schedule {re_schedule_id}: {reason}")
+        token.cancel(reason)
+        return True
+
+    def finish(self, token: CancellationToken):
+        """Mark the monitor as done; later cancel requests are ignored"""
+        token.finished = True
+
+    def release(self, token: CancellationToken):
+        """Forget a monitor after it freed its resources and record cancel latency"""
+        token.finished = True
+        with self._lock:
+            if self._tokens.get(token.re_schedule_id) is token:
+                del self._tokens[token.re_schedule_id]
+
+            if token.requested_at is not None:
+                latency = time.monotonic() - token.requested_at
+                self._cancelled += 1
+                self._latency_total += latency
+                self._latency_last = latency
+                self._latency_max = max(self._latency_max, latency)
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            return {
+                "active": sum(1 for token in self._tokens.values() if token.running),
+                "cancelled": self._cancelled,
+                "latency_last_seconds": round(self._latency_last, 3) if self._latency_last is not None else None,
+                "latency_avg_seconds": round(self._latency_total / self._cancelled, 3) if self._cancelled else None,
+                "latency_max_seconds": round(self._latency_max, 3),
+            }
+
+
+# Singleton instance
+cancellations = CancellationRegistry()
@@ -0,0 +1,110 @@
+import logging
+import os
+from bisect import bisect_left, bisect_right
+from datetime import date
+from typing import Any, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# In-window dates whose times are fetched together when dates show up
+CANDIDATE_DATES = int(os.getenv("CANDIDATE_DATES", "3"))
+
+
+class DateWindow(NamedTuple):
+    """An applicant's acceptable dates as inclusive proleptic ordinals"""
+    first: int
+    last: int
+
+    @classmethod
+    def compile(cls, applicant: dict) -> "DateWindow":
+        """
+        Build the window once from the applicant's min_date and max_date
+
+        Args:
+            applicant: Applicant with min_date and max_date (YYYY-MM-DD)
+
+        Returns:
+            DateWindow
+
+        Raises:
+            ValueError: If a boundary is missing or not a date
+        """
+        min_date = applicant.get('min_date')
+        max_date = applicant.get('max_date')
+        if not min_date or not max_date:
+            raise ValueError(f"Applicant {applicant.get('id')} missing date boundaries")
+        return cls(date.fromisoformat(str(min_date)[:10]).toordinal(), date.fromisoformat(str(max_date)[:10]).toordinal())
+
+
+def days_list(data: Any) -> Optional[List[Any]]:
+    """
+    Entries of a days.json response, which is a list or a dict holding one
+
+    Returns:
+        The entries, or None if the response has an unexpected format
+    """
+    if isinstance(data, dict):
+        return data.get('available_dates') or data.get('dates') or []
+    if isinstance(data, list):
+        return data
+    return None
+
+
+class DaysIndex:
+    """
+    One days list parsed to sorted ordinals, shared by every window matched against it.
+
+    Parsing happens once per distinct list; a window lookup is two binary
+    searches, independent of how many applicants are matched.
+    """
+
+    def __init__(self, entries: List[Any]):
+        parsed = {}
+        for entry in entries:
+            value = entry.get('date') if isinstance(entry, dict) else entry
+            try:
+                parsed[date.fromisoformat(str(value)[:10]).toordinal()] = str(value)[:10]
+            except (TypeError, ValueError):
+                logger.warning(f"Ignoring unexpected days entry: {entry}")
+        self.ordinals = sorted(parsed)
+        self.dates = [parsed[ordinal] for ordinal in self.ordinals]
+
+    def __len__(self) -> int:
+        return len(self.ordinals)
+
+    def candidates(self, window: DateWindow, limit: int = CANDIDATE_DATES) -> List[str]:
+        """
+        Dates inside a window, earliest (most preferred) first
+
+        Args:
+            window: Applicant window
+            limit: Maximum number of dates to return
+
+        Returns:
+            Up to ``limit`` dates as YYYY-MM-DD strings
+        """
+        start = bisect_left(self.ordinals, window.first)
+        end = min(bisect_right(self.ordinals, window.last), start + max(limit, 1))
+        return self.dates[start:end]
+
+    def match_all(self, windows: Dict[int, DateWindow], limit: int = CANDIDATE_DATES) -> Dict[int, List[str]]:
+        """
+        Resolve the candidate dates of many applicants against this list at once
+
+        Applicants with the same window share one lookup.
+
+        Args:
+            windows: Window per re-schedule id
+            limit: Maximum number of dates per applicant
+
+        Returns:
+            Candidate dates per re-schedule id, empty when nothing is in the window
+        """
+        resolved: Dict[DateWindow, List[str]] = {}
+        matches = {}
+        for key, window in windows.items():
+            found = resolved.get(window)
+            if found is None:
+                found = resolved[window] = self.candidates(window, limit)
+            matches[key] = found
+        return matches
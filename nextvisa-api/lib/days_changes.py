@@ -0,0 +1,139 @@
+import hashlib
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+FacilityKey = Tuple[str, str]
+
+
+class DaysTracker:
+    """
+    Conditional requests and change detection for a days.json poller.
+
+    Sends ``If-None-Match`` / ``If-Modified-Since`` once the portal returned
+    an ETag or Last-Modified for the URL; a 304 reuses the cached days list.
+    A 200 is identified by a hash of its body, so an unchanged list is
+    recognised, and not parsed again, even when the portal sends no
+    validators. Every response is counted in ``days_changes`` for the
+    facility.
+    """
+
+    def __init__(self, facility: FacilityKey):
+        self.facility = facility
+        self.url: Optional[str] = None
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.digest: Optional[str] = None
+        self.data: Any = None
+
+    def request_headers(self, url: str) -> Dict[str, str]:
+        """Validators to send with a request for ``url``; none for a URL the tracker has no response for"""
+        if url != self.url:
+            return {}
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def update(self, response: httpx.Response) -> Any:
+        """
+        Take a days.json response
+
+        Args:
+            response: 200 or 304 response of the days URL
+
+        Returns:
+            The days list, the cached one when the portal answered 304 or sent the same body
+
+        Raises:
+            ValueError: If the response is not JSON, or a 304 arrived with nothing cached
+        """
+        if response.status_code == 304:
+            if self.digest is None:
+                raise ValueError("Not modified, but no days list is cached")
+            days_changes.record(self.facility, self.digest, not_modified=True)
+            return self.data
+
+        digest = hashlib.sha1(response.content).hexdigest()
+        if digest != self.digest:
+            self.data = response.json()
+            self.digest = digest
+        self.url = str(response.request.url)
+        self.etag = response.headers.get("etag")
+        self.last_modified = response.headers.get("last-modified")
+        days_changes.record(self.facility, digest)
+        return self.data
+
+
+class FacilityChanges:
+    """How often the days list of each facility changes, from every poll made by this node"""
+
+    def __init__(self, window: int = 50):
+        self._window = window
+        self._facilities: Dict[FacilityKey, Dict[str, Any]] = {}
+        self._lock = Lock()
+
+    def record(self, facility: FacilityKey, digest: str, not_modified: bool = False):
+        """
+        Count one days response
+
+        Monitors of a facility that poll on their own all report here; a change
+        is counted once, by the first poll that sees the new list.
+
+        Args:
+            facility: (base_url, facility id)
+            digest: Hash of the days list
+            not_modified: Whether the portal answered 304
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._facilities.get(facility)
+            if entry is None:
+                entry = {
+                    "digest": None, "since": now, "polls": 0, "not_modified": 0, "unchanged": 0,
+                    "changes": 0, "change_times": deque(maxlen=self._window),
+                }
+                self._facilities[facility] = entry
+            entry["polls"] += 1
+            if not_modified:
+                entry["not_modified"] += 1
+            elif digest == entry["digest"]:
+                entry["unchanged"] += 1
+            else:
+                # The first list seen is where counting starts, not a change
+                if entry["digest"] is not None:
+                    entry["changes"] += 1
+                    entry["change_times"].append(now)
+                entry["digest"] = digest
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            facilities = {key: dict(entry, change_times=list(entry["change_times"])) for key, entry in self._facilities.items()}
+
+        result = {}
+        for (base_url, facility), entry in facilities.items():
+            times = entry["change_times"]
+            hours = (time.time() - entry["since"]) / 3600
+            result[f"{base_url}#{facility}"] = {
+                "polls": entry["polls"],
+                "not_modified": entry["not_modified"],
+                "unchanged": entry["unchanged"],
+                "changes": entry["changes"],
+                "changes_per_hour": round(entry["changes"] / hours, 2) if hours > 0 else None,
+                "mean_seconds_between_changes": round((times[-1] - times[0]) / (len(times) - 1), 1) if len(times) > 1 else None,
+                "last_change_at": datetime.fromtimestamp(times[-1]).isoformat() if times else None,
+            }
+        return result
+
+
+# Singleton instance
+days_changes = FacilityChanges()
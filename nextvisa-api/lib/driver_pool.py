@@ -0,0 +1,289 @@
+import logging
+import os
+import time
+from contextlib import contextmanager
+from threading import Condition, Event, Thread
+from typing import Any, Dict, List, Optional
+
+from lib.exceptions import DriverPoolExhaustedException
+from lib.webdriver import get_driver
+from lib.grid_admission import grid_admission
+
+logger = logging.getLogger(__name__)
+
+
+class PooledDriver:
+    """A Selenium session owned by the pool, with its age and use count"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.created_at = time.monotonic()
+        self.uses = 0
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.created_at
+
+
+class DriverPool:
+    """
+    Pool of pre-started Selenium sessions for short browser tasks.
+
+    Credential tests borrow a session with ``session()`` instead of paying for
+    a new Chrome on the hub every time. Returned sessions have their cookies
+    and web storage wiped before the next borrower gets them, and a session is
+    retired once it is older than ``max_age`` seconds, has served ``max_uses``
+    borrowers or fails a health check. A maintenance thread checks idle
+    sessions (which also keeps the hub from timing them out) and keeps
+    ``min_idle`` of them ready.
+
+    Long running monitors keep their own sessions through get_driver().
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("DRIVER_POOL_ENABLED", "true").lower() == "true"
+        self.max_size = int(os.getenv("DRIVER_POOL_MAX_SIZE", "3"))
+        self.min_idle = int(os.getenv("DRIVER_POOL_MIN_IDLE", "1"))
+        self.max_age = float(os.getenv("DRIVER_POOL_MAX_AGE_SECONDS", "900"))
+        self.max_uses = int(os.getenv("DRIVER_POOL_MAX_USES", "20"))
+        self.acquire_timeout = float(os.getenv("DRIVER_POOL_ACQUIRE_TIMEOUT", "60"))
+        self.check_interval = float(os.getenv("DRIVER_POOL_CHECK_SECONDS", "60"))
+
+        self._idle: List[PooledDriver] = []
+        # Sessions that exist or are being created: idle + borrowed + starting
+        self._size = 0
+        self._cond = Condition()
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+
+        self._created = 0
+        self._reused = 0
+        self._retired = 0
+        self._health_failures = 0
+
+    def start(self):
+        """Start the maintenance thread that pre-starts and checks idle sessions"""
+        if not self.enabled or (self._thread and self._thread.is_alive()):
+            return
+
+        self._stop.clear()
+        self._thread = Thread(target=self._maintain, name="driver-pool", daemon=True)
+        self._thread.start()
+        logger.info(f"Driver pool started (max size: {self.max_size}, min idle: {self.min_idle})")
+
+    def shutdown(self):
+        self._stop.set()
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            self._retire(pooled, "pool shutdown")
+
+    @contextmanager
+    def session(self, timeout: Optional[float] = None):
+        """
+        Borrow a clean Selenium session for the duration of the block
+
+        Args:
+            timeout: Seconds to wait for a free session, defaults to DRIVER_POOL_ACQUIRE_TIMEOUT
+
+        Yields:
+            Selenium WebDriver instance
+
+        Raises:
+            DriverPoolExhaustedException: If no session became available in time
+            Exception: If a session could not be created
+        """
+        if not self.enabled:
+            with self._cond:
+                self._size += 1
+            driver = None
+            try:
+                driver = get_driver()
+                yield driver
+            finally:
+                if driver:
+                    self._quit(driver)
+                with self._cond:
+                    self._size -= 1
+            return
+
+        pooled = self.acquire(timeout)
+        try:
+            yield pooled.driver
+        finally:
+            self.release(pooled)
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledDriver:
+        """
+        Take a healthy session from the pool, starting one if there is room
+
+        Args:
+            timeout: Seconds to wait for a free session
+
+        Returns:
+            The borrowed session; hand it back with release()
+
+        Raises:
+            DriverPoolExhaustedException: If no session became available in time
+            Exception: If a session could not be created
+        """
+        wait_limit = timeout if timeout is not None else self.acquire_timeout
+        deadline = time.monotonic() + wait_limit
+        while True:
+            with self._cond:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise DriverPoolExhaustedException(self.max_size, wait_limit)
+                    self._cond.wait(remaining)
+
+                pooled = self._idle.pop() if self._idle else None
+                if not pooled:
+                    self._size += 1
+
+            if not pooled:
+                return self._create()
+
+            if self._expired(pooled):
+                self._retire(pooled, "expired")
+            elif not self._is_healthy(pooled):
+                self._health_failures += 1
+                self._retire(pooled, "failed health check")
+            else:
+                with self._cond:
+                    self._reused += 1
+                return pooled
+
+    def release(self, pooled: PooledDriver):
+        """
+        Return a borrowed session; it is wiped and reused or retired
+
+        Args:
+            pooled: Session obtained from acquire()
+        """
+        pooled.uses += 1
+        if self._expired(pooled):
+            self._retire(pooled, "expired")
+            return
+        if not self._reset(pooled):
+            self._retire(pooled, "reset failed")
+            return
+
+        with self._cond:
+            self._idle.append(pooled)
+            self._cond.notify()
+
+    def _create(self) -> PooledDriver:
+        """Start a new session; the caller must already have reserved its slot in _size"""
+        try:
+            pooled = PooledDriver(get_driver())
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._created += 1
+        return pooled
+
+    def _expired(self, pooled: PooledDriver) -> bool:
+        return pooled.age >= self.max_age or pooled.uses >= self.max_uses
+
+    @staticmethod
+    def _is_healthy(pooled: PooledDriver) -> bool:
+        try:
+            return pooled.driver.execute_script("return 1;") == 1
+        except Exception as e:
+            logger.warning(f"Pooled Selenium session is not responding: {e}")
+            return False
+
+    @staticmethod
+    def _reset(pooled: PooledDriver) -> bool:
+        """Wipe cookies and web storage left by the previous borrower"""
+        driver = pooled.driver
+        try:
+            # Cookies and storage can only be cleared for the origin the browser is on
+            if driver.current_url.startswith("http"):
+                driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+                driver.delete_all_cookies()
+            driver.get("about:blank")
+            return True
+        except Exception as e:
+            logger.warning(f"Could not reset pooled Selenium session: {e}")
+            return False
+
+    def _retire(self, pooled: PooledDriver, reason: str):
+        logger.info(f"Retiring pooled Selenium session ({reason}, age: {pooled.age:.0f}s, uses: {pooled.uses})")
+        self._quit(pooled.driver)
+        with self._cond:
+            self._retired += 1
+            self._size -= 1
+            self._cond.notify()
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.warning(f"Error quitting pooled Selenium session: {e}")
+        grid_admission.released()
+
+    def _maintain(self):
+        while not self._stop.is_set():
+            try:
+                self._check_idle()
+                self._fill()
+            except Exception as e:
+                logger.error(f"Driver pool maintenance failed: {e}")
+            self._stop.wait(self.check_interval)
+
+    def _check_idle(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+
+        healthy = []
+        for pooled in idle:
+            if self._expired(pooled):
+                self._retire(pooled, "expired")
+            elif not self._is_healthy(pooled):
+                self._health_failures += 1
+                self._retire(pooled, "failed health check")
+            else:
+                healthy.append(pooled)
+
+        with self._cond:
+            self._idle.extend(healthy)
+            self._cond.notify(len(healthy))
+
+    def _fill(self):
+        while not self._stop.is_set():
+            with self._cond:
+                if len(self._idle) >= self.min_idle or self._size >= self.max_size:
+                    return
+                self._size += 1
+
+            pooled = self._create()
+            with self._cond:
+                self._idle.append(pooled)
+                self._cond.notify()
+            logger.info(f"Pre-started pooled Selenium session ({self._size}/{self.max_size})")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            idle, size = len(self._idle), self._size
+        return {
+            "enabled": self.enabled,
+            "max_size": self.max_size,
+            "size": size,
+            "idle": idle,
+            "in_use": size - idle,
+            "created": self._created,
+            "reused": self._reused,
+            "retired": self._retired,
+            "health_failures": self._health_failures,
+        }
+
+
+# Singleton instance
+driver_pool = DriverPool()
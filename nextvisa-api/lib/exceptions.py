@@ -25,3 +25,79 @@ class DatabaseException(Exception):
         if details:
             self.message += f": {details}"
         super().__init__(self.message)
+
+
+class SchedulerQueueFullException(Exception):
+    """Raised when a scheduler stage cannot accept more queued work"""
+    def __init__(self, stage: str, max_queue: int):
+        self.stage = stage
+        self.max_queue = max_queue
+        self.message = f"Scheduler stage '{stage}' queue is full ({max_queue} pending)"
+        super().__init__(self.message)
+
+
+class MonitorCancelledException(Exception):
+    """Raised inside a running re-schedule monitor when it has been cancelled"""
+    def __init__(self, re_schedule_id: int, reason: str):
+        self.re_schedule_id = re_schedule_id
+        self.reason = reason
+        self.message = f"Re-schedule {re_schedule_id} monitor cancelled: {reason}"
+        super().__init__(self.message)
+
+
+class PortalLoginException(Exception):
+    """Raised when logging in to the visa portal over HTTP fails"""
+    def __init__(self, email: str, reason: str, invalid_credentials: bool = False):
+        self.email = email
+        self.reason = reason
+        self.invalid_credentials = invalid_credentials
+        self.message = f"Portal login failed for {email}: {reason}"
+        super().__init__(self.message)
+
+
+class PortalSessionExpiredException(Exception):
+    """Raised when a portal data call is answered as if the session had ended"""
+    def __init__(self, url: str, status_code: int):
+        self.url = url
+        self.status_code = status_code
+        self.message = f"Portal session expired (status: {status_code}, url: {url})"
+        super().__init__(self.message)
+
+
+class StepBudgetExceededException(Exception):
+    """Raised when a browser interaction step does not complete within its latency budget"""
+    def __init__(self, flow: str, step: str, budget: float):
+        self.flow = flow
+        self.step = step
+        self.budget = budget
+        self.message = f"Browser flow '{flow}' step '{step}' did not complete within {budget:.1f}s"
+        super().__init__(self.message)
+
+
+class GridCapacityException(Exception):
+    """Raised when no Selenium grid slot became free within the caller's wait limit"""
+    def __init__(self, kind: str, position: int, eta_seconds: float | None):
+        self.kind = kind
+        self.position = position
+        self.eta_seconds = eta_seconds
+        eta = f"~{eta_seconds:.0f}s" if eta_seconds is not None else "unknown"
+        self.message = f"Selenium grid is full: {kind} request is number {position} in queue, estimated wait {eta}"
+        super().__init__(self.message)
+
+
+class DriverPoolExhaustedException(Exception):
+    """Raised when no pooled Selenium session became free within the wait limit"""
+    def __init__(self, max_size: int, waited: float):
+        self.max_size = max_size
+        self.waited = waited
+        self.message = f"No Selenium session available after waiting {waited:.0f}s (pool size: {max_size})"
+        super().__init__(self.message)
+
+
+class PortalUnavailableException(Exception):
+    """Raised instead of sending a portal request while the host's circuit breaker is open"""
+    def __init__(self, host: str, retry_in: float):
+        self.host = host
+        self.retry_in = retry_in
+        self.message = f"Portal {host} is unavailable, circuit breaker open (retry in ~{retry_in:.0f}s)"
+        super().__init__(self.message)
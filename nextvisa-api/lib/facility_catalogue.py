@@ -0,0 +1,131 @@
+import logging
+import os
+import time
+from html.parser import HTMLParser
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Facility monitored for applicants that did not choose any (Tegucigalpa)
+DEFAULT_FACILITY_ID = os.getenv("DEFAULT_FACILITY_ID", "143")
+CATALOGUE_TTL_SECONDS = float(os.getenv("FACILITY_CATALOGUE_TTL_SECONDS", "86400"))
+
+FACILITY_SELECT_ID = "appointments_consulate_appointment_facility_id"
+
+
+class _FacilityParser(HTMLParser):
+    """Collects the options of the appointment form's facility select"""
+
+    def __init__(self):
+        super().__init__()
+        self.facilities: Dict[str, str] = {}
+        self._in_select = False
+        self._option: Optional[str] = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "select":
+            self._in_select = attrs.get("id") == FACILITY_SELECT_ID
+        elif tag == "option" and self._in_select and attrs.get("value"):
+            self._option = attrs["value"]
+            self.facilities[self._option] = ""
+
+    def handle_data(self, data):
+        if self._option and data.strip():
+            self.facilities[self._option] += data.strip()
+
+    def handle_endtag(self, tag):
+        if tag == "option":
+            self._option = None
+        elif tag == "select":
+            self._in_select = False
+
+
+def parse_facilities(html: str) -> Dict[str, str]:
+    """
+    Facilities offered by the appointment page
+
+    Args:
+        html: Appointment page HTML
+
+    Returns:
+        Facility name by facility id, empty if the page has no facility select
+    """
+    parser = _FacilityParser()
+    parser.feed(html)
+    return parser.facilities
+
+
+def parse_facility_ids(value: Optional[str]) -> List[str]:
+    """
+    Facility ids an applicant is monitored at, most preferred first
+
+    Args:
+        value: Applicant's comma separated facilities, None or empty for the default
+
+    Returns:
+        Distinct facility ids
+    """
+    ids = []
+    for item in (value or "").split(","):
+        item = item.strip()
+        if item and item not in ids:
+            ids.append(item)
+    return ids or [DEFAULT_FACILITY_ID]
+
+
+class FacilityCatalogue:
+    """
+    Facilities of each portal (base_url), cached for FACILITY_CATALOGUE_TTL_SECONDS.
+
+    Filled from the appointment pages monitors load anyway for the booking
+    form, so keeping it current costs no portal requests of its own.
+    """
+
+    def __init__(self):
+        self._catalogues: Dict[str, Dict[str, Any]] = {}
+        self._lock = Lock()
+
+    def update(self, base_url: str, facilities: Dict[str, str]):
+        if not facilities:
+            return
+        with self._lock:
+            previous = self._catalogues.get(base_url, {}).get("facilities")
+            self._catalogues[base_url] = {"facilities": dict(facilities), "refreshed_at": time.monotonic()}
+        if previous != facilities:
+            logger.info(f"Facility catalogue of {base_url}: {', '.join(f'{name} ({facility_id})' for facility_id, name in facilities.items())}")
+
+    def get(self, base_url: str) -> Optional[Dict[str, str]]:
+        """Facility name by id, None if the catalogue of this portal is unknown or expired"""
+        with self._lock:
+            entry = self._catalogues.get(base_url)
+            if not entry or time.monotonic() - entry["refreshed_at"] > CATALOGUE_TTL_SECONDS:
+                return None
+            return dict(entry["facilities"])
+
+    def name(self, base_url: str, facility_id: str) -> str:
+        """Facility name for logs, the id while the catalogue is unknown"""
+        facilities = self.get(base_url) or {}
+        return f"{facilities[facility_id]} ({facility_id})" if facilities.get(facility_id) else facility_id
+
+    def unknown(self, base_url: str, facility_ids: List[str]) -> List[str]:
+        """Ids the portal does not offer; empty while the catalogue is unknown"""
+        facilities = self.get(base_url)
+        if facilities is None:
+            return []
+        return [facility_id for facility_id in facility_ids if facility_id not in facilities]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                base_url: {
+                    "facilities": entry["facilities"],
+                    "age_seconds": round(time.monotonic() - entry["refreshed_at"], 1),
+                }
+                for base_url, entry in self._catalogues.items()
+            }
+
+
+# Singleton instance
+facility_catalogue = FacilityCatalogue()
@@ -0,0 +1,420 @@
+import asyncio
+import itertools
+import logging
+import os
+import random
+import time
+from collections import deque
+from threading import Condition
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import httpx
+
+from lib.exceptions import GridCapacityException
+
+logger = logging.getLogger(__name__)
+
+# Lower value is served first
+PRIORITY_MONITOR = 0
+PRIORITY_CREDENTIAL_TEST = 1
+
+PRIORITY_NAMES = {PRIORITY_MONITOR: "monitor", PRIORITY_CREDENTIAL_TEST: "credential_test"}
+
+# How often an event loop waiter re-checks the queue; threads are woken by the condition instead
+ASYNC_POLL_SECONDS = 0.5
+
+
+class HubState:
+    """Local view of one Selenium hub: free slots, session start latency and health"""
+
+    def __init__(self, address: str, weight: float):
+        self.address = address
+        self.weight = weight
+
+        self.total: Optional[int] = None
+        self.free = 0
+        self.creating = 0
+        self.refreshed_at = 0.0
+        self.refreshing = False
+        self.last_busy: Optional[int] = None
+
+        # Moving average of webdriver.Remote() time
+        self.latency: Optional[float] = None
+        self.sessions = 0
+        self.failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+
+    @property
+    def ejected(self) -> bool:
+        return time.monotonic() < self.ejected_until
+
+    def fresh(self, ttl: float) -> bool:
+        return time.monotonic() - self.refreshed_at < ttl
+
+    def has_capacity(self) -> bool:
+        # A hub whose /status cannot be parsed is let through, the hub itself queues the request
+        return self.total is None or self.free > 0
+
+    def cost(self, latency_reference: float) -> float:
+        """Load per unit of weight, inflated by slow session starts; the lowest cost gets the next session"""
+        if self.total:
+            load = (self.total - self.free + 1) / self.total
+        else:
+            load = self.creating + 1
+        cost = load / self.weight
+        if self.latency is not None:
+            cost *= 1 + self.latency / latency_reference
+        return cost
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "address": self.address,
+            "weight": self.weight,
+            "healthy": not self.ejected,
+            "ejected_for_seconds": round(max(self.ejected_until - time.monotonic(), 0), 1),
+            "total_slots": self.total,
+            "free_slots": self.free if self.total is not None else None,
+            "creating": self.creating,
+            "session_start_seconds": round(self.latency, 2) if self.latency is not None else None,
+            "sessions": self.sessions,
+            "failures": self.failures,
+        }
+
+
+class GridAdmission:
+    """
+    Admission queue and hub selection in front of Selenium session creation.
+
+    Keeps a local view of the free slots of every configured hub, refreshed
+    from each hub's ``/status`` while someone is waiting, and hands slots out
+    by priority: monitors by how close their start_datetime is, then
+    credential tests in arrival order. A granted request goes to the hub with
+    the lowest load per unit of weight, penalised by its recent session start
+    time. A caller that cannot get a slot within its timeout gets a
+    GridCapacityException with its queue position and an ETA estimated from
+    how fast slots have been freeing up, instead of a hub-side timeout.
+
+    Hubs that fail ``eject_failures`` session starts or status reads in a row
+    are ejected for ``eject_seconds`` (doubling on every repeat); after that a
+    single failure ejects them again, a success restores them.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("GRID_ADMISSION", "true").lower() == "true"
+        self.status_ttl = float(os.getenv("GRID_STATUS_TTL_SECONDS", "2"))
+        self.default_timeout = float(os.getenv("GRID_ADMISSION_TIMEOUT", "60"))
+        self.eject_failures = int(os.getenv("HUB_EJECT_FAILURES", "3"))
+        self.eject_seconds = float(os.getenv("HUB_EJECT_SECONDS", "30"))
+        self.latency_reference = float(os.getenv("HUB_LATENCY_REFERENCE_SECONDS", "10"))
+
+        self._cond = Condition()
+        self._hubs: Dict[str, HubState] = {}
+        self._queue: List[Tuple[int, float, int]] = []
+        self._sequence = itertools.count()
+        self._releases: Deque[Tuple[float, int]] = deque()
+
+        self._granted = 0
+        self._rejected = 0
+
+    def acquire(self, hubs: List[Tuple[str, float]], priority: int, due: Optional[float] = None,
+                timeout: Optional[float] = None, should_abort: Optional[Callable[[], bool]] = None) -> str:
+        """
+        Block until a hub has a free slot for a new session
+
+        Call created() once the session creation attempt finished.
+
+        Args:
+            hubs: Configured (address, weight) pairs
+            priority: PRIORITY_MONITOR or PRIORITY_CREDENTIAL_TEST
+            due: Epoch seconds the session is needed by (start_datetime for monitors)
+            timeout: Maximum seconds to wait, defaults to GRID_ADMISSION_TIMEOUT
+            should_abort: Checked while waiting; stop waiting when it returns True
+
+        Returns:
+            Address of the hub to create the session on
+
+        Raises:
+            GridCapacityException: If no slot became free in time
+        """
+        address, entry, deadline = self._enqueue(hubs, priority, due, timeout)
+        if address:
+            return address
+
+        try:
+            while True:
+                self._refresh_stale()
+                with self._cond:
+                    address = self._try_grant(entry, deadline, should_abort)
+                    if address:
+                        return address
+                    self._cond.wait(min(deadline - time.monotonic(), self.status_ttl))
+        except BaseException:
+            self._dequeue(entry)
+            raise
+
+    async def acquire_async(self, hubs: List[Tuple[str, float]], priority: int, due: Optional[float] = None,
+                            timeout: Optional[float] = None, should_abort: Optional[Callable[[], bool]] = None) -> str:
+        """
+        ``acquire`` for the event loop: waits in the same queue without holding a thread
+
+        Monitors may wait for a slot for their whole window, a thread held that long
+        would starve every other ``asyncio.to_thread`` call on the loop.
+        """
+        address, entry, deadline = self._enqueue(hubs, priority, due, timeout)
+        if address:
+            return address
+
+        try:
+            while True:
+                if self._has_stale():
+                    await asyncio.to_thread(self._refresh_stale)
+                with self._cond:
+                    address = self._try_grant(entry, deadline, should_abort)
+                    if address:
+                        return address
+                    wait = min(deadline - time.monotonic(), ASYNC_POLL_SECONDS)
+                await asyncio.sleep(wait)
+        except BaseException:
+            self._dequeue(entry)
+            raise
+
+    def _enqueue(self, hubs: List[Tuple[str, float]], priority: int, due: Optional[float],
+                 timeout: Optional[float]) -> Tuple[Optional[str], Optional[Tuple[int, float, int]], float]:
+        """Queue a request; with admission disabled the hub is picked right away instead"""
+        with self._cond:
+            self._configure(hubs)
+            if not self.enabled:
+                return self._pick_weighted().address, None, 0.0
+
+            deadline = time.monotonic() + (timeout if timeout is not None else self.default_timeout)
+            entry = (priority, due if due is not None else time.time(), next(self._sequence))
+            self._queue.append(entry)
+            self._queue.sort()
+            return None, entry, deadline
+
+    def _try_grant(self, entry: Tuple[int, float, int], deadline: float,
+                   should_abort: Optional[Callable[[], bool]]) -> Optional[str]:
+        """
+        Hand a slot to a queued request if it is first in line, called with the lock held
+
+        Raises:
+            GridCapacityException: If the request timed out or was aborted
+        """
+        # Decide on fresh statuses only; while another waiter is reading one, wait for the result
+        hub = self._select() if self._queue[0] == entry else None
+        if hub:
+            self._queue.pop(0)
+            hub.free -= 1
+            hub.creating += 1
+            self._granted += 1
+            self._cond.notify_all()
+            return hub.address
+
+        if deadline - time.monotonic() <= 0 or (should_abort and should_abort()):
+            position = self._queue.index(entry) + 1
+            self._rejected += 1
+            raise GridCapacityException(PRIORITY_NAMES[entry[0]], position, self._eta(position))
+        return None
+
+    def _dequeue(self, entry: Tuple[int, float, int]):
+        with self._cond:
+            if entry in self._queue:
+                self._queue.remove(entry)
+                self._cond.notify_all()
+
+    def created(self, hub_address: str, seconds: float, success: bool):
+        """
+        Record the outcome of a granted session start; the hub status reflects it from now on
+
+        Args:
+            hub_address: Hub returned by acquire()
+            seconds: Time webdriver.Remote() took
+            success: Whether the session was created
+        """
+        with self._cond:
+            hub = self._hubs.get(hub_address)
+            if not hub:
+                return
+            if self.enabled:
+                hub.creating = max(hub.creating - 1, 0)
+                hub.refreshed_at = 0.0
+            if success:
+                hub.sessions += 1
+                hub.latency = seconds if hub.latency is None else 0.7 * hub.latency + 0.3 * seconds
+                self._record_success(hub)
+            else:
+                self._record_failure(hub, "session start failed")
+            self._cond.notify_all()
+
+    def released(self):
+        """A session was quit; re-read the hub statuses on the next request"""
+        if not self.enabled:
+            return
+        with self._cond:
+            for hub in self._hubs.values():
+                hub.refreshed_at = 0.0
+            self._cond.notify_all()
+
+    def estimate(self, priority: int) -> Optional[float]:
+        """ETA in seconds for a new request of this priority, 0 if a slot is free now"""
+        with self._cond:
+            ahead = sum(1 for entry in self._queue if entry[0] <= priority)
+            healthy = [hub for hub in self._hubs.values() if not hub.ejected]
+            if any(hub.total is None for hub in healthy) or sum(hub.free for hub in healthy) - ahead > 0:
+                return 0.0
+            return self._eta(ahead + 1)
+
+    def _configure(self, hubs: List[Tuple[str, float]]):
+        """Follow configuration changes, keeping the state of hubs that stay"""
+        configured = dict(hubs)
+        for address in list(self._hubs):
+            if address not in configured:
+                del self._hubs[address]
+        for address, weight in configured.items():
+            hub = self._hubs.get(address)
+            if hub:
+                hub.weight = weight
+            else:
+                self._hubs[address] = HubState(address, weight)
+
+    def _select(self) -> Optional[HubState]:
+        candidates = [
+            hub for hub in self._hubs.values()
+            if not hub.ejected and hub.fresh(self.status_ttl) and hub.has_capacity()
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda hub: hub.cost(self.latency_reference))
+
+    def _pick_weighted(self) -> HubState:
+        """Admission disabled: spread sessions over the healthy hubs by weight"""
+        healthy = [hub for hub in self._hubs.values() if not hub.ejected] or list(self._hubs.values())
+        return random.choices(healthy, weights=[hub.weight for hub in healthy])[0]
+
+    def _record_success(self, hub: HubState):
+        if hub.ejections:
+            logger.info(f"Selenium hub {hub.address} is healthy again")
+        hub.failures = 0
+        hub.ejections = 0
+
+    def _record_failure(self, hub: HubState, reason: str):
+        hub.failures += 1
+        # Right after an ejection ends one more failure is enough to eject the hub again
+        if hub.failures < self.eject_failures and not hub.ejections:
+            return
+        hub.ejections += 1
+        seconds = min(self.eject_seconds * 2 ** (hub.ejections - 1), 600.0)
+        hub.ejected_until = time.monotonic() + seconds
+        hub.failures = 0
+        logger.warning(f"Ejecting Selenium hub {hub.address} for {seconds:.0f}s: {reason}")
+
+    def _eta(self, position: int) -> Optional[float]:
+        """Seconds until ``position`` slots free up at the recently observed release rate"""
+        window = 900.0
+        now = time.monotonic()
+        while self._releases and now - self._releases[0][0] > window:
+            self._releases.popleft()
+        released = sum(count for _, count in self._releases)
+        if not released:
+            return None
+        return position * window / released
+
+    def _has_stale(self) -> bool:
+        with self._cond:
+            return any(
+                not hub.ejected and not hub.refreshing and not hub.fresh(self.status_ttl)
+                for hub in self._hubs.values()
+            )
+
+    def _refresh_stale(self):
+        with self._cond:
+            stale = [
+                hub for hub in self._hubs.values()
+                if not hub.ejected and not hub.refreshing and not hub.fresh(self.status_ttl)
+            ]
+            for hub in stale:
+                hub.refreshing = True
+
+        for hub in stale:
+            try:
+                status = self._read_status(hub.address)
+                reachable = True
+            except httpx.TransportError as e:
+                logger.warning(f"Could not reach Selenium hub {hub.address}: {e}")
+                status, reachable = None, False
+
+            with self._cond:
+                hub.refreshing = False
+                hub.refreshed_at = time.monotonic()
+                if not reachable:
+                    # No slots until it answers again, unlike a hub whose status is just unreadable
+                    hub.total = 0
+                    hub.free = 0
+                    self._record_failure(hub, "status unreachable")
+                elif status is None:
+                    hub.total = None
+                else:
+                    total, busy = status
+                    if hub.last_busy is not None and busy < hub.last_busy:
+                        self._releases.append((hub.refreshed_at, hub.last_busy - busy))
+                    hub.last_busy = busy
+                    hub.total = total
+                    # Sessions we admitted that the hub does not show yet still take a slot
+                    hub.free = total - busy - hub.creating
+                self._cond.notify_all()
+
+    @staticmethod
+    def _read_status(hub_address: str) -> Optional[Tuple[int, int]]:
+        """
+        Total and busy slots of the UP nodes, or None if the status cannot be interpreted
+
+        Raises:
+            httpx.TransportError: If the hub cannot be reached
+        """
+        url = f"{hub_address.rstrip('/')}/status"
+        try:
+            value = httpx.get(url, timeout=3).json().get("value", {})
+        except httpx.TransportError:
+            raise
+        except Exception as e:
+            logger.warning(f"Could not read Selenium grid status from {url}: {e}")
+            return None
+
+        nodes = value.get("nodes")
+        if nodes is None:
+            return None
+
+        total = busy = 0
+        for node in nodes:
+            if node.get("availability", "UP") != "UP":
+                continue
+            for slot in node.get("slots", []):
+                total += 1
+                if slot.get("session"):
+                    busy += 1
+        return total, busy
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            waiting = {name: 0 for name in PRIORITY_NAMES.values()}
+            for priority, _, _ in self._queue:
+                waiting[PRIORITY_NAMES[priority]] += 1
+            hubs = [hub.to_dict() for hub in self._hubs.values()]
+            healthy = [hub for hub in hubs if hub["healthy"]]
+            known = bool(healthy) and all(hub["total_slots"] is not None for hub in healthy)
+            free = sum(hub["free_slots"] for hub in healthy) if known else None
+            return {
+                "enabled": self.enabled,
+                "hubs": hubs,
+                "total_slots": sum(hub["total_slots"] for hub in healthy) if known else None,
+                "free_slots": free,
+                "waiting": waiting,
+                "granted": self._granted,
+                "rejected": self._rejected,
+                "eta_next_seconds": self._eta(1) if free is not None and free <= 0 else 0.0,
+            }
+
+
+# Singleton instance
+grid_admission = GridAdmission()
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock, Thread
+from typing import Callable, Dict
+
+from lib.exceptions import SchedulerQueueFullException
+
+logger = logging.getLogger(__name__)
+
+
+class StagePool:
+    """
+    Bounded worker pool for one stage of the re-schedule pipeline.
+
+    At most ``max_workers`` tasks run at the same time and at most ``max_queue``
+    tasks wait for a free worker. Submitting beyond that raises
+    SchedulerQueueFullException instead of growing without limit.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-worker")
+        self._init_counters()
+
+    def _init_counters(self):
+        self._lock = Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """
+        Queue a task for execution
+
+        Args:
+            fn: Callable to run in a worker thread
+            *args: Positional arguments for the callable
+
+        Returns:
+            Future for the queued task
+
+        Raises:
+            SchedulerQueueFullException: If the stage queue is full
+        """
+        self._accept()
+        return self._executor.submit(self._run, fn, *args)
+
+    def _accept(self):
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._rejected += 1
+                raise SchedulerQueueFullException(self.name, self.max_queue)
+            self._queued += 1
+            queued, running = self._queued, self._running
+
+        logger.info(f"Stage '{self.name}' accepted task (queued: {queued}, running: {running}/{self.max_workers})")
+
+    def _run(self, fn: Callable, *args):
+        self._started()
+        try:
+            return fn(*args)
+        except Exception as e:
+            self._errored(e)
+        finally:
+            self._finished()
+
+    def _started(self):
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+
+    def _errored(self, error: Exception):
+        with self._lock:
+            self._failed += 1
+        logger.error(f"Task in stage '{self.name}' failed: {error}", exc_info=True)
+
+    def _finished(self):
+        with self._lock:
+            self._running -= 1
+            self._completed += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Snapshot of the stage counters"""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queued": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+class AsyncStagePool(StagePool):
+    """
+    Stage pool that runs coroutine functions on one dedicated event loop thread.
+
+    Monitors spend nearly all of their time awaiting sleeps and HTTP calls, so
+    ``max_workers`` here bounds concurrent coroutines rather than OS threads.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._init_counters()
+        self._semaphore = asyncio.Semaphore(max_workers)
+        self._loop = asyncio.new_event_loop()
+        self._thread = Thread(target=self._loop.run_forever, name=f"{name}-loop", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """
+        Queue a coroutine function for execution on the stage event loop
+
+        Args:
+            fn: Coroutine function to await
+            *args: Positional arguments for the coroutine function
+
+        Returns:
+            Future for the queued task
+
+        Raises:
+            SchedulerQueueFullException: If the stage queue is full
+        """
+        self._accept()
+        return asyncio.run_coroutine_threadsafe(self._run_async(fn, *args), self._loop)
+
+    async def _run_async(self, fn: Callable, *args):
+        async with self._semaphore:
+            self._started()
+            try:
+                return await fn(*args)
+            except Exception as e:
+                self._errored(e)
+            finally:
+                self._finished()
+
+    def shutdown(self, wait: bool = False):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        if wait:
+            self._thread.join()
@@ -0,0 +1,95 @@
+import time
+from datetime import datetime
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+
+class MonitorStats:
+    """
+    In-memory counters for one running re-schedule monitor.
+
+    Updated with plain attribute writes from the monitor itself, so recording
+    costs nothing measurable on the polling path. Read by the stats endpoint.
+    """
+
+    def __init__(self, re_schedule_id: int):
+        self.re_schedule_id = re_schedule_id
+        self.phase = "starting"
+        self.started_at = datetime.now()
+        self.started_monotonic = time.monotonic()
+        self.start_datetime: Optional[datetime] = None
+        # Only monitors started by their prewarm job are expected to poll from start_datetime on
+        self.prewarmed = False
+        self.polling_started_at: Optional[datetime] = None
+        self.polls = 0
+        self.last_poll_at: Optional[datetime] = None
+        self.last_poll_latency: Optional[float] = None
+        self.selenium_session = False
+        self.booking_attempts: List[Dict[str, Any]] = []
+
+    def record_poll(self, latency: Optional[float]):
+        self.polls += 1
+        self.last_poll_at = datetime.now()
+        self.last_poll_latency = latency
+
+    def record_booking(self, prepare_seconds: float, post_seconds: Optional[float], status_code: Optional[int]):
+        """One booking attempt: slot chosen -> POST sent, and the POST round trip"""
+        self.booking_attempts.append({
+            "prepare_seconds": round(prepare_seconds, 4),
+            "post_seconds": round(post_seconds, 3) if post_seconds is not None else None,
+            "status_code": status_code,
+        })
+
+    def start_polling(self):
+        self.phase = "polling"
+        self.polling_started_at = datetime.now()
+
+    def start_lag(self) -> Optional[float]:
+        """Seconds between start_datetime and the moment polling actually began, for prewarmed monitors"""
+        if not self.prewarmed or not self.start_datetime or not self.polling_started_at:
+            return None
+        return (self.polling_started_at - self.start_datetime).total_seconds()
+
+    def to_dict(self) -> Dict[str, Any]:
+        start_lag = self.start_lag()
+        return {
+            "re_schedule_id": self.re_schedule_id,
+            "phase": self.phase,
+            "started_at": self.started_at.isoformat(),
+            "uptime_seconds": round(time.monotonic() - self.started_monotonic, 1),
+            "start_datetime": self.start_datetime.isoformat() if self.start_datetime else None,
+            "start_lag_seconds": round(start_lag, 3) if start_lag is not None else None,
+            "polls": self.polls,
+            "last_poll_at": self.last_poll_at.isoformat() if self.last_poll_at else None,
+            "last_poll_latency_seconds": round(self.last_poll_latency, 3) if self.last_poll_latency is not None else None,
+            "selenium_session": self.selenium_session,
+            "booking_attempts": self.booking_attempts,
+        }
+
+
+class MonitorStatsRegistry:
+    """Stats of the monitors running in this process, keyed by re-schedule id"""
+
+    def __init__(self):
+        self._monitors: Dict[int, MonitorStats] = {}
+        self._lock = Lock()
+
+    def track(self, re_schedule_id: int) -> MonitorStats:
+        stats = MonitorStats(re_schedule_id)
+        with self._lock:
+            self._monitors[re_schedule_id] = stats
+        return stats
+
+    def untrack(self, stats: MonitorStats):
+        with self._lock:
+            if self._monitors.get(stats.re_schedule_id) is stats:
+                del self._monitors[stats.re_schedule_id]
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            monitors = list(self._monitors.values())
+        return [stats.to_dict() for stats in monitors]
+
+
+# Singleton instance
+monitor_stats = MonitorStatsRegistry()
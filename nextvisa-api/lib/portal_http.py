@@ -0,0 +1,251 @@
+import logging
+import os
+import re
+import time
+from html.parser import HTMLParser
+from typing import Dict, List, NamedTuple, Optional
+
+import httpx
+
+from lib.exceptions import PortalLoginException
+from lib.portal_resilience import portal_resilience
+from lib.request_governor import PRIORITY_LOGIN
+
+logger = logging.getLogger(__name__)
+
+# Sent when no browser session exists to borrow the user agent from
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
+)
+
+HTML_ACCEPT = "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"
+
+INVALID_CREDENTIALS_MARKERS = ("Invalid email or password", "Correo electrónico o contraseña no válidos")
+
+SCHEDULE_PATTERN = re.compile(r'/schedule/(\d+)/')
+
+# Idle portal connections are kept open this long; above the poll interval, every poll reuses a warm connection
+KEEPALIVE_SECONDS = float(os.getenv("PORTAL_KEEPALIVE_SECONDS", "120"))
+
+# A captured booking form is read again after this long, even without a re-login
+BOOKING_FORM_MAX_AGE_SECONDS = float(os.getenv("BOOKING_FORM_MAX_AGE_SECONDS", "600"))
+
+CSRF_REJECTION_MARKERS = ("authenticity", "CSRF")
+
+
+class BookingForm(NamedTuple):
+    """Hidden fields and CSRF token of the appointment form, captured before a slot shows up"""
+    fields: Dict[str, str]
+    csrf_token: str
+    captured_at: float
+
+    def payload(self, facility_id: str, date_str: str, time_slot: str) -> Dict[str, str]:
+        return {
+            **self.fields,
+            "appointments[consulate_appointment][facility_id]": facility_id,
+            "appointments[consulate_appointment][date]": date_str,
+            "appointments[consulate_appointment][time]": time_slot,
+        }
+
+    def stale(self) -> bool:
+        return time.monotonic() - self.captured_at > BOOKING_FORM_MAX_AGE_SECONDS
+
+
+class _FormParser(HTMLParser):
+    """Collects input values and the CSRF meta tag of a Rails page"""
+
+    def __init__(self):
+        super().__init__()
+        self.inputs: Dict[str, str] = {}
+        self.csrf_token: Optional[str] = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "input" and attrs.get("name") and attrs.get("name") not in self.inputs:
+            self.inputs[attrs["name"]] = attrs.get("value") or ""
+        elif tag == "meta" and attrs.get("name") == "csrf-token":
+            self.csrf_token = attrs.get("content")
+
+
+def parse_form(html: str) -> _FormParser:
+    parser = _FormParser()
+    parser.feed(html)
+    return parser
+
+
+def connection_limits() -> httpx.Limits:
+    """Connection pool of a portal client: a few connections, kept alive between polls"""
+    return httpx.Limits(max_connections=10, max_keepalive_connections=5, keepalive_expiry=KEEPALIVE_SECONDS)
+
+
+def new_client(appointment_url: str, user_agent: str = DEFAULT_USER_AGENT) -> httpx.AsyncClient:
+    """
+    Build the async HTTP client a monitor uses for portal calls.
+
+    Args:
+        appointment_url: Appointment page, sent as Referer
+        user_agent: User agent to present to the portal
+
+    Returns:
+        httpx.AsyncClient with JSON data call headers, redirects enabled and keep-alive connections
+    """
+    return httpx.AsyncClient(
+        headers={
+            "Accept": "application/json, text/javascript, */*; q=0.01",
+            "X-Requested-With": "XMLHttpRequest",
+            "Referer": appointment_url,
+            "User-Agent": user_agent
+        },
+        follow_redirects=True,
+        limits=connection_limits()
+    )
+
+
+def load_cookies(jar: httpx.Cookies, cookies: List[dict]):
+    """Add Selenium style cookie dicts (name, value, domain, path) to an httpx cookie jar"""
+    for c in cookies:
+        jar.set(c['name'], c['value'], domain=c.get('domain') or '', path=c.get('path', '/'))
+
+
+def export_cookies(jar: httpx.Cookies) -> List[dict]:
+    """Cookies of an httpx cookie jar as Selenium style dicts, the format the session cache stores"""
+    return [
+        {"name": c.name, "value": c.value, "domain": c.domain, "path": c.path, "expiry": c.expires}
+        for c in jar.jar
+    ]
+
+
+def is_sign_in_url(url: str) -> bool:
+    return '/users/sign_in' in url or '/login' in url
+
+
+def is_portal_error(response: httpx.Response) -> bool:
+    """Whether the portal answered with an overload or server error rather than a page or data"""
+    return response.status_code == 429 or response.status_code >= 500
+
+
+def is_session_expired(response: httpx.Response, expect_json: bool = True) -> bool:
+    """
+    Whether a JSON data call was answered as if the session had ended
+
+    Expiry shows up as a redirect to the sign-in page, a 401, a 302 when
+    redirects are not followed, or an HTML page where JSON was expected.
+
+    Args:
+        response: Response of a days/times JSON request
+        expect_json: False for page requests, where HTML is the normal answer
+
+    Returns:
+        True if the caller should log in again
+    """
+    if response.status_code in (401, 302):
+        return True
+    if response.status_code >= 500:
+        # Portal errors and maintenance pages are not about the session
+        return False
+    if is_sign_in_url(str(response.url)):
+        return True
+    if any(is_sign_in_url(r.headers.get("location", "")) for r in response.history):
+        return True
+    if not expect_json:
+        return False
+    content_type = response.headers.get("content-type", "")
+    return "text/html" in content_type or response.text.lstrip().startswith("<")
+
+
+async def http_login(client: httpx.AsyncClient, login_url: str, email: str, password: str) -> httpx.Response:
+    """
+    Log in to the portal without a browser; the session stays in the client cookie jar.
+
+    Fetches the sign-in form for its authenticity token, posts the credentials
+    the way the portal's own form does, then requests the sign-in page again:
+    an authenticated session is redirected away from it to the account page.
+    The requests go out at login priority: an open circuit breaker does not
+    hold them back and the request governor serves them ahead of polls.
+
+    Args:
+        client: HTTP client whose cookie jar receives the session
+        login_url: URL of the sign-in page
+        email: Applicant's email
+        password: Applicant's password
+
+    Returns:
+        Response of the page the portal lands on after login
+
+    Raises:
+        PortalLoginException: If the portal rejected the credentials (``invalid_credentials``)
+            or the login flow did not behave as expected
+    """
+    logger.info(f"HTTP login for {email}")
+    r = await portal_resilience.request(client, "GET", login_url, email, PRIORITY_LOGIN, headers={"Accept": HTML_ACCEPT}, timeout=15)
+    form = parse_form(r.text)
+    token = form.inputs.get("authenticity_token") or form.csrf_token
+    if not token:
+        raise PortalLoginException(email, f"Sign-in page had no authenticity token (status: {r.status_code})")
+
+    data = {
+        "utf8": form.inputs.get("utf8", "✓"),
+        "authenticity_token": token,
+        "user[email]": email,
+        "user[password]": password,
+        "policy_confirmed": "1",
+        "commit": form.inputs.get("commit", "Sign In"),
+    }
+    r = await portal_resilience.request(
+        client,
+        "POST",
+        login_url,
+        email,
+        PRIORITY_LOGIN,
+        data=data,
+        headers={
+            "Accept": "*/*;q=0.5, text/javascript, application/javascript",
+            "X-CSRF-Token": form.csrf_token or token,
+            "Referer": login_url,
+        },
+        timeout=15
+    )
+    if any(marker in r.text for marker in INVALID_CREDENTIALS_MARKERS):
+        raise PortalLoginException(email, "Invalid email or password", invalid_credentials=True)
+    if r.status_code >= 400:
+        raise PortalLoginException(email, f"Sign-in request failed (status: {r.status_code})")
+
+    landing = await portal_resilience.request(client, "GET", login_url, email, PRIORITY_LOGIN, headers={"Accept": HTML_ACCEPT}, timeout=15)
+    if is_sign_in_url(str(landing.url)):
+        raise PortalLoginException(email, "Session was not authenticated after sign-in")
+
+    logger.info(f"HTTP login successful for {email}")
+    return landing
+
+
+def extract_schedule_number(text: str) -> Optional[str]:
+    match = SCHEDULE_PATTERN.search(text)
+    return match.group(1) if match else None
+
+
+def parse_booking_form(html: str) -> BookingForm:
+    """
+    Read the hidden fields of the appointment form from the page HTML
+
+    Args:
+        html: Appointment page HTML
+
+    Returns:
+        BookingForm with the form fields and the CSRF token
+
+    Raises:
+        Exception: If the page does not contain the appointment form
+    """
+    parsed = parse_form(html)
+    if "authenticity_token" not in parsed.inputs:
+        raise Exception("Appointment form not found in page")
+
+    fields = ("utf8", "authenticity_token", "confirmed_limit_message", "use_consulate_appointment_capacity")
+    form = {name: parsed.inputs.get(name, "") for name in fields}
+    return BookingForm(form, parsed.csrf_token or form["authenticity_token"], time.monotonic())
+
+
+def is_csrf_rejection(response: httpx.Response) -> bool:
+    """Whether the portal refused a form post for its authenticity token"""
+    return response.status_code == 422 and any(marker in response.text for marker in CSRF_REJECTION_MARKERS)
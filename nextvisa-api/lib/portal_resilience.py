@@ -0,0 +1,298 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+from threading import Lock
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from lib.exceptions import PortalUnavailableException
+from lib.request_governor import request_governor, PRIORITY_POLL
+
+logger = logging.getLogger(__name__)
+
+# Attempts per call, the first included
+RETRY_ATTEMPTS = int(os.getenv("PORTAL_RETRY_ATTEMPTS", "3"))
+# Backoff before retry n is uniform in [0, base * 2^n], capped at the max; a longer Retry-After opens the breaker instead
+RETRY_BASE_SECONDS = float(os.getenv("PORTAL_RETRY_BASE_SECONDS", "0.5"))
+RETRY_MAX_SECONDS = float(os.getenv("PORTAL_RETRY_MAX_SECONDS", "8"))
+# Failed calls in a row that open a host's breaker, and how long it stays open (doubled on every reopen)
+BREAKER_FAILURES = int(os.getenv("PORTAL_BREAKER_FAILURES", "5"))
+BREAKER_OPEN_SECONDS = float(os.getenv("PORTAL_BREAKER_OPEN_SECONDS", "30"))
+BREAKER_MAX_OPEN_SECONDS = float(os.getenv("PORTAL_BREAKER_MAX_OPEN_SECONDS", "300"))
+# Booking POSTs used to wait forever on a hung portal
+BOOKING_TIMEOUT_SECONDS = float(os.getenv("BOOKING_TIMEOUT_SECONDS", "30"))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Dropped keep-alive connections; retried at once, the next attempt opens a fresh connection
+RESET_ERRORS = (httpx.RemoteProtocolError, httpx.ReadError, httpx.WriteError)
+# Errors raised before the request left, safe to retry for non-idempotent requests too
+UNSENT_ERRORS = (httpx.ConnectError,)
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Seconds a Retry-After header asks to wait, as a number of seconds or an HTTP date"""
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    Shared failure state of one portal host.
+
+    Opens after BREAKER_FAILURES failed calls in a row (429, 5xx, timeouts,
+    connection errors) or when the portal asks for a longer pause with
+    Retry-After; while open, routine calls of every monitor and poller fail
+    fast without a request. Once the open period ends a single trial call is
+    let through: success closes the breaker, failure opens it again for twice
+    as long. Critical calls (login, booking) are never held back, but count.
+    """
+
+    def __init__(self, host: str):
+        self.host = host
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.open_seconds = BREAKER_OPEN_SECONDS
+        self.trial_started: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.counts: Dict[str, int] = {"calls": 0, "attempts": 0, "retries": 0, "failures": 0, "short_circuited": 0, "opened": 0}
+        self.retry_reasons: Dict[str, int] = {}
+        self._lock = Lock()
+
+    def admit(self, critical: bool = False):
+        """
+        Raises:
+            PortalUnavailableException: If the breaker is open, or half-open with a trial call in flight
+        """
+        now = time.monotonic()
+        with self._lock:
+            self.counts["calls"] += 1
+            if critical or self.state == "closed":
+                return
+            if self.state == "open" and now >= self.open_until:
+                self.state = "half_open"
+                self.trial_started = None
+            # A trial that never reported back (cancelled caller) is replaced after one open period
+            if self.state == "half_open" and (self.trial_started is None or now - self.trial_started > self.open_seconds):
+                self.trial_started = now
+                logger.info(f"Portal breaker for {self.host} half-open, sending a trial request")
+                return
+            self.counts["short_circuited"] += 1
+            retry_in = max(self.open_until - now, 1.0)
+        raise PortalUnavailableException(self.host, retry_in)
+
+    def attempt(self, reason: Optional[str] = None):
+        """Count one request sent, and why when it is a retry"""
+        with self._lock:
+            self.counts["attempts"] += 1
+            if reason:
+                self.counts["retries"] += 1
+                self.retry_reasons[reason] = self.retry_reasons.get(reason, 0) + 1
+
+    def succeeded(self):
+        with self._lock:
+            if self.state != "closed":
+                logger.info(f"Portal breaker for {self.host} closed")
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self.open_seconds = BREAKER_OPEN_SECONDS
+            self.trial_started = None
+
+    def failed(self, error: str, pause: Optional[float] = None):
+        """
+        Count a failed call
+
+        Args:
+            error: What failed, for the stats
+            pause: Seconds the portal asked to be left alone (Retry-After); opens the breaker right away
+        """
+        now = time.monotonic()
+        with self._lock:
+            self.counts["failures"] += 1
+            self.consecutive_failures += 1
+            self.last_error = error
+            if self.state == "half_open":
+                # The trial call failed
+                self.open_seconds = min(self.open_seconds * 2, BREAKER_MAX_OPEN_SECONDS)
+                seconds = max(pause or 0.0, self.open_seconds)
+            elif pause is not None:
+                seconds = pause
+            elif self.state == "closed" and self.consecutive_failures >= BREAKER_FAILURES:
+                seconds = self.open_seconds
+            else:
+                return
+            seconds = min(seconds, BREAKER_MAX_OPEN_SECONDS)
+            self.state = "open"
+            self.open_until = max(self.open_until, now + seconds)
+            self.trial_started = None
+            self.counts["opened"] += 1
+        logger.warning(f"Portal breaker for {self.host} open for {seconds:.0f}s after {error}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "open_for_seconds": round(max(self.open_until - time.monotonic(), 0.0), 1) if self.state == "open" else 0.0,
+                "last_error": self.last_error,
+                **self.counts,
+                "retry_reasons": dict(self.retry_reasons),
+            }
+
+
+class _Call:
+    """Retry decisions for one logical request; shared by the async and the blocking send loops"""
+
+    def __init__(self, breaker: CircuitBreaker, url: str, idempotent: bool, priority: int):
+        self.breaker = breaker
+        self.url = url
+        self.idempotent = idempotent
+        self.priority = priority
+        self.attempt = 0
+        self.reason: Optional[str] = None
+
+    def start(self):
+        # Logins and bookings are critical
+        self.breaker.admit(self.priority < PRIORITY_POLL)
+
+    def sending(self):
+        self.attempt += 1
+        self.breaker.attempt(self.reason)
+
+    def _backoff(self) -> float:
+        return random.uniform(0, min(RETRY_BASE_SECONDS * 2 ** self.attempt, RETRY_MAX_SECONDS))
+
+    def on_response(self, response: httpx.Response) -> Optional[float]:
+        """Seconds to wait before retrying, None to return the response"""
+        if response.status_code not in RETRY_STATUSES:
+            self.breaker.succeeded()
+            request_governor.accepted(self.url)
+            return None
+
+        if response.status_code == 429:
+            request_governor.throttled(self.url)
+        error = f"status {response.status_code}"
+        pause = retry_after_seconds(response) if response.status_code in (429, 503) else None
+        # A POST answered with an error status was processed; only overload answers are safe to repeat
+        retryable = self.idempotent or response.status_code in (429, 503)
+        if not retryable or self.attempt >= RETRY_ATTEMPTS or (pause is not None and pause > RETRY_MAX_SECONDS):
+            self.breaker.failed(error, pause)
+            return None
+        self.reason = str(response.status_code)
+        return pause if pause is not None else self._backoff()
+
+    def on_error(self, error: httpx.HTTPError) -> Optional[float]:
+        """Seconds to wait before retrying, None to raise the error"""
+        if not isinstance(error, httpx.TransportError):
+            return None
+        # A slow portal is not helped by more requests; timeouts count towards the breaker and surface
+        retryable = not isinstance(error, httpx.TimeoutException) and (self.idempotent or isinstance(error, UNSENT_ERRORS))
+        if self.attempt >= RETRY_ATTEMPTS or not retryable:
+            self.breaker.failed(type(error).__name__)
+            return None
+        self.reason = type(error).__name__
+        # A reset on a reused connection is retried at once, on a new one
+        return 0.0 if isinstance(error, RESET_ERRORS) and self.attempt == 1 else self._backoff()
+
+
+class PortalResilience:
+    """Circuit breaker per portal host, and the retrying send helpers every portal request goes through"""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = Lock()
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        host = urlsplit(url).netloc
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(host)
+            return breaker
+
+    async def request(self, client: httpx.AsyncClient, method: str, url: str, account: Optional[str] = None,
+                      priority: int = PRIORITY_POLL, idempotent: Optional[bool] = None, **kwargs) -> httpx.Response:
+        """
+        Send a portal request with retries, backoff and the host's circuit breaker
+
+        Every attempt waits for its turn in the request governor.
+
+        Args:
+            client: Async HTTP client
+            method: HTTP method
+            url: Request URL
+            account: Applicant account (email) the request is sent for
+            priority: Governor priority; logins and bookings are also sent while the breaker is open
+            idempotent: Whether a request that may have reached the portal can be repeated, GET by default
+            **kwargs: Passed to ``client.request``
+
+        Returns:
+            The response; after the last attempt, whatever the portal answered
+
+        Raises:
+            PortalUnavailableException: If the host's breaker is open
+            httpx.HTTPError: If the last attempt failed
+        """
+        call = _Call(self.breaker(url), url, method == "GET" if idempotent is None else idempotent, priority)
+        call.start()
+        while True:
+            await request_governor.acquire(url, account, priority)
+            call.sending()
+            try:
+                response = await client.request(method, url, **kwargs)
+            except httpx.HTTPError as e:
+                delay = call.on_error(e)
+                if delay is None:
+                    raise
+                logger.info(f"Retrying {method} {url} in {delay:.2f}s after {type(e).__name__}")
+            else:
+                delay = call.on_response(response)
+                if delay is None:
+                    return response
+                logger.info(f"Retrying {method} {url} in {delay:.2f}s after status {response.status_code}")
+            await asyncio.sleep(delay)
+
+    def request_sync(self, client: httpx.Client, method: str, url: str, account: Optional[str] = None,
+                     priority: int = PRIORITY_POLL, idempotent: Optional[bool] = None, **kwargs) -> httpx.Response:
+        """Blocking ``request`` for the shared poller threads"""
+        call = _Call(self.breaker(url), url, method == "GET" if idempotent is None else idempotent, priority)
+        call.start()
+        while True:
+            request_governor.acquire_sync(url, account, priority)
+            call.sending()
+            try:
+                response = client.request(method, url, **kwargs)
+            except httpx.HTTPError as e:
+                delay = call.on_error(e)
+                if delay is None:
+                    raise
+                logger.info(f"Retrying {method} {url} in {delay:.2f}s after {type(e).__name__}")
+            else:
+                delay = call.on_response(response)
+                if delay is None:
+                    return response
+                logger.info(f"Retrying {method} {url} in {delay:.2f}s after status {response.status_code}")
+            time.sleep(delay)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {host: breaker.stats() for host, breaker in breakers.items()}
+
+
+# Singleton instance
+portal_resilience = PortalResilience()
@@ -0,0 +1,224 @@
+import asyncio
+import logging
+import os
+import time
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Lower value is served first
+PRIORITY_BOOKING = 0
+PRIORITY_LOGIN = 1
+PRIORITY_POLL = 2
+
+PRIORITY_NAMES = {PRIORITY_BOOKING: "booking", PRIORITY_LOGIN: "login", PRIORITY_POLL: "poll"}
+
+ENABLED = os.getenv("REQUEST_GOVERNOR", "true").lower() == "true"
+# Requests per second and burst the portal host takes from this node; the rate adapts below the max on 429s
+HOST_RATE = float(os.getenv("PORTAL_HOST_RATE", "10"))
+HOST_BURST = float(os.getenv("PORTAL_HOST_BURST", "20"))
+HOST_MIN_RATE = float(os.getenv("PORTAL_HOST_MIN_RATE", "0.5"))
+# Seconds without a 429 the host rate takes to climb from the minimum back to the configured rate
+HOST_RECOVERY_SECONDS = float(os.getenv("PORTAL_HOST_RECOVERY_SECONDS", "60"))
+# Requests per second and burst of one applicant account, whichever monitors or pollers send them
+ACCOUNT_RATE = float(os.getenv("PORTAL_ACCOUNT_RATE", "1"))
+ACCOUNT_BURST = float(os.getenv("PORTAL_ACCOUNT_BURST", "6"))
+# Share of every bucket routine polls cannot take, kept for logins; bookings are never held back
+POLL_RESERVE = float(os.getenv("PORTAL_POLL_RESERVE", "0.25"))
+
+
+class TokenBucket:
+    """
+    Tokens refill at ``rate`` per second up to ``burst``.
+
+    Each priority may only take a token while the bucket stays at or above
+    its floor: polls leave POLL_RESERVE of the burst for logins, logins may
+    empty the bucket, and bookings may run it into debt, which later
+    requests wait out. Not thread safe, the governor holds its lock.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.max_rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self._refilled_at = time.monotonic()
+        self._adjusted_at = self._refilled_at
+        self._slowed_at: Optional[float] = None
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _floor(self, priority: int) -> float:
+        if priority == PRIORITY_BOOKING:
+            return -self.burst
+        if priority == PRIORITY_LOGIN:
+            return 0.0
+        return self.burst * POLL_RESERVE
+
+    def wait_time(self, priority: int, now: float) -> float:
+        """Seconds until a request of this priority can take a token, 0 if it can now"""
+        self._refill(now)
+        if priority == PRIORITY_BOOKING:
+            return 0.0
+        missing = self._floor(priority) + 1 - self.tokens
+        return max(missing / self.rate, 0.0)
+
+    def take(self):
+        self.tokens = max(self.tokens - 1, -self.burst)
+
+    def slow_down(self, floor: float, now: float) -> bool:
+        """
+        Halve the rate after the portal said it gets too many requests
+
+        The 429s of requests that were in flight together count once: the
+        rate is halved at most once per second.
+        """
+        if self._slowed_at is not None and now - self._slowed_at < 1:
+            return False
+        self._refill(now)
+        self.rate = max(self.rate / 2, floor)
+        self._adjusted_at = self._slowed_at = now
+        return True
+
+    def speed_up(self, floor: float, now: float):
+        """Climb back linearly towards the configured rate while the portal accepts requests"""
+        if self.rate >= self.max_rate:
+            self._adjusted_at = now
+            return
+        self._refill(now)
+        step = (now - self._adjusted_at) * (self.max_rate - floor) / HOST_RECOVERY_SECONDS
+        self.rate = min(self.rate + step, self.max_rate)
+        self._adjusted_at = now
+
+
+class RequestGovernor:
+    """
+    Token buckets per portal host and per applicant account, shared by every
+    monitor and poller of this node.
+
+    A portal request takes one token from its host's bucket and one from its
+    account's bucket, waiting until both have one. Polls cannot take the
+    last POLL_RESERVE of a bucket, so logins go out ahead of a backlog of
+    polls; bookings never wait. The host rate is halved on a 429 and climbs
+    back over PORTAL_HOST_RECOVERY_SECONDS while requests succeed, settling
+    near the highest rate the portal accepts.
+    """
+
+    def __init__(self):
+        self.enabled = ENABLED
+        self._hosts: Dict[str, TokenBucket] = {}
+        self._accounts: Dict[str, TokenBucket] = {}
+        self._counts = {name: {"requests": 0, "throttled": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0} for name in PRIORITY_NAMES.values()}
+        self._lock = Lock()
+
+    def _buckets(self, host: str, account: Optional[str]) -> Tuple[TokenBucket, ...]:
+        host_bucket = self._hosts.get(host)
+        if host_bucket is None:
+            host_bucket = self._hosts[host] = TokenBucket(HOST_RATE, HOST_BURST)
+        if account is None:
+            return (host_bucket,)
+        account_bucket = self._accounts.get(account)
+        if account_bucket is None:
+            account_bucket = self._accounts[account] = TokenBucket(ACCOUNT_RATE, ACCOUNT_BURST)
+        return host_bucket, account_bucket
+
+    def _try_take(self, host: str, account: Optional[str], priority: int) -> float:
+        """Take the tokens of one request, or say how long to wait before asking again"""
+        now = time.monotonic()
+        with self._lock:
+            buckets = self._buckets(host, account)
+            wait = max(bucket.wait_time(priority, now) for bucket in buckets)
+            if wait <= 0:
+                for bucket in buckets:
+                    bucket.take()
+            return wait
+
+    def _record(self, priority: int, waited: float):
+        with self._lock:
+            counts = self._counts[PRIORITY_NAMES[priority]]
+            counts["requests"] += 1
+            if waited > 0:
+                counts["throttled"] += 1
+                counts["wait_seconds"] += waited
+                counts["max_wait_seconds"] = max(counts["max_wait_seconds"], waited)
+
+    async def acquire(self, url: str, account: Optional[str] = None, priority: int = PRIORITY_POLL) -> float:
+        """
+        Wait for the host's and the account's turn to send a request
+
+        Args:
+            url: Request URL, its host selects the host bucket
+            account: Applicant account the request is sent for, None for the host bucket only
+            priority: PRIORITY_BOOKING, PRIORITY_LOGIN or PRIORITY_POLL
+
+        Returns:
+            Seconds waited
+        """
+        if not self.enabled:
+            return 0.0
+        host = urlsplit(url).netloc
+        started = time.monotonic()
+        waited = 0.0
+        while True:
+            wait = self._try_take(host, account, priority)
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+            waited = time.monotonic() - started
+        self._record(priority, waited)
+        return waited
+
+    def acquire_sync(self, url: str, account: Optional[str] = None, priority: int = PRIORITY_POLL) -> float:
+        """Blocking ``acquire`` for threads: the shared pollers and browser logins"""
+        if not self.enabled:
+            return 0.0
+        host = urlsplit(url).netloc
+        started = time.monotonic()
+        waited = 0.0
+        while True:
+            wait = self._try_take(host, account, priority)
+            if wait <= 0:
+                break
+            time.sleep(wait)
+            waited = time.monotonic() - started
+        self._record(priority, waited)
+        return waited
+
+    def throttled(self, url: str):
+        """The portal answered 429: halve the host rate"""
+        host = urlsplit(url).netloc
+        with self._lock:
+            bucket = self._buckets(host, None)[0]
+            lowered = bucket.slow_down(HOST_MIN_RATE, time.monotonic())
+            rate = bucket.rate
+        if lowered:
+            logger.warning(f"Portal {host} is throttling, request rate lowered to {rate:.2f}/s")
+
+    def accepted(self, url: str):
+        """The portal served a request: let the host rate recover"""
+        host = urlsplit(url).netloc
+        with self._lock:
+            self._buckets(host, None)[0].speed_up(HOST_MIN_RATE, time.monotonic())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "hosts": {
+                    host: {"rate": round(bucket.rate, 2), "max_rate": bucket.max_rate, "tokens": round(bucket.tokens, 1)}
+                    for host, bucket in self._hosts.items()
+                },
+                "accounts": len(self._accounts),
+                "priorities": {
+                    name: {**counts, "wait_seconds": round(counts["wait_seconds"], 2), "max_wait_seconds": round(counts["max_wait_seconds"], 2)}
+                    for name, counts in self._counts.items()
+                },
+            }
+
+
+# Singleton instance
+request_governor = RequestGovernor()
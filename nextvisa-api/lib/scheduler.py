@@ -1,18 +1,35 @@
 import logging
-import requests
-import threading
-from datetime import datetime, timezone
-from typing import Dict, Optional
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Set
 from threading import Lock
 from apscheduler.schedulers.background import BackgroundScheduler
 from services import re_schedule_services, applicant_services, configuration_services, applicant_web_services, re_schedule_log_services
-from models.re_schedule import ScheduleStatus, ReScheduleUpdate
+from models.re_schedule import ScheduleStatus, ReScheduleUpdate, TERMINAL_STATUSES
 from models.re_schedule_log import ReScheduleLogCreate, LogState
 from models.applicant import ApplicantUpdate
 from lib.security import decrypt_password
+from lib.monitor_pool import StagePool, AsyncStagePool
+from lib.exceptions import SchedulerQueueFullException
+from lib.cancellation import cancellations
+from lib.availability_poller import pollers
+from lib.days_changes import days_changes
+from lib.facility_catalogue import facility_catalogue
+from lib.portal_resilience import portal_resilience
+from lib.request_governor import request_governor
+from lib.monitor_stats import monitor_stats
+from lib.driver_pool import driver_pool
+from lib.browser_flow import step_stats
+from lib.grid_admission import grid_admission
 
 logger = logging.getLogger(__name__)
 
+# Outcomes of a credential pre-check; the lease is kept unless it was dropped
+PRECHECK_SCHEDULED = "scheduled"
+PRECHECK_DEFERRED = "deferred"
+PRECHECK_DROPPED = "dropped"
+
 
 class Scheduler:
     def __init__(self):
@@ -20,6 +37,38 @@ class Scheduler:
         self.jobs: Dict[int, str] = {}
         self.lock = Lock()
 
+        # Lease-based ownership lets several processes or containers split the re-schedules
+        self.node_id = os.getenv("NODE_ID") or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_seconds = int(os.getenv("LEASE_SECONDS", "60"))
+        self.owned: Set[int] = set()
+        self.dispatched: Set[int] = set()
+
+        # Monitors start this many seconds early to log in before start_datetime
+        self.prewarm_lead_seconds = int(os.getenv("PREWARM_LEAD_SECONDS", "120"))
+        self.grid_retry_seconds = int(os.getenv("GRID_RETRY_SECONDS", "60"))
+
+        # Credential pre-checks are short, monitors hold a Selenium session for hours
+        self.precheck_pool = StagePool(
+            "precheck",
+            max_workers=int(os.getenv("PRECHECK_MAX_WORKERS", "2")),
+            max_queue=int(os.getenv("PRECHECK_MAX_QUEUE", "500"))
+        )
+
+        # "thread" runs one monitor per worker thread, "asyncio" runs them all as coroutines on one loop
+        self.monitor_backend = os.getenv("MONITOR_BACKEND", "thread").lower()
+        if self.monitor_backend == "asyncio":
+            self.monitor_pool = AsyncStagePool(
+                "monitor",
+                max_workers=int(os.getenv("MONITOR_MAX_WORKERS", "1000")),
+                max_queue=int(os.getenv("MONITOR_MAX_QUEUE", "5000"))
+            )
+        else:
+            self.monitor_pool = StagePool(
+                "monitor",
+                max_workers=int(os.getenv("MONITOR_MAX_WORKERS", "10")),
+                max_queue=int(os.getenv("MONITOR_MAX_QUEUE", "500"))
+            )
+
         if not self.scheduler.running:
             self.scheduler.start()
     
@@ -27,59 +76,304 @@ class Scheduler:
         if not self.scheduler.running:
             self.scheduler.start()
 
-        # Check for re-schedule that are in SCHEDULED status
-        re_schedules = re_schedule_services.get_re_schedules_by_status(ScheduleStatus.SCHEDULED.value)
+        logger.info(f"Scheduler node {self.node_id} starting with {self.lease_seconds}s leases")
+        self.scheduler.add_job(
+            self._heartbeat,
+            'interval',
+            seconds=max(self.lease_seconds // 3, 1),
+            id="lease_heartbeat",
+            replace_existing=True
+        )
+        self._take_over_orphans()
+
+    def _take_over_orphans(self):
+        """Claim SCHEDULED and PROCESSING re-schedules that no live node owns, and deferred pre-checks of dead nodes"""
+        re_schedules = re_schedule_services.get_orphaned_re_schedules(
+            [ScheduleStatus.SCHEDULED.value, ScheduleStatus.PROCESSING.value]
+        )
+        # A PENDING row only holds a lease while its pre-check waits for a retry; fresh ones are left to their creator
+        re_schedules += re_schedule_services.get_orphaned_re_schedules([ScheduleStatus.PENDING.value], unclaimed=False)
 
-        # Schedule each re-schedule
         for schedule in re_schedules:
-            if schedule.get("id") in self.jobs:
+            schedule_id = schedule.get("id")
+            if schedule_id in self.owned or not self._claim(schedule_id):
                 continue
 
-            start_datetime = datetime.strptime(
-                schedule.get("start_datetime").replace("T", " "), 
-                "%Y-%m-%d %H:%M:%S"
-            ).replace(tzinfo=timezone.utc)
-            
-            if start_datetime < datetime.now(timezone.utc):
-                logger.info(f"Re-schedule {schedule.get('id')} is overdue, skipping")
+            now = datetime.now(timezone.utc)
+            end_datetime = self._parse_datetime(schedule.get("end_datetime"))
+            if schedule.get("status") == ScheduleStatus.PROCESSING.value:
+                # The node running this monitor died - resume it while the window is still open
+                if end_datetime and end_datetime > now:
+                    logger.info(f"Taking over running re-schedule {schedule_id}")
+                    self._dispatch_monitor(schedule_id)
+                else:
+                    self._fail(schedule_id, "Monitoring node stopped before the re-schedule window ended")
+                continue
 
-                re_schedule_services.update_re_schedule(
-                    schedule.get("id"),
-                    ReScheduleUpdate(
-                        status=ScheduleStatus.FAILED,
-                        error="Re-schedule process could not be completed and now is overdue"
-                    )
-                )
+            if schedule.get("status") == ScheduleStatus.PENDING.value:
+                # The node that deferred this login check died before retrying it
+                if end_datetime and end_datetime <= now:
+                    self._fail(schedule_id, "Login check node stopped before the re-schedule window ended")
+                else:
+                    logger.info(f"Taking over deferred login check of re-schedule {schedule_id}")
+                    self.schedule_re_schedule(schedule_id)
+                continue
+
+            start_datetime = self._parse_datetime(schedule.get("start_datetime"))
+            if start_datetime and start_datetime < now:
+                logger.info(f"Re-schedule {schedule_id} is overdue, skipping")
+                self._fail(schedule_id, "Re-schedule process could not be completed and now is overdue")
                 continue
 
-            self.schedule_re_schedule(schedule.get("id"))
+            self.schedule_re_schedule(schedule_id)
+
+    def _heartbeat(self):
+        with self.lock:
+            owned = list(self.owned)
+
+        try:
+            renewed = re_schedule_services.renew_leases(owned, self.node_id, self.lease_seconds)
+            for schedule_id in set(owned) - {row.get("id") for row in renewed}:
+                logger.warning(f"Lease on re-schedule {schedule_id} was lost (deleted or taken over)")
+                self._drop(schedule_id)
+                self.remove_job(schedule_id, reason="Lease lost to another node or re-schedule deleted")
+
+            # Status may have been changed through another node's API
+            for row in renewed:
+                if row.get("status") in {status.value for status in TERMINAL_STATUSES}:
+                    cancellations.cancel(row.get("id"), f"Status changed to {row.get('status')}")
+
+            self._take_over_orphans()
+        except Exception as e:
+            logger.error(f"Lease heartbeat failed on node {self.node_id}: {e}")
+
+    def _claim(self, schedule_id: int) -> bool:
+        if not re_schedule_services.claim_re_schedule(schedule_id, self.node_id, self.lease_seconds):
+            logger.info(f"Re-schedule {schedule_id} is owned by another node")
+            return False
+
+        with self.lock:
+            self.owned.add(schedule_id)
+        return True
+
+    def _drop(self, schedule_id: int):
+        with self.lock:
+            self.owned.discard(schedule_id)
+
+    def _release(self, schedule_id: int):
+        self._drop(schedule_id)
+        try:
+            re_schedule_services.release_re_schedule(schedule_id, self.node_id)
+        except Exception as e:
+            logger.warning(f"Could not release lease on re-schedule {schedule_id}: {e}")
+
+    def _fail(self, schedule_id: int, error: str):
+        re_schedule_services.update_re_schedule(
+            schedule_id,
+            ReScheduleUpdate(status=ScheduleStatus.FAILED, error=error)
+        )
+        self._release(schedule_id)
+
+    @staticmethod
+    def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+        if not value:
+            return None
+        return datetime.strptime(
+            value.replace("T", " ")[:19],
+            "%Y-%m-%d %H:%M:%S"
+        ).replace(tzinfo=timezone.utc)
 
     def stop(self):
         self.scheduler.shutdown()
+        self.precheck_pool.shutdown()
+        self.monitor_pool.shutdown()
 
     def schedule_re_schedule(self, schedule_id: int):
-        threading.Thread(
-            target=self._run_scheduling, 
-            args=(schedule_id,), 
-            daemon=True
-        ).start()
+        try:
+            self.precheck_pool.submit(self._run_scheduling, schedule_id)
+        except SchedulerQueueFullException as e:
+            self._reject(schedule_id, e)
+
+    def get_queue_stats(self) -> Dict[str, dict]:
+        return {
+            "precheck": self.precheck_pool.stats(),
+            "monitor": {"backend": self.monitor_backend, **self.monitor_pool.stats()},
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Live view of this node: pending jobs, running monitors and shared resources
+
+        Returns:
+            Dict with node info, pending jobs, monitor stats and stage/poller counters
+        """
+        pending_jobs = []
+        for job in self.scheduler.get_jobs():
+            if not job.id.startswith("rs_"):
+                continue
+            pending_jobs.append({
+                "re_schedule_id": int(job.id[3:]),
+                "run_at": job.next_run_time.isoformat() if job.next_run_time else None,
+            })
+        pending_jobs.sort(key=lambda job: job["run_at"] or "")
+
+        monitors = monitor_stats.snapshot()
+        pool = driver_pool.stats()
+        return {
+            "node_id": self.node_id,
+            "timestamp": datetime.now().isoformat(),
+            "owned": len(self.owned),
+            "pending_jobs": pending_jobs,
+            "running_monitors": monitors,
+            "selenium_sessions": sum(1 for monitor in monitors if monitor["selenium_session"]) + pool["size"],
+            "queues": self.get_queue_stats(),
+            "driver_pool": pool,
+            "browser_steps": step_stats.stats(),
+            "pollers": pollers.stats(),
+            "days_changes": days_changes.stats(),
+            "facilities": facility_catalogue.stats(),
+            "portal": portal_resilience.stats(),
+            "governor": request_governor.stats(),
+            "cancellation": cancellations.stats(),
+            "grid": grid_admission.stats(),
+        }
+
+    def start_now(self, schedule_id: int) -> bool:
+        """
+        Start a re-schedule's monitor right away, claiming its lease first
+
+        Args:
+            schedule_id: ID of the re-schedule
+
+        Returns:
+            False if its monitor already runs on this node or another node owns it
+        """
+        with self.lock:
+            if schedule_id in self.dispatched:
+                logger.info(f"Re-schedule {schedule_id} is already being monitored")
+                return False
+            # Marked before the claim so two manual starts on this node cannot both dispatch
+            self.dispatched.add(schedule_id)
+
+        try:
+            claimed = self._claim(schedule_id)
+        except Exception:
+            self._undispatch(schedule_id)
+            raise
+        if not claimed:
+            self._undispatch(schedule_id)
+            return False
+
+        # A pending prewarm job of this node would start a second monitor later
+        with self.lock:
+            if self.scheduler.get_job(f"rs_{schedule_id}"):
+                self.scheduler.remove_job(f"rs_{schedule_id}")
+        logger.info(f"Starting re-schedule {schedule_id} now")
+        self._dispatch_monitor(schedule_id)
+        return True
+
+    def _undispatch(self, schedule_id: int):
+        with self.lock:
+            self.dispatched.discard(schedule_id)
+
+    def _dispatch_monitor(self, schedule_id: int, prewarmed: bool = False):
+        with self.lock:
+            self.jobs.pop(schedule_id, None)
+
+        if self.monitor_backend == "asyncio":
+            target = applicant_web_services.process_re_schedule_async
+        else:
+            target = applicant_web_services.process_re_schedule
+
+        try:
+            future = self.monitor_pool.submit(target, schedule_id, prewarmed)
+            with self.lock:
+                self.dispatched.add(schedule_id)
+            future.add_done_callback(lambda _: self._monitor_done(schedule_id))
+        except SchedulerQueueFullException as e:
+            self._undispatch(schedule_id)
+            self._reject(schedule_id, e)
+
+    def _retry_precheck(self, schedule_id: int, eta_seconds: Optional[float], reason: str):
+        delay = max(eta_seconds or self.grid_retry_seconds, self.grid_retry_seconds / 2)
+        retry_at = datetime.now() + timedelta(seconds=delay)
+
+        re_schedule_log_services.create_re_schedule_log(
+            ReScheduleLogCreate(
+                re_schedule=schedule_id,
+                state=LogState.WARNING,
+                content=f"{reason}. Login check retried at {retry_at:%H:%M:%S}"
+            )
+        )
+
+        with self.lock:
+            job = self.scheduler.add_job(
+                self.schedule_re_schedule,
+                'date',
+                run_date=retry_at,
+                args=[schedule_id],
+                id=f"rs_{schedule_id}",
+                replace_existing=True
+            )
+            self.jobs[schedule_id] = job
+        logger.info(f"Re-schedule {schedule_id} login check deferred to {retry_at}: {reason}")
+
+    def _monitor_done(self, schedule_id: int):
+        with self.lock:
+            self.dispatched.discard(schedule_id)
+        self._release(schedule_id)
+
+    def _reject(self, schedule_id: int, error: SchedulerQueueFullException):
+        logger.error(f"Re-schedule {schedule_id} rejected: {error.message}")
+        try:
+            re_schedule_log_services.create_re_schedule_log(
+                ReScheduleLogCreate(
+                    re_schedule=schedule_id,
+                    state=LogState.ERROR,
+                    content=f"Scheduler is at capacity: {error.message}"
+                )
+            )
+            self._fail(schedule_id, error.message)
+        except Exception as e:
+            logger.error(f"Could not mark re-schedule {schedule_id} as failed: {e}")
 
     def _run_scheduling(self, schedule_id: int):
+        if not self._claim(schedule_id):
+            return
+
+        try:
+            outcome = self._precheck_and_schedule(schedule_id)
+        except Exception:
+            self._release(schedule_id)
+            raise
+
+        # A deferred pre-check keeps the lease until its retry runs, so no other node checks the login meanwhile
+        if outcome == PRECHECK_DROPPED:
+            self._release(schedule_id)
+
+    def _precheck_and_schedule(self, schedule_id: int) -> str:
+        """
+        Check the applicant's login, then schedule the monitor
+
+        Returns:
+            PRECHECK_SCHEDULED, PRECHECK_DEFERRED when the check was queued for
+            a retry, or PRECHECK_DROPPED when the re-schedule will not run
+        """
         schedule = re_schedule_services.get_re_schedule_by_id(schedule_id)
         if not schedule:
             logger.warning(f"Re-schedule {schedule_id} not found")
-            return
+            return PRECHECK_DROPPED
         
         run_at = schedule.get("start_datetime")
         if not run_at:
             logger.warning(f"Re-schedule {schedule_id} has no start datetime")
-            return
+            return PRECHECK_DROPPED
 
         # Verify that the applicant login first
         applicant = applicant_services.get_applicant_with_password(schedule.get("applicant"))
         if not applicant:
             logger.warning(f"Applicant {schedule.get('applicant')} not found")
-            return
+            return PRECHECK_DROPPED
         decrypted_password = decrypt_password(applicant.get("password"))
         re_schedule_log_services.create_re_schedule_log(
             ReScheduleLogCreate(
@@ -90,6 +384,20 @@ class Scheduler:
         )
         result = applicant_web_services.test_credentials(applicant.get("email"), decrypted_password)
 
+        if result and "retry_after" in result:
+            # The check could not run (grid or pool full, browser or portal error), the credentials were not judged
+            end_datetime = self._parse_datetime(schedule.get("end_datetime"))
+            if end_datetime and end_datetime <= datetime.now(timezone.utc):
+                logger.warning(f"Re-schedule {schedule_id} window ended before its login could be checked")
+                re_schedule_services.update_re_schedule(
+                    schedule_id,
+                    ReScheduleUpdate(status=ScheduleStatus.FAILED, error=f"Login could not be checked: {result.get('error')}")
+                )
+                return PRECHECK_DROPPED
+            # Check again once a slot is expected to free up
+            self._retry_precheck(schedule_id, result.get("retry_after"), result.get("error"))
+            return PRECHECK_DEFERRED
+
         if not result or not result.get("success"):
             logger.warning(f"Applicant {schedule.get('applicant')} login failed")
 
@@ -110,7 +418,7 @@ class Scheduler:
                 schedule.get("applicant"), 
                 "LOGIN_PENDING"
             )
-            return
+            return PRECHECK_DROPPED
 
         re_schedule_log_services.create_re_schedule_log(
             ReScheduleLogCreate(
@@ -120,17 +428,24 @@ class Scheduler:
             )
         )
 
+        # Fire early so the monitor's login is done when start_datetime arrives
+        start_at = datetime.strptime(run_at.replace("T", " ")[:19], "%Y-%m-%d %H:%M:%S")
+        lead_at = start_at - timedelta(seconds=self.prewarm_lead_seconds)
+        prewarm_at = max(lead_at, datetime.now())
+
         with self.lock:
             job = self.scheduler.add_job(
-                applicant_web_services.process_re_schedule, 
+                self._dispatch_monitor, 
                 'date', 
-                run_date=run_at,
-                args=[schedule_id],
-                id=f"rs_{schedule_id}"
+                run_date=prewarm_at,
+                # Only a monitor given the full lead time is judged on its start lag
+                args=[schedule_id, lead_at >= prewarm_at],
+                id=f"rs_{schedule_id}",
+                replace_existing=True
             )
             
             self.jobs[schedule_id] = job
-            logger.info(f"Scheduled one-time job for re-schedule {schedule_id} at {run_at}")
+            logger.info(f"Scheduled one-time job for re-schedule {schedule_id} at {prewarm_at} (starts {run_at})")
             re_schedule_services.update_re_schedule(
                 schedule_id,
                 ReScheduleUpdate(status=ScheduleStatus.SCHEDULED)
@@ -146,10 +461,16 @@ class Scheduler:
             )
 
             logger.info(f"Jobs after scheduling: {[job.id for job in self.scheduler.get_jobs()]}")
+
+        return PRECHECK_SCHEDULED
     
-    def remove_job(self, reschedule_id: int):
+    def remove_job(self, reschedule_id: int, reason: str = "Re-schedule removed"):
+        # Stop the monitor too if it is already running or waiting in the monitor queue
+        cancellations.cancel(reschedule_id, reason, pending=reschedule_id in self.dispatched)
+
         with self.lock:
             job_id = f"rs_{reschedule_id}"
+            self.owned.discard(reschedule_id)
             
             if reschedule_id in self.jobs:
                 try:
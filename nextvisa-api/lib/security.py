@@ -41,3 +41,4 @@ def verify_password(plain_password: str, encrypted_password: str) -> bool:
         True if password matches, False otherwise
     """
     return fernet.decrypt(encrypted_password.encode("utf-8")).decode("utf-8") == plain_password
+
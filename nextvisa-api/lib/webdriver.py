@@ -1,21 +1,74 @@
+import asyncio
+import os
+import time
+from typing import Callable, List, Optional, Tuple
+
 from selenium import webdriver
+from selenium.common.exceptions import ElementClickInterceptedException, ElementNotInteractableException
 from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chromium.remote_connection import ChromiumRemoteConnection
 import logging
 
 from services import configuration_services
+from lib.grid_admission import grid_admission, PRIORITY_CREDENTIAL_TEST
 
 logger = logging.getLogger(__name__)
 
-def get_driver():
+# "default" is the full browser profile; "lean" (opt-in) skips images, fonts and stylesheets and
+# returns from navigation once the DOM is ready - check the portal's login flow with it before enabling
+DRIVER_PROFILE = os.getenv("DRIVER_PROFILE", "default").lower()
+PAGE_LOAD_TIMEOUT = int(os.getenv("DRIVER_PAGE_LOAD_TIMEOUT", "30"))
+SCRIPT_TIMEOUT = int(os.getenv("DRIVER_SCRIPT_TIMEOUT", "10"))
+
+# URL patterns blocked through CDP for the lean profile, per resource type
+BLOCKED_URL_PATTERNS = {
+    "image": ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.webp", "*.ico"],
+    "font": ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"],
+    "stylesheet": ["*.css"],
+}
+BLOCKED_RESOURCES = [
+    resource.strip()
+    for resource in os.getenv("DRIVER_BLOCKED_RESOURCES", "image,font,stylesheet").split(",")
+    if resource.strip()
+]
+
+def parse_hubs(hub_address: str) -> List[Tuple[str, float]]:
     """
-    Get a Chrome WebDriver instance using remote Selenium hub.
-    Always uses the hub_address from configuration.
+    Hubs configured in hub_address: a comma separated list of addresses, each with an optional weight
+
+    Example: ``http://grid-a:4444|2, http://grid-b:4444`` sends about twice as
+    many sessions to grid-a when both are equally loaded.
+
+    Args:
+        hub_address: Configuration value
+
+    Returns:
+        List of (address, weight) pairs
+
+    Raises:
+        ValueError: If a weight is not a positive number
+    """
+    hubs = []
+    for item in hub_address.split(","):
+        address, _, weight = item.strip().partition("|")
+        if not address:
+            continue
+        weight = float(weight) if weight.strip() else 1.0
+        if weight <= 0:
+            raise ValueError(f"Selenium hub weight must be positive: {item.strip()}")
+        hubs.append((address.strip(), weight))
+    return hubs
+
+def build_options(profile: str) -> Options:
+    """
+    Chrome options for a driver profile
+
+    Args:
+        profile: "lean" or "default"
+
+    Returns:
+        Chrome options
     """
-    configuration = configuration_services.get_configuration()
-    
-    if not configuration or not configuration.hub_address:
-        raise Exception("Selenium hub address not configured. Please set hub_address in configuration.")
-    
     options = Options()
     options.add_argument('--no-sandbox')
     options.add_argument('--disable-dev-shm-usage')
@@ -24,20 +77,130 @@ def get_driver():
     options.add_argument('--disable-extensions')
     options.add_experimental_option('excludeSwitches', ['enable-logging', 'enable-automation'])
     options.add_experimental_option('useAutomationExtension', False)
-    
-    logger.info(f"Connecting to remote Selenium hub: {configuration.hub_address}")
-    
+
+    if profile == "lean":
+        # Navigation returns once the DOM is parsed, the portal forms are usable by then
+        options.page_load_strategy = 'eager'
+        prefs = {}
+        if "image" in BLOCKED_RESOURCES:
+            prefs["profile.managed_default_content_settings.images"] = 2
+            options.add_argument('--blink-settings=imagesEnabled=false')
+        if "font" in BLOCKED_RESOURCES:
+            prefs["webkit.webprefs.remote_fonts_enabled"] = False
+        options.add_experimental_option('prefs', prefs)
+
+    return options
+
+def apply_profile(driver, profile: str):
+    """
+    Per-session settings that cannot be passed as options: timeouts and CDP URL blocking
+
+    Args:
+        driver: Selenium WebDriver instance
+        profile: "lean" or "default"
+    """
+    driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+    driver.set_script_timeout(SCRIPT_TIMEOUT)
+
+    if profile != "lean":
+        return
+
+    patterns: List[str] = []
+    for resource in BLOCKED_RESOURCES:
+        patterns.extend(BLOCKED_URL_PATTERNS.get(resource, []))
+    try:
+        driver.execute("executeCdpCommand", {"cmd": "Network.enable", "params": {}})
+        driver.execute("executeCdpCommand", {"cmd": "Network.setBlockedURLs", "params": {"urls": patterns}})
+    except Exception as e:
+        # Chrome preferences still block images when the hub does not forward CDP
+        logger.warning(f"Could not block resources through CDP: {e}")
+
+def get_driver(profile: Optional[str] = None, priority: int = PRIORITY_CREDENTIAL_TEST, due: Optional[float] = None,
+               timeout: Optional[float] = None, should_abort: Optional[Callable[[], bool]] = None):
+    """
+    Get a Chrome WebDriver instance using remote Selenium hub.
+    Always uses the hub_address from configuration.
+
+    Session requests wait in the grid admission queue until a hub has a free slot,
+    and go to the least loaded healthy hub when several are configured.
+
+    Args:
+        profile: Driver profile, defaults to DRIVER_PROFILE
+        priority: Admission priority, PRIORITY_MONITOR or PRIORITY_CREDENTIAL_TEST
+        due: Epoch seconds the session is needed by, orders requests of the same priority
+        timeout: Maximum seconds to wait for a grid slot
+        should_abort: Stops waiting for a slot when it returns True
+
+    Raises:
+        GridCapacityException: If no grid slot became free in time
+    """
+    hubs = _configured_hubs()
+    hub_address = grid_admission.acquire(hubs, priority, due, timeout, should_abort)
+    return _connect(hub_address, profile or DRIVER_PROFILE)
+
+async def get_driver_async(profile: Optional[str] = None, priority: int = PRIORITY_CREDENTIAL_TEST, due: Optional[float] = None,
+                           timeout: Optional[float] = None, should_abort: Optional[Callable[[], bool]] = None):
+    """
+    ``get_driver`` for the event loop: waits for a grid slot without holding a thread
+
+    Only the configuration read and the session start itself run in a thread.
+
+    Raises:
+        GridCapacityException: If no grid slot became free in time
+    """
+    hubs = await asyncio.to_thread(_configured_hubs)
+    hub_address = await grid_admission.acquire_async(hubs, priority, due, timeout, should_abort)
+    return await asyncio.to_thread(_connect, hub_address, profile or DRIVER_PROFILE)
+
+def _configured_hubs() -> List[Tuple[str, float]]:
+    configuration = configuration_services.get_configuration()
+
+    hubs = parse_hubs(configuration.hub_address) if configuration and configuration.hub_address else []
+    if not hubs:
+        raise Exception("Selenium hub address not configured. Please set hub_address in configuration.")
+    return hubs
+
+def _connect(hub_address: str, profile: str):
+    """Start a session on a hub granted by the admission queue and report the outcome back to it"""
+    logger.info(f"Connecting to remote Selenium hub: {hub_address} (profile: {profile})")
+
+    started = time.monotonic()
+    created = False
     try:
         dr = webdriver.Remote(
-            command_executor=configuration.hub_address,
-            options=options
+            command_executor=ChromiumRemoteConnection(
+                remote_server_addr=hub_address,
+                vendor_prefix="goog",
+                browser_name="chrome"
+            ),
+            options=build_options(profile)
         )
+        created = True
+        apply_profile(dr, profile)
         logger.info("Successfully connected to Selenium hub")
         return dr
     except Exception as e:
         logger.error(f"Failed to connect to Selenium hub: {e}")
-        raise Exception(f"Could not connect to Selenium hub at {configuration.hub_address}: {str(e)}")
+        raise Exception(f"Could not connect to Selenium hub at {hub_address}: {str(e)}")
+    finally:
+        grid_admission.created(hub_address, time.monotonic() - started, created)
+
+def click(driver, element):
+    """
+    Click an element, falling back to a JavaScript click when it has no clickable box.
+
+    Without stylesheets (lean profile) custom widgets such as the portal's
+    iCheck checkboxes render with no size and refuse native clicks.
+
+    Args:
+        driver: Selenium WebDriver instance
+        element: Element to click
+    """
+    try:
+        element.click()
+    except (ElementNotInteractableException, ElementClickInterceptedException):
+        driver.execute_script("arguments[0].click();", element)
 
 def get_main_url() -> str:
     configuration = configuration_services.get_configuration()
-    return configuration.base_url
\ No newline at end of file
+    return configuration.base_url
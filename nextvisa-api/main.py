@@ -26,7 +26,10 @@ from controllers.configuration_controller import router as configuration_router
 from controllers.applicant_controller import router as applicant_router
 from controllers.re_schedule_controller import router as re_schedule_router
 from controllers.re_schedule_log_controller import router as re_schedule_log_router
+from controllers.scheduler_controller import router as scheduler_router
 from lib.scheduler import scheduler
+from lib.cancellation import cancellations
+from lib.driver_pool import driver_pool
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +41,7 @@ async def lifespan(app: FastAPI):
         scheduler.start()
     except Exception as e:
         logger.error(f"Error starting Scheduler: {e}", exc_info=True)
+    driver_pool.start()
     
     yield
     
@@ -46,6 +50,7 @@ async def lifespan(app: FastAPI):
         scheduler.stop()
     except Exception as e:
         logger.error(f"Error stopping Scheduler: {e}", exc_info=True)
+    driver_pool.shutdown()
 
 app = FastAPI(
     title="NextVisa API",
@@ -80,11 +85,14 @@ def get_status():
         "timestamp": datetime.now().isoformat(),
         "service": "Quick Visa API",
         "version": "0.0.1",
-        "database": "supabase - postgres"
+        "database": "supabase - postgres",
+        "scheduler": scheduler.get_queue_stats(),
+        "cancellation": cancellations.stats()
     }
 
 # Register routers
 app.include_router(configuration_router, prefix="/api/configuration", tags=["configuration"])
 app.include_router(applicant_router, prefix="/api/applicants", tags=["applicants"])
 app.include_router(re_schedule_router, prefix="/api/re-schedules", tags=["re-schedules"])
-app.include_router(re_schedule_log_router)
\ No newline at end of file
+app.include_router(re_schedule_log_router)
+app.include_router(scheduler_router, prefix="/api/scheduler", tags=["scheduler"])
\ No newline at end of file
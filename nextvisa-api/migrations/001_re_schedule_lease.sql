@@ -0,0 +1,5 @@
+-- Lease-based ownership of re_schedule rows across scheduler nodes
+alter table re_schedule add column if not exists claimed_by text;
+alter table re_schedule add column if not exists lease_expires_at timestamptz;
+
+create index if not exists re_schedule_status_lease_idx on re_schedule (status, lease_expires_at);
@@ -0,0 +1,7 @@
+-- Encrypted portal session cookies per applicant, reused by monitors instead of logging in again
+create table if not exists applicant_session (
+    applicant bigint primary key references applicant (id) on delete cascade,
+    cookies text not null,
+    expires_at timestamptz not null,
+    updated_at timestamptz not null default now()
+);
@@ -0,0 +1,3 @@
+-- Portal facilities an applicant can be re-scheduled at, as a comma separated list of facility ids
+-- in order of preference; null uses DEFAULT_FACILITY_ID
+alter table applicant add column if not exists facilities text;
@@ -19,6 +19,7 @@ class ApplicantBase(BaseModel):
     schedule_date: Optional[str] = None
     min_date: Optional[str] = None
     max_date: Optional[str] = None
+    facilities: Optional[str] = Field(None, max_length=200, description="Comma separated portal facility ids, most preferred first")
     schedule: Optional[str] = None
     re_schedule_status: Optional[ApplicantStatus] = ApplicantStatus.PENDING
 
@@ -31,6 +32,7 @@ class ApplicantCreate(BaseModel):
     schedule_date: Optional[str] = None
     min_date: Optional[str] = None
     max_date: Optional[str] = None
+    facilities: Optional[str] = Field(None, max_length=200, pattern=r"^\s*(\d+\s*(,\s*\d+\s*)*)?$", description="Comma separated portal facility ids, most preferred first")
     re_schedule_status: Optional[ApplicantStatus] = ApplicantStatus.LOGIN_PENDING
     
 class ApplicantUpdate(BaseModel):
@@ -42,6 +44,7 @@ class ApplicantUpdate(BaseModel):
     schedule_date: Optional[str] = None
     min_date: Optional[str] = None
     max_date: Optional[str] = None
+    facilities: Optional[str] = Field(None, max_length=200, pattern=r"^\s*(\d+\s*(,\s*\d+\s*)*)?$", description="Comma separated portal facility ids, most preferred first")
     schedule: Optional[str] = None
     updated_at: Optional[str] = None
 
@@ -55,6 +58,7 @@ class ApplicantResponse(BaseModel):
     schedule_date: Optional[str] = None
     min_date: Optional[str] = None
     max_date: Optional[str] = None
+    facilities: Optional[str] = Field(None, max_length=200, description="Comma separated portal facility ids, most preferred first")
     schedule: Optional[str] = None
     re_schedule_status: Optional[ApplicantStatus] = ApplicantStatus.PENDING
     created_at: str
@@ -13,6 +13,10 @@ class ScheduleStatus(str, Enum):
     LOGIN_PENDING = "LOGIN_PENDING"
     SCHEDULED = "SCHEDULED"
 
+
+# Statuses after which a running monitor has nothing left to do
+TERMINAL_STATUSES = {ScheduleStatus.COMPLETED, ScheduleStatus.FAILED, ScheduleStatus.NOT_FOUND}
+
 class ReScheduleBase(BaseModel):
     """Base schema for ReSchedule with common fields"""
     applicant: int = Field(..., gt=0, description="Applicant ID (foreign key)")
@@ -45,6 +49,8 @@ class ReScheduleResponse(BaseModel):
     end_datetime: Optional[str] = None
     status: ScheduleStatus
     error: Optional[str] = None
+    claimed_by: Optional[str] = None
+    lease_expires_at: Optional[str] = None
     created_at: str
     updated_at: str
     
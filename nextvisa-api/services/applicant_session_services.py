@@ -0,0 +1,97 @@
+from lib.database import SupabaseConnection
+from lib.security import encrypt_password, decrypt_password
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+TABLE_NAME = "applicant_session"
+
+# Upper bound for how long a cached session is trusted when its cookies carry no expiry
+SESSION_CACHE_TTL_SECONDS = int(os.getenv("SESSION_CACHE_TTL_SECONDS", "1200"))
+SESSION_CACHE_ENABLED = os.getenv("SESSION_CACHE_ENABLED", "true").lower() == "true"
+
+
+def _get_db():
+    """Helper function to get database client"""
+    return SupabaseConnection.get_client()
+
+
+def _session_expiry(cookies: List[dict]) -> datetime:
+    """Earliest cookie expiry, capped at SESSION_CACHE_TTL_SECONDS from now"""
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=SESSION_CACHE_TTL_SECONDS)
+    for cookie in cookies:
+        if cookie.get("expiry"):
+            expires_at = min(expires_at, datetime.fromtimestamp(cookie["expiry"], timezone.utc))
+    return expires_at
+
+
+def get_applicant_session(applicant_id: int) -> Optional[List[dict]]:
+    """
+    Get the cached portal cookies of an applicant if they have not expired
+
+    Args:
+        applicant_id: ID of the applicant
+
+    Returns:
+        List of cookies (name, value, domain, path, expiry) or None
+    """
+    if not SESSION_CACHE_ENABLED:
+        return None
+
+    try:
+        db = _get_db()
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        response = db.from_(TABLE_NAME).select("*").eq("applicant", applicant_id).gt("expires_at", now).execute()
+
+        if response.data and len(response.data) > 0:
+            return json.loads(decrypt_password(response.data[0]["cookies"]))
+        return None
+    except Exception as e:
+        logger.warning(f"Unable to read cached session for applicant {applicant_id}: {e}")
+        return None
+
+
+def save_applicant_session(applicant_id: int, cookies: List[dict]):
+    """
+    Cache the portal cookies of an authenticated applicant session, encrypted
+
+    Args:
+        applicant_id: ID of the applicant
+        cookies: Cookies as returned by driver.get_cookies() or portal_http.export_cookies()
+    """
+    if not SESSION_CACHE_ENABLED or not cookies:
+        return
+
+    try:
+        db = _get_db()
+        expires_at = _session_expiry(cookies)
+        db.from_(TABLE_NAME).upsert({
+            "applicant": applicant_id,
+            "cookies": encrypt_password(json.dumps(cookies)),
+            "expires_at": expires_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "updated_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        }).execute()
+        logger.info(f"Cached portal session for applicant {applicant_id} until {expires_at}")
+    except Exception as e:
+        logger.warning(f"Unable to cache session for applicant {applicant_id}: {e}")
+
+
+def delete_applicant_session(applicant_id: int):
+    """
+    Forget the cached session of an applicant, e.g. after the portal expired it
+
+    Args:
+        applicant_id: ID of the applicant
+    """
+    if not SESSION_CACHE_ENABLED:
+        return
+
+    try:
+        db = _get_db()
+        db.from_(TABLE_NAME).delete().eq("applicant", applicant_id).execute()
+    except Exception as e:
+        logger.warning(f"Unable to delete cached session for applicant {applicant_id}: {e}")
@@ -1,27 +1,49 @@
-﻿import json
+﻿import asyncio
+import json
 import logging
+import os
 from datetime import datetime
-from typing import Dict, Optional, List
+from typing import Any, Dict, Optional, List, Tuple
+from urllib.parse import urlsplit
 import time
 import re
 from xmlrpc.client import DateTime
 
-import requests
+import httpx
 import random
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait as Wait
 from selenium.webdriver.common.by import By
-from lib.webdriver import get_driver, get_main_url
+from lib.webdriver import get_driver_async, get_main_url, click
+from lib.grid_admission import grid_admission, PRIORITY_MONITOR
 from models.applicant import ApplicantBase
-from services import re_schedule_services, applicant_services, configuration_services, re_schedule_log_services
+from services import re_schedule_services, applicant_services, configuration_services, re_schedule_log_services, applicant_session_services
 from models.re_schedule import ReScheduleUpdate, ScheduleStatus
 from models.re_schedule_log import ReScheduleLogCreate, LogState
 from lib import security
 from lib.pushhover import PushHover
+from lib.availability_poller import pollers, Subscription
+from lib.cadence import CadencePolicy
+from lib.days_changes import DaysTracker
+from lib.date_windows import CANDIDATE_DATES, DateWindow, DaysIndex, days_list
+from lib.facility_catalogue import facility_catalogue, parse_facilities, parse_facility_ids
+from lib.cancellation import cancellations, CancellationToken
+from lib.exceptions import MonitorCancelledException
+from lib.monitor_stats import monitor_stats, MonitorStats
+from lib.driver_pool import driver_pool
+from lib import portal_http
+from lib.exceptions import PortalLoginException, PortalSessionExpiredException, GridCapacityException, PortalUnavailableException
+from lib.exceptions import DriverPoolExhaustedException
+from lib.portal_resilience import portal_resilience, BOOKING_TIMEOUT_SECONDS
+from lib.request_governor import request_governor, PRIORITY_BOOKING, PRIORITY_LOGIN, PRIORITY_POLL
+from lib.browser_flow import BrowserFlow, step_stats
 
 logger = logging.getLogger(__name__)
 pushhover = PushHover()
 
+# Log in with plain HTTP requests and start a browser only when that fails
+HTTP_LOGIN = os.getenv("HTTP_LOGIN", "true").lower() == "true"
+
 def test_credentials(email: str, password: str) -> Dict[str, Optional[str]]:
     """
     Test applicant credentials by attempting login and extracting schedule number.
@@ -31,95 +53,184 @@ def test_credentials(email: str, password: str) -> Dict[str, Optional[str]]:
         password: Applicant's password
 
     Returns:
-        Dict with keys: success (bool), schedule (str|None), error (str|None)
+        Dict with keys: success (bool), schedule (str|None), error (str|None), and
+        retry_after (seconds|None) when the check could not run (grid or pool full,
+        browser or portal errors). success is False without retry_after only when
+        the portal rejected the credentials.
     """
-    driver = None
-    try:
-        driver = get_driver()
-        
-        # Attempt login
-        config = configuration_services.get_configuration()
-        
-        if not config or not config.base_url:
-            raise Exception("Configuration missing base URL")
+    if HTTP_LOGIN:
+        try:
+            return asyncio.run(__test_credentials_http(email, password))
+        except PortalLoginException as e:
+            if e.invalid_credentials:
+                logger.warning(e.message)
+                return {
+                    "success": False,
+                    "schedule": None,
+                    "error": f"Error: {e.reason}"
+                }
+            logger.warning(f"{e.message} - falling back to Selenium")
+        except Exception as e:
+            logger.warning(f"HTTP credential test failed for {email}: {e} - falling back to Selenium")
 
-        login_url = f"{config.base_url}/users/sign_in"
-        __do_login(driver, login_url, email, password)
+    try:
+        # Borrow a pre-started, wiped session instead of starting Chrome on the hub
+        with driver_pool.session() as driver:
+            # Attempt login
+            config = configuration_services.get_configuration()
         
-        logger.info("Login successful for credentials - extracting schedule number")
+            if not config or not config.base_url:
+                raise Exception("Configuration missing base URL")
 
-        # Extract schedule number from URL
-        current_url = driver.current_url
-        logger.info(f"Current URL: {current_url}")
-
-        # Look for schedule number in URL pattern: /schedule/{SCHEDULE}/
-        schedule_match = re.search(r'/schedule/(\d+)/', current_url)
-        if schedule_match:
-            schedule_number = schedule_match.group(1)
-            logger.info(f"Extracted schedule number: {schedule_number}")
-            return {
-                "success": True,
-                "schedule": schedule_number,
-                "error": None
-            }
-        else:
-            # Try to navigate to an appointment page to get schedule from URL
+            login_url = f"{config.base_url}/users/sign_in"
             try:
-                # Look for an appointment or continue button
-                continue_btn = driver.find_element(By.CSS_SELECTOR, ".button.primary.small")
-                continue_btn.click()
-                time.sleep(2)
-
-                current_url = driver.current_url
-                schedule_match = re.search(r'/schedule/(\d+)/', current_url)
-                if schedule_match:
-                    schedule_number = schedule_match.group(1)
-                    logger.info(f"Extracted schedule number: {schedule_number}")
-                    return {
-                        "success": True,
-                        "schedule": schedule_number,
-                        "error": None
-                    }
-            except Exception as e:
-                logger.warning(f"Could not navigate to get schedule: {e}")
-
-            logger.warning("Could not extract schedule number from URL")
-            return {
-                "success": True,
-                "schedule": None,
-                "error": "Login successful but could not extract schedule number"
-            }
-
+                __do_login(driver, login_url, email, password)
+            except Exception:
+                if not __login_rejected(driver):
+                    raise
+                logger.warning(f"Portal rejected the credentials of {email}")
+                return {
+                    "success": False,
+                    "schedule": None,
+                    "error": "Error: Invalid email or password"
+                }
+        
+            logger.info("Login successful for credentials - extracting schedule number")
+
+            # Extract schedule number from URL
+            current_url = driver.current_url
+            logger.info(f"Current URL: {current_url}")
+
+            # Look for schedule number in URL pattern: /schedule/{SCHEDULE}/
+            schedule_match = re.search(r'/schedule/(\d+)/', current_url)
+            if schedule_match:
+                schedule_number = schedule_match.group(1)
+                logger.info(f"Extracted schedule number: {schedule_number}")
+                return {
+                    "success": True,
+                    "schedule": schedule_number,
+                    "error": None
+                }
+            else:
+                # Try to navigate to an appointment page to get schedule from URL
+                try:
+                    # Look for an appointment or continue button
+                    continue_btn = driver.find_element(By.CSS_SELECTOR, ".button.primary.small")
+                    click(driver, continue_btn)
+                    flow = BrowserFlow("credential_test", driver)
+                    flow.wait("continue", EC.url_matches(r'/schedule/\d+/'), 5)
+
+                    current_url = driver.current_url
+                    schedule_match = re.search(r'/schedule/(\d+)/', current_url)
+                    if schedule_match:
+                        schedule_number = schedule_match.group(1)
+                        logger.info(f"Extracted schedule number: {schedule_number}")
+                        return {
+                            "success": True,
+                            "schedule": schedule_number,
+                            "error": None
+                        }
+                except Exception as e:
+                    logger.warning(f"Could not navigate to get schedule: {e}")
+
+                logger.warning("Could not extract schedule number from URL")
+                return {
+                    "success": True,
+                    "schedule": None,
+                    "error": "Login successful but could not extract schedule number"
+                }
+    except GridCapacityException as e:
+        logger.warning(e.message)
+        return {
+            "success": False,
+            "schedule": None,
+            "error": e.message,
+            "retry_after": e.eta_seconds
+        }
+    except DriverPoolExhaustedException as e:
+        logger.warning(e.message)
+        return {
+            "success": False,
+            "schedule": None,
+            "error": e.message,
+            "retry_after": None
+        }
     except Exception as e:
+        # Timeouts, hub or browser errors: the credentials were never judged
         logger.error(f"Error testing credentials: {e}", exc_info=True)
         return {
             "success": False,
             "schedule": None,
-            "error": f"Error: {str(e)}"
+            "error": f"Error: {str(e)}",
+            "retry_after": None
         }
-    finally:
-        if driver:
-            try:
-                driver.quit()
-            except Exception as ex:
-                logger.warning("Could not quit Selenium driver", ex)
 
-def process_re_schedule(re_schedule_id: int):
+async def __test_credentials_http(email: str, password: str) -> Dict[str, Optional[str]]:
+    config = configuration_services.get_configuration()
+    if not config or not config.base_url:
+        raise Exception("Configuration missing base URL")
+
+    login_url = f"{config.base_url}/users/sign_in"
+    async with portal_http.new_client(login_url) as client:
+        landing = await portal_http.http_login(client, login_url, email, password)
+
+    schedule_number = portal_http.extract_schedule_number(str(landing.url)) or portal_http.extract_schedule_number(landing.text)
+    if schedule_number:
+        logger.info(f"Extracted schedule number: {schedule_number}")
+        return {
+            "success": True,
+            "schedule": schedule_number,
+            "error": None
+        }
+
+    logger.warning("Could not extract schedule number from account page")
+    return {
+        "success": True,
+        "schedule": None,
+        "error": "Login successful but could not extract schedule number"
+    }
+
+def process_re_schedule(re_schedule_id: int, prewarmed: bool = False):
+    """
+    Run a re-schedule monitor to completion on its own event loop.
+
+    Used by the thread backend and the manual process endpoint; the asyncio
+    backend awaits process_re_schedule_async directly on a shared loop.
+
+    Args:
+        re_schedule_id: ID of the re-schedule to process
+        prewarmed: Started by the prewarm job, PREWARM_LEAD_SECONDS ahead of start_datetime
+    """
+    asyncio.run(process_re_schedule_async(re_schedule_id, prewarmed))
+
+async def process_re_schedule_async(re_schedule_id: int, prewarmed: bool = False):
     driver = None
+    client = None
+    subscription = None
+    poller_keys = []
+    token = cancellations.register(re_schedule_id)
+    stats = monitor_stats.track(re_schedule_id)
+    stats.prewarmed = prewarmed
     try:
+        # Deleted or stopped while waiting in the monitor queue
+        token.raise_if_cancelled()
+
         # Mark as PROCESSING and set the start time
-        re_schedule_services.update_re_schedule(
+        await asyncio.to_thread(
+            re_schedule_services.update_re_schedule,
             re_schedule_id,
             ReScheduleUpdate(status=ScheduleStatus.PROCESSING)
         )
         logger.info(f"Processing re-schedule {re_schedule_id}")
 
-        rs = re_schedule_services.get_re_schedule_by_id(re_schedule_id)
+        rs = await asyncio.to_thread(re_schedule_services.get_re_schedule_by_id, re_schedule_id)
+        if rs.get('start_datetime'):
+            stats.start_datetime = datetime.strptime(str(rs.get('start_datetime')).replace("T", " ")[:19], "%Y-%m-%d %H:%M:%S")
         applicant_id = rs.get('applicant')
         if not applicant_id:
             raise Exception("Missing applicant id")
 
-        applicant = applicant_services.get_applicant_with_password(applicant_id)
+        applicant = await asyncio.to_thread(applicant_services.get_applicant_with_password, applicant_id)
         email = applicant.get('email')
         password = security.decrypt_password(applicant.get('password'))
         schedule_number = applicant.get('schedule')
@@ -127,7 +238,12 @@ def process_re_schedule(re_schedule_id: int):
         if not email or not password or not schedule_number:
             raise Exception("Applicant email, password or schedule missing")
 
-        config = configuration_services.get_configuration()
+        # Parsed once; every days list is matched against these ordinals
+        window = DateWindow.compile(applicant)
+        # Facilities to watch, most preferred first
+        facilities = parse_facility_ids(applicant.get('facilities'))
+
+        config = await asyncio.to_thread(configuration_services.get_configuration)
 
         # Build base URLs from configuration
         logger.info(f"Using configuration: {config}")
@@ -138,144 +254,309 @@ def process_re_schedule(re_schedule_id: int):
             raise Exception("Selenium hub address missing")
 
         appointment_url = f"{base_url}/schedule/{schedule_number}/appointment"
-        days_url = f"{base_url}/schedule/{schedule_number}/appointment/days/143.json?appointments[expedite]=false"
-        times_url_tmpl = f"{base_url}/schedule/{schedule_number}/appointment/times/143.json?date=%s&appointments[expedite]=false"
 
-        driver = get_driver()
+        # Parse end_datetime once to avoid repeated parsing
+        end_datetime = datetime.strptime(str(rs.get('end_datetime')).replace("T", " "), "%Y-%m-%d %H:%M:%S")
+
+        warm_started = time.monotonic()
+        stats.phase = "prewarming"
         login_url = f"{base_url}/users/sign_in"
-        log_re_schedule(re_schedule_id, "Trying to login in platform", LogState.INFO)
-        __do_login(driver, login_url, email, password)
-        log_re_schedule(re_schedule_id, "Login successful", LogState.INFO)
+        await __log_async(re_schedule_id, "Trying to login in platform", LogState.INFO)
+
+        # Reuse a cached portal session, else log in over HTTP; a browser is the last resort
+        client = portal_http.new_client(appointment_url)
+        if await token.guard(__restore_session(client, applicant_id, email, appointment_url, re_schedule_id)):
+            await __log_async(re_schedule_id, "Reusing cached portal session", LogState.INFO)
+        elif HTTP_LOGIN and await token.guard(__http_login(client, login_url, appointment_url, email, password, re_schedule_id)):
+            await __save_session(applicant_id, client)
+        else:
+            await client.aclose()
+            client = None
 
-        # TODO: add email or password invalid validation
-        Wait(driver, 10).until(EC.presence_of_element_located((By.CSS_SELECTOR, ".button.primary.small")))
+        if not client:
+            # Monitors closest to their start time get the next free grid slot; waiting is worth it until the window closes
+            try:
+                driver = await get_driver_async(
+                    priority=PRIORITY_MONITOR,
+                    due=stats.start_datetime.timestamp() if stats.start_datetime else None,
+                    timeout=max((end_datetime - datetime.now()).total_seconds(), 0),
+                    should_abort=lambda: token.cancelled
+                )
+            except GridCapacityException:
+                token.raise_if_cancelled()
+                raise
+            stats.selenium_session = True
+            await token.guard(asyncio.to_thread(__do_login, driver, login_url, email, password))
+            await __log_async(re_schedule_id, "Login successful", LogState.INFO)
+
+            # TODO: add email or password invalid validation
+            await token.guard(asyncio.to_thread(
+                Wait(driver, 10).until,
+                EC.presence_of_element_located((By.CSS_SELECTOR, ".button.primary.small"))
+            ))
+
+            # Redirect to re-schedule page
+            await __log_async(re_schedule_id, "Redirecting to re-schedule page", LogState.INFO)
+            await token.guard(asyncio.to_thread(__open_appointment_page, driver, appointment_url))
+
+            # Data calls go through one async HTTP client carrying the browser session
+            client = await asyncio.to_thread(__build_http_client, driver, appointment_url)
+            await __save_session(applicant_id, client)
+
+        # Booking form captured while warm, so a found slot is booked with an in-memory payload
+        booking_form = await token.guard(__capture_booking_form(driver, client, base_url, appointment_url, email, re_schedule_id))
+        form_retry_at = 0.0
+
+        # The appointment page just refreshed the facility catalogue; ids the portal does not offer are dropped
+        unknown = facility_catalogue.unknown(base_url, facilities)
+        if unknown:
+            facilities = [facility for facility in facilities if facility not in unknown]
+            logger.warning(f"Re-schedule {re_schedule_id}: portal does not offer facilities {', '.join(unknown)}")
+            await __log_async(re_schedule_id, f"Ignoring unknown facilities: {', '.join(unknown)}", LogState.WARNING)
+            if not facilities:
+                raise Exception("None of the applicant's facilities is offered by the portal")
+        days_urls = {
+            facility: f"{base_url}/schedule/{schedule_number}/appointment/days/{facility}.json?appointments[expedite]=false"
+            for facility in facilities
+        }
+        times_url_tmpls = {
+            facility: f"{base_url}/schedule/{schedule_number}/appointment/times/{facility}.json?date=%s&appointments[expedite]=false"
+            for facility in facilities
+        }
 
-        # Redirect to re-schedule page
-        log_re_schedule(re_schedule_id, "Redirecting to re-schedule page", LogState.INFO)
-        driver.get(appointment_url)
-        if driver.find_elements(By.NAME, "confirmed_limit_message"):
-            Wait(driver, 2).until(EC.presence_of_element_located((By.NAME, 'confirmed_limit_message')))
-            driver.find_element(By.CSS_SELECTOR, '.icheckbox').click()
-            time.sleep(2)
-            driver.find_element(By.NAME, 'commit').click()
+        # The scheduler starts monitors ahead of start_datetime - hold the warm session until then
+        stats.phase = "waiting_for_start"
+        await __wait_for_start(rs.get('start_datetime'), time.monotonic() - warm_started, token, prewarmed)
 
         re_schudule_completed = False
         datetime_found = False
-        
-        # Parse end_datetime once to avoid repeated parsing
-        end_datetime = datetime.strptime(str(rs.get('end_datetime')).replace("T", " "), "%Y-%m-%d %H:%M:%S")
-        logger.info(f"Starting re-schedule loop for {re_schedule_id} until {end_datetime}")
-        log_re_schedule(re_schedule_id, f"Starting re-schedule monitoring until {end_datetime}", LogState.INFO)
+        # Set when a data call did not return JSON - the only expiry signal without a browser
+        session_suspect = False
+
+        # Days list of each facility this monitor last acted on; the same list again is skipped
+        handled_digests: Dict[str, Optional[str]] = {}
+
+        # Monitors of the same facility share one days poller instead of each polling it
+        cadence = None
+        trackers = None
+        if pollers.enabled:
+            poller_keys = [(base_url, facility) for facility in facilities]
+            subscription = Subscription(
+                re_schedule_id, days_urls, appointment_url, client.headers["User-Agent"], client.cookies, end_datetime, window, email
+            )
+            for poller_key in poller_keys:
+                pollers.subscribe(poller_key, subscription, config.sleep_time)
+        else:
+            cadence = CadencePolicy(config.sleep_time)
+            trackers = {facility: DaysTracker((base_url, facility)) for facility in facilities}
+        stats.start_polling()
+        facility_names = ", ".join(facility_catalogue.name(base_url, facility) for facility in facilities)
+        logger.info(f"Starting re-schedule loop for {re_schedule_id} until {end_datetime} at {facility_names}")
+        await __log_async(re_schedule_id, f"Starting re-schedule monitoring until {end_datetime} at {facility_names}", LogState.INFO)
         
         # Continue while current time is BEFORE end_datetime AND process not completed
         while datetime.now() < end_datetime and not re_schudule_completed:
-            time.sleep(config.sleep_time)
-            logger.info(f"Re-schedule {re_schedule_id}: Checking for available appointments...")
-
-            # Check session before getting dates
-            if __is_session_expired(driver):
-                logger.warning(f"Session expired before checking dates for re-schedule {re_schedule_id}")
-                if not __attempt_relogin_with_retry(driver, login_url, email, password, re_schedule_id):
-                    # Failed to recover session - terminate process
-                    raise Exception("Session expired and could not be recovered after 3 attempts")
-                
-                # After successful re-login, navigate back to appointment page
-                logger.info(f"Navigating back to appointment page after re-login")
-                driver.get(appointment_url)
-                time.sleep(2)
-
-            # Get available dates via requests with Selenium cookies
-            log_re_schedule(re_schedule_id, "Checking for available dates", LogState.INFO)
-            dates = __get_dates(driver, appointment_url, days_url, re_schedule_id)
-            
-            # Handle empty response
-            if not dates:
-                logger.info(f"No dates available for re-schedule {re_schedule_id} - will retry in next iteration")
-                log_re_schedule(re_schedule_id, "No dates available at this time", LogState.WARNING)
-                continue
-            
-            # Extract dates list from response (can be dict or list)
-            if isinstance(dates, dict):
-                dates_list: List[dict] = dates.get('available_dates') or dates.get('dates') or []
-            elif isinstance(dates, list):
-                dates_list = dates
+            # Read the booking form again after a re-login or once it is old, off the booking path
+            if (booking_form is None or booking_form.stale()) and time.monotonic() >= form_retry_at:
+                booking_form = await token.guard(__capture_booking_form(None, client, base_url, appointment_url, email, re_schedule_id)) or booking_form
+                form_retry_at = time.monotonic() + 30
+
+            if subscription:
+                # Wake up on the next shared snapshots, or when the window closes
+                remaining = (end_datetime - datetime.now()).total_seconds()
+                snapshots = await token.guard(subscription.next_snapshots(timeout=max(remaining, 0)))
+                if not snapshots:
+                    continue
+                logger.info(f"Re-schedule {re_schedule_id}: Checking shared availability snapshots...")
+                for snapshot in snapshots:
+                    stats.record_poll(snapshot.latency)
+                    # The poller was polling with this monitor's session when the portal ended it
+                    if snapshot.session_expired and snapshot.source == re_schedule_id:
+                        session_suspect = True
+
+                # Check session before acting on the snapshots
+                if await token.guard(__ensure_session(driver, client, login_url, appointment_url, email, password, applicant_id, re_schedule_id, session_suspect)):
+                    subscription.update_session(client.cookies)
+                    booking_form = None
+                session_suspect = False
+
+                # The pollers already matched these lists against the window
+                polled = [
+                    (snapshot.facility, snapshot.data, snapshot.digest,
+                     snapshot.matches.get(re_schedule_id) if snapshot.matches is not None else None)
+                    for snapshot in snapshots if not snapshot.error
+                ]
             else:
-                logger.warning(f"Unexpected dates format for re-schedule {re_schedule_id}: {type(dates)}")
-                log_re_schedule(re_schedule_id, f"Unexpected dates format received", LogState.WARNING)
+                await token.guard(asyncio.sleep(cadence.next_delay((end_datetime - datetime.now()).total_seconds())))
+                logger.info(f"Re-schedule {re_schedule_id}: Checking for available appointments...")
+
+                # Check session before getting dates
+                if await token.guard(__ensure_session(driver, client, login_url, appointment_url, email, password, applicant_id, re_schedule_id, session_suspect)):
+                    booking_form = None
+                session_suspect = False
+
+                # Get available dates of every facility via the HTTP client with Selenium cookies
+                # Python log only: a re-schedule log row per poll is what change detection avoids
+                logger.debug(f"Re-schedule {re_schedule_id}: checking available dates at {len(days_urls)} facilities")
+                poll_started = time.monotonic()
+                try:
+                    facility_dates = await __get_facility_dates(client, days_urls, email, re_schedule_id, trackers)
+                except PortalSessionExpiredException as e:
+                    stats.record_poll(time.monotonic() - poll_started)
+                    cadence.observe(None, error=True)
+                    logger.warning(f"Re-schedule {re_schedule_id}: {e.message}")
+                    # Log in again now so the next poll goes out on time
+                    if await token.guard(__ensure_session(driver, client, login_url, appointment_url, email, password, applicant_id, re_schedule_id, True)):
+                        booking_form = None
+                    continue
+                for _ in facility_dates:
+                    stats.record_poll(time.monotonic() - poll_started)
+                session_suspect = any(isinstance(dates, str) for _, dates, _ in facility_dates)
+                # A poll without a list failed or was held back by the circuit breaker; the cadence backs off
+                cadence.observe(tuple(digest for _, _, digest in facility_dates),
+                                error=any(digest is None for _, _, digest in facility_dates))
+                # Failed polls were already logged by __get_dates
+                polled = [(facility, dates, digest, None) for facility, dates, digest in facility_dates if digest is not None or dates]
+
+            # Candidate (date, facility) pairs of every days list that changed since this monitor acted on it
+            candidates = []
+            for facility, dates, digest, matched in polled:
+                # Same days list as last time: nothing new to match, look up or log
+                if digest is not None and digest == handled_digests.get(facility):
+                    logger.debug(f"Re-schedule {re_schedule_id}: days list of facility {facility} unchanged")
+                    continue
+                handled_digests[facility] = digest
+                facility_name = facility_catalogue.name(base_url, facility)
+
+                # Handle empty response
+                if not dates:
+                    logger.info(f"No dates available at {facility_name} for re-schedule {re_schedule_id} - will retry in next iteration")
+                    await __log_async(re_schedule_id, f"No dates available at {facility_name} at this time", LogState.WARNING)
+                    continue
+
+                # Extract dates list from response (can be dict or list)
+                dates_list = days_list(dates)
+                if dates_list is None:
+                    logger.warning(f"Unexpected dates format for re-schedule {re_schedule_id}: {type(dates)}")
+                    await __log_async(re_schedule_id, f"Unexpected dates format received for {facility_name}", LogState.WARNING)
+                    continue
+
+                # Check if we actually have dates
+                if not dates_list:
+                    logger.info(f"No dates in list at {facility_name} for re-schedule {re_schedule_id} - will retry")
+                    await __log_async(re_schedule_id, f"No dates available at {facility_name} at this time", LogState.WARNING)
+                    continue
+
+                # Log the earliest available date
+                earliest_date = dates_list[0].get('date') if isinstance(dates_list[0], dict) else dates_list[0]
+                logger.info(f"Earlier date available at {facility_name}: {earliest_date}")
+                await __log_async(re_schedule_id, f"Earlier date available at {facility_name}: {earliest_date}", LogState.INFO)
+
+                found = matched if matched is not None else DaysIndex(dates_list).candidates(window)
+                if not found:
+                    logger.info(f"No available dates at {facility_name} for re-schedule {re_schedule_id} - will retry")
+                    await __log_async(re_schedule_id, f"No available dates at {facility_name} at this time", LogState.WARNING)
+                    continue
+                candidates.extend((day, facility) for day in found)
+
+            if not candidates:
                 continue
-            
-            # Check if we actually have dates
-            if not dates_list or len(dates_list) == 0:
-                logger.info(f"No dates in list for re-schedule {re_schedule_id} - will retry")
-                log_re_schedule(re_schedule_id, "No dates available at this time", LogState.WARNING)
-                continue
-            
-            # Log the earliest available date
-            earliest_date = dates_list[0].get('date') if isinstance(dates_list[0], dict) else dates_list[0]
-            logger.info(f"Earlier date available: {earliest_date}")
-            log_re_schedule(re_schedule_id, f"Earlier date available: {earliest_date}", LogState.INFO)
+            # Earliest dates first; on the same date the applicant's preferred facility
+            candidates = sorted(candidates, key=lambda candidate: (candidate[0], facilities.index(candidate[1])))[:CANDIDATE_DATES]
 
             # Check session before getting times
-            if __is_session_expired(driver):
-                logger.warning(f"Session expired before checking times for re-schedule {re_schedule_id}")
-                if not __attempt_relogin_with_retry(driver, login_url, email, password, re_schedule_id):
-                    raise Exception("Session expired and could not be recovered after 3 attempts")
-                driver.get(appointment_url)
-                time.sleep(2)
-
-            chosen_date = __get_available_date(dates_list, applicant)
-            if not chosen_date:
-                logger.info(f"No available dates for re-schedule {re_schedule_id} - will retry")
-                log_re_schedule(re_schedule_id, "No available dates at this time", LogState.WARNING)
+            if await token.guard(__ensure_session(driver, client, login_url, appointment_url, email, password, applicant_id, re_schedule_id, session_suspect)):
+                booking_form = None
+                if subscription:
+                    subscription.update_session(client.cookies)
+            session_suspect = False
+
+            # Times of the best few dates at once - a slot on a second choice does not cost another poll
+            candidate_list = ", ".join(f"{day} at {facility_catalogue.name(base_url, facility)}" for day, facility in candidates)
+            logger.info(f"Match found: {candidate_list}")
+            await __log_async(re_schedule_id, f"Checking available times for {candidate_list}", LogState.INFO)
+            try:
+                candidate_times = await __get_candidate_times(client, times_url_tmpls, candidates, email, re_schedule_id)
+            except PortalSessionExpiredException as e:
+                # A date is open right now: log in again and ask once more instead of waiting for the next poll
+                logger.warning(f"Re-schedule {re_schedule_id}: {e.message}")
+                candidate_times = None
+                if await token.guard(__ensure_session(driver, client, login_url, appointment_url, email, password, applicant_id, re_schedule_id, True)):
+                    booking_form = None
+                    if subscription:
+                        subscription.update_session(client.cookies)
+                    try:
+                        candidate_times = await __get_candidate_times(client, times_url_tmpls, candidates, email, re_schedule_id)
+                    except PortalSessionExpiredException as e:
+                        logger.warning(f"Re-schedule {re_schedule_id}: {e.message} right after re-login")
+                        session_suspect = True
+                if candidate_times is None:
+                    # Look at the same days lists again on the next poll instead of failing the re-schedule
+                    for _, facility in candidates:
+                        handled_digests[facility] = None
+                    await __log_async(re_schedule_id, "Could not check times after re-login - will retry", LogState.WARNING)
+                    continue
+
+            session_suspect = any(isinstance(times, str) for _, times in candidate_times)
+
+            # Best ranked date that still has times
+            chosen = next(((day, facility, times) for (day, facility), times in candidate_times if isinstance(times, list) and times), None)
+            if not chosen:
+                # Times can open before the days list changes - look at the same lists again next time
+                for _, facility in candidates:
+                    handled_digests[facility] = None
+                logger.info(f"No times available for {candidate_list} - will retry")
+                await __log_async(re_schedule_id, f"No times available for {candidate_list}", LogState.WARNING)
                 continue
+            chosen_date, chosen_facility, available_times = chosen
+            chosen_facility_name = facility_catalogue.name(base_url, chosen_facility)
 
-            # Get time for chosen date
-            log_re_schedule(re_schedule_id, f"Checking available times for {chosen_date}", LogState.INFO)
-            available_times = __get_times(driver, appointment_url, times_url_tmpl % chosen_date, re_schedule_id)
-            
-            # Handle empty response or unexpected format
-            if not available_times:
-                logger.info(f"No times available for date {chosen_date} - will retry")
-                log_re_schedule(re_schedule_id, f"No times available for {chosen_date}", LogState.WARNING)
-                continue
-            
-            # Validate that we have a list with items
-            if not isinstance(available_times, list) or len(available_times) == 0:
-                logger.info(f"Invalid times format or empty list for {chosen_date} - will retry")
-                log_re_schedule(re_schedule_id, f"Invalid times data received for {chosen_date}", LogState.WARNING)
-                continue
-                
             time_slot = available_times[-1]
-            logger.info(f"Selected time slot: {time_slot} for date {chosen_date}")
-            log_re_schedule(re_schedule_id, f"Selected appointment: {chosen_date} at {time_slot}", LogState.INFO)
+            chosen_at = time.perf_counter()
+            logger.info(f"Selected time slot: {time_slot} for date {chosen_date} at {chosen_facility_name}")
 
             datetime_found = True
             
             # Check session before performing reschedule
-            if __is_session_expired(driver):
-                logger.warning(f"Session expired before performing reschedule for re-schedule {re_schedule_id}")
-                if not __attempt_relogin_with_retry(driver, login_url, email, password, re_schedule_id):
-                    raise Exception("Session expired and could not be recovered after 3 attempts")
-                driver.get(appointment_url)
-                time.sleep(2)
-
-            # Perform reschedule via POST with cookies
-            log_re_schedule(re_schedule_id, "Attempting to perform reschedule with selected date and time", LogState.INFO)
-            rescheduled = __perform_reschedule(driver, appointment_url, chosen_date, time_slot, re_schedule_id)
+            if await token.guard(__ensure_session(driver, client, login_url, appointment_url, email, password, applicant_id, re_schedule_id, session_suspect)):
+                booking_form = None
+
+            # Last chance to stop - once the POST is on its way the monitor runs to completion
+            token.raise_if_cancelled()
+            cancellations.finish(token)
+            stats.phase = "booking"
+
+            # Perform reschedule via POST with cookies; the log write runs alongside it instead of ahead of it
+            booking_log = asyncio.create_task(__log_async(
+                re_schedule_id, f"Selected appointment: {chosen_date} at {time_slot} in {chosen_facility_name}. Attempting to perform reschedule", LogState.INFO
+            ))
+            try:
+                rescheduled = await __perform_reschedule(client, appointment_url, email, booking_form, chosen_facility, chosen_date, time_slot, re_schedule_id, stats, chosen_at)
+            except PortalSessionExpiredException as e:
+                # Nothing was booked; log in again and submit once more with a form of the new session
+                logger.warning(f"Re-schedule {re_schedule_id}: {e.message}")
+                await __ensure_session(driver, client, login_url, appointment_url, email, password, applicant_id, re_schedule_id, True)
+                rescheduled = await __perform_reschedule(client, appointment_url, email, None, chosen_facility, chosen_date, time_slot, re_schedule_id, stats, time.perf_counter())
+            finally:
+                await booking_log
             
             if rescheduled:
-                re_schuduel_completed = True
+                re_schudule_completed = True
                 logger.info(f"Re-schedule {re_schedule_id} completed successfully!")
-                re_schedule_services.update_re_schedule(
+                await asyncio.to_thread(
+                    re_schedule_services.update_re_schedule,
                     re_schedule_id,
                     ReScheduleUpdate(status=ScheduleStatus.COMPLETED, error=None, end_datetime=datetime.now())
                 )
-                log_re_schedule(
+                await __log_async(
                     re_schedule_id, 
-                    f"Re-schedule completed successfully! New appointment: {chosen_date} at {time_slot}", 
+                    f"Re-schedule completed successfully! New appointment: {chosen_date} at {time_slot} in {chosen_facility_name}", 
                     LogState.SUCCESS
                 )
-                pushhover.send_message(f"Successfully Rescheduled for {applicant.get('name')} {applicant.get('last_name')} on {chosen_date} at {time_slot}")
+                await asyncio.to_thread(
+                    pushhover.send_message,
+                    f"Successfully Rescheduled for {applicant.get('name')} {applicant.get('last_name')} on {chosen_date} at {time_slot} in {chosen_facility_name}"
+                )
                 
                 # Exit loop - process completed successfully
                 break
@@ -283,216 +564,503 @@ def process_re_schedule(re_schedule_id: int):
                 # If POST failed, stop the process immediately (fail-fast)
                 error_msg = "Reschedule POST request failed. Stopping process for safety."
                 logger.error(f"{error_msg} Re-schedule ID: {re_schedule_id}")
-                log_re_schedule(re_schedule_id, error_msg, LogState.ERROR)
-                re_schedule_services.update_re_schedule(
+                await __log_async(re_schedule_id, error_msg, LogState.ERROR)
+                await asyncio.to_thread(
+                    re_schedule_services.update_re_schedule,
                     re_schedule_id,
                     ReScheduleUpdate(status=ScheduleStatus.FAILED, error=error_msg, end_datetime=datetime.now())
                 )
                 raise Exception(error_msg)
         
+        cancellations.finish(token)
         if not datetime_found:
             logger.info(f"No suitable date found within time window for re-schedule {re_schedule_id}")
-            re_schedule_services.update_re_schedule(
+            await asyncio.to_thread(
+                re_schedule_services.update_re_schedule,
                 re_schedule_id,
                 ReScheduleUpdate(status=ScheduleStatus.NOT_FOUND, end_datetime=datetime.now(), error="No suitable date found")
             )
-            log_re_schedule(re_schedule_id, "Time window expired without finding suitable appointment", LogState.ERROR)
+            await __log_async(re_schedule_id, "Time window expired without finding suitable appointment", LogState.ERROR)
 
+    except MonitorCancelledException as e:
+        # Whoever cancelled the monitor owns the re-schedule status - only free resources
+        logger.info(e.message)
+        await __log_async(re_schedule_id, f"Monitoring stopped: {e.reason}", LogState.WARNING)
     except Exception as e:
+        cancellations.finish(token)
         logger.error(f"Error processing re-schedule {re_schedule_id}: {e}", exc_info=True)
-        log_re_schedule(re_schedule_id, f"Critical error during re-schedule process: {str(e)}", LogState.ERROR)
+        await __log_async(re_schedule_id, f"Critical error during re-schedule process: {str(e)}", LogState.ERROR)
         
         try:
-            re_schedule_services.update_re_schedule(
+            await asyncio.to_thread(
+                re_schedule_services.update_re_schedule,
                 re_schedule_id,
                 ReScheduleUpdate(status=ScheduleStatus.FAILED, end_datetime=datetime.now(), error=str(e))
             )
         except Exception as ex:
             logger.exception("Error updating re-schedule status", ex,  exc_info=True)
     finally:
-        # Always ensure driver is properly cleaned up
-        __safe_quit_driver(driver)
-
-def __perform_reschedule(driver, appointment_url: str, date_str: str, time_slot: str, re_schedule_id: int) -> bool:
-    data = {
-        "utf8": driver.find_element(By.NAME, 'utf8').get_attribute('value'),
-        "authenticity_token": driver.find_element(By.NAME, 'authenticity_token').get_attribute('value'),
-        "confirmed_limit_message": driver.find_element(By.NAME, 'confirmed_limit_message').get_attribute('value'),
-        "use_consulate_appointment_capacity": driver.find_element(By.NAME, 'use_consulate_appointment_capacity').get_attribute('value'),
-        "appointments[consulate_appointment][facility_id]": "143", # Tegucigalpa
-        "appointments[consulate_appointment][date]": date_str,
-        "appointments[consulate_appointment][time]": time_slot,
-    }
+        # Always ensure the poller subscription, HTTP client and driver are properly cleaned up
+        for poller_key in poller_keys:
+            pollers.unsubscribe(poller_key, subscription)
+        if client:
+            await client.aclose()
+        await asyncio.to_thread(__safe_quit_driver, driver)
+        cancellations.release(token)
+        monitor_stats.untrack(stats)
+
+def __open_appointment_page(driver, appointment_url: str):
+    flow = BrowserFlow("appointment_page", driver)
+    with flow.step("open", 10):
+        driver.get(appointment_url)
+    if driver.find_elements(By.NAME, "confirmed_limit_message"):
+        box = driver.find_element(By.CSS_SELECTOR, '.icheckbox')
+        click(driver, box)
+        flow.wait("confirm_limit", lambda d: 'checked' in (box.get_attribute('class') or ''), 2)
+        flow.pause(2)
+        commit = driver.find_element(By.NAME, 'commit')
+        click(driver, commit)
+        flow.wait("continue", EC.staleness_of(commit), 10)
+    logger.info(f"Appointment page ready in {flow.summary()}")
+
+def __read_appointment_page(driver) -> str:
+    # One WebDriver round trip for the whole page instead of one per field
+    return driver.page_source
+
+async def __read_appointment_page_http(client: httpx.AsyncClient, appointment_url: str, account: str,
+                                      priority: int = PRIORITY_POLL) -> str:
+    r = await portal_resilience.request(client, "GET", appointment_url, account, priority,
+                                        headers={"Accept": portal_http.HTML_ACCEPT}, timeout=15)
+    if portal_http.is_sign_in_url(str(r.url)):
+        raise PortalSessionExpiredException(appointment_url, r.status_code)
+    return r.text
+
+async def __read_booking_form_http(client: httpx.AsyncClient, appointment_url: str, account: str,
+                                  priority: int = PRIORITY_POLL) -> portal_http.BookingForm:
+    return portal_http.parse_booking_form(await __read_appointment_page_http(client, appointment_url, account, priority))
+
+async def __capture_booking_form(driver, client: httpx.AsyncClient, base_url: str, appointment_url: str,
+                                 account: str, re_schedule_id: int) -> Optional[portal_http.BookingForm]:
+    """
+    Capture the booking form ahead of time, refreshing the facility catalogue from the same page
 
-    # CSRF
-    try:
-        csrf_meta = driver.find_element(By.CSS_SELECTOR, 'meta[name="csrf-token"]').get_attribute('content')
-    except Exception as ex:
-        logger.warning(f"Could not find CSRF token: {ex}")
-        csrf_meta = data.get("authenticity_token")
-
-    session = requests.Session()
-    __copy_cookies(driver, session)
-    headers = {
-        "Accept": "application/json, text/javascript, */*; q=0.01",
-        "User-Agent": driver.execute_script("return navigator.userAgent;"),
-        "Referer": appointment_url,
-        "X-Requested-With": "XMLHttpRequest",
-        "X-CSRF-Token": csrf_meta,
-    }
-    session.headers.update(headers)
+    Args:
+        driver: Browser showing the appointment page, None to read the page over HTTP
+        client: Monitor HTTP client
+        base_url: Portal base URL, the catalogue key
+        appointment_url: Appointment page
+        account: Applicant email, the request governor's account
+        re_schedule_id: Re-schedule ID
+
+    Returns:
+        The form, or None if it could not be read; booking then reads it itself
+    """
     try:
-        r = session.post(appointment_url, data=data, allow_redirects=True)
+        if driver:
+            html = await asyncio.to_thread(__read_appointment_page, driver)
+        else:
+            html = await __read_appointment_page_http(client, appointment_url, account)
+        facility_catalogue.update(base_url, parse_facilities(html))
+        return portal_http.parse_booking_form(html)
+    except Exception as e:
+        logger.warning(f"Could not capture booking form for re-schedule {re_schedule_id}: {e}")
+        return None
 
-        if r.status_code == 200:
-            log_re_schedule(re_schedule_id, "Reschedule performed successfully", LogState.INFO)
-            return True
-        
-        log_re_schedule(re_schedule_id, f"Could not perform reschedule[{r.status_code}]: {r.text}", LogState.ERROR)
-        logger.warning(f"Could not perform reschedule[{r.status_code}]: {r.text}")
-        return False
-    except Exception as ex:
-        log_re_schedule(re_schedule_id, f"Could not perform reschedule: {ex}", LogState.ERROR)
-        logger.warning(f"Could not perform reschedule: something went wrong")
-        return False
+def __record_booking_attempt(stats: MonitorStats, re_schedule_id: int, prepare_seconds: float,
+                             post_seconds: Optional[float], status_code: Optional[int]):
+    stats.record_booking(prepare_seconds, post_seconds, status_code)
+    step_stats.record("booking", "prepare", prepare_seconds)
+    if post_seconds is not None:
+        step_stats.record("booking", "post", post_seconds)
+    post = f"{post_seconds:.3f}s" if post_seconds is not None else "failed"
+    logger.info(f"Booking attempt for re-schedule {re_schedule_id}: prepared in {prepare_seconds * 1000:.1f}ms, POST {post} (status: {status_code})")
+
+async def __perform_reschedule(client: httpx.AsyncClient, appointment_url: str, account: str, booking_form: Optional[portal_http.BookingForm],
+                               facility_id: str, date_str: str, time_slot: str, re_schedule_id: int, stats: MonitorStats,
+                               chosen_at: float) -> bool:
+    """
+    Book a time slot with the captured booking form
+
+    The form is read from the appointment page only when none was captured;
+    if the portal refuses its token, the form is read again and posted once more.
+
+    Args:
+        client: Monitor HTTP client
+        appointment_url: Appointment page, the form's action
+        account: Applicant email; bookings go out ahead of every other request of the governor
+        booking_form: Form captured ahead of time, None to read it now
+        facility_id: Facility of the slot
+        date_str: Date to book
+        time_slot: Time to book
+        re_schedule_id: Re-schedule ID
+        stats: Monitor stats, receive the timing of every attempt
+        chosen_at: perf_counter() when the slot was chosen
+
+    Returns:
+        True if the portal accepted the booking
+
+    Raises:
+        PortalSessionExpiredException: If the portal answered as if the session had ended
+    """
+    for attempt in (1, 2):
+        sent_at = None
+        try:
+            if booking_form is None:
+                booking_form = await __read_booking_form_http(client, appointment_url, account, PRIORITY_BOOKING)
+            data = booking_form.payload(facility_id, date_str, time_slot)
+
+            sent_at = time.perf_counter()
+            r = await portal_resilience.request(client, "POST", appointment_url, account, PRIORITY_BOOKING, data=data,
+                                                headers={"X-CSRF-Token": booking_form.csrf_token}, timeout=BOOKING_TIMEOUT_SECONDS)
+        except Exception as ex:
+            # Failed while reading the form or sending the POST - either way nothing was booked
+            __record_booking_attempt(stats, re_schedule_id, (sent_at or time.perf_counter()) - chosen_at, None, None)
+            await __log_async(re_schedule_id, f"Could not perform reschedule: {ex}", LogState.ERROR)
+            if isinstance(ex, PortalSessionExpiredException):
+                raise
+            logger.warning(f"Could not perform reschedule: {ex}")
+            return False
+        __record_booking_attempt(stats, re_schedule_id, sent_at - chosen_at, time.perf_counter() - sent_at, r.status_code)
+
+        if attempt == 1 and portal_http.is_csrf_rejection(r):
+            logger.warning(f"Booking form token rejected for re-schedule {re_schedule_id}, reading the form again")
+            booking_form = None
+            chosen_at = time.perf_counter()
+            continue
+        break
+
+    # A redirect to the sign-in page also ends in a 200, but nothing was booked
+    if r.status_code == 401 or portal_http.is_sign_in_url(str(r.url)):
+        raise PortalSessionExpiredException(appointment_url, r.status_code)
+
+    if r.status_code == 200:
+        await __log_async(re_schedule_id, "Reschedule performed successfully", LogState.INFO)
+        return True
+
+    await __log_async(re_schedule_id, f"Could not perform reschedule[{r.status_code}]: {r.text}", LogState.ERROR)
+    logger.warning(f"Could not perform reschedule[{r.status_code}]: {r.text}")
+    return False
 
 def __do_login(driver, login_url, email: str, password: str):
     logger.info(f"Testing credentials for {email}")
+    flow = BrowserFlow("login", driver)
 
-    driver.get(login_url)
+    # The sign-in page load is the browser login's only request the governor can pace
+    request_governor.acquire_sync(login_url, email, PRIORITY_LOGIN)
+    with flow.step("open", 10):
+        driver.get(login_url)
     # Wait for a login form
-    Wait(driver, 5).until(EC.presence_of_element_located((By.ID, 'user_email')))
+    user = flow.wait("form_ready", EC.element_to_be_clickable((By.ID, 'user_email')), 5)
 
     # Enter email
-    user = driver.find_element(By.ID, 'user_email')
-    user.clear()
-    user.send_keys(email)
-    time.sleep(1)
+    with flow.step("fill_email", 2):
+        user.clear()
+        user.send_keys(email)
+    flow.pause(1)
 
     # Enter password
-    pw = driver.find_element(By.ID, 'user_password')
-    pw.clear()
-    pw.send_keys(password)
-    time.sleep(1)
+    with flow.step("fill_password", 2):
+        pw = driver.find_element(By.ID, 'user_password')
+        pw.clear()
+        pw.send_keys(password)
+    flow.pause(1)
 
     # Click privacy checkbox
     try:
         box = driver.find_element(By.CLASS_NAME, 'icheckbox')
-        box.click()
-        time.sleep(1)
+        click(driver, box)
+        flow.wait("accept_policy", lambda d: 'checked' in (box.get_attribute('class') or ''), 2)
+        flow.pause(1)
     except Exception as e:
         logger.warning(f"Could not find privacy checkbox: {e}")
 
     # Submit login
     logger.info(f"Submitting login for credentials. email: {email}")
     btn = driver.find_element(By.NAME, 'commit')
-    btn.click()
-    time.sleep(3)
+    click(driver, btn)
+    flow.pause(3)
 
     # Wait for login success indicator
-    Wait(driver, 7).until(
-        EC.presence_of_element_located((By.CSS_SELECTOR, ".button.primary.small"))
+    flow.wait("signed_in", EC.presence_of_element_located((By.CSS_SELECTOR, ".button.primary.small")), 10)
+    logger.info(f"Login for {email} took {flow.summary()}")
+
+def __login_rejected(driver) -> bool:
+    """Whether the sign-in page the browser shows says the credentials are wrong"""
+    try:
+        page = driver.page_source
+    except Exception:
+        return False
+    return any(marker in page for marker in portal_http.INVALID_CREDENTIALS_MARKERS)
+
+def __copy_cookies(driver, client: httpx.AsyncClient):
+    portal_http.load_cookies(client.cookies, driver.get_cookies())
+
+async def __restore_session(client: httpx.AsyncClient, applicant_id: int, email: str, appointment_url: str, re_schedule_id: int) -> bool:
+    """
+    Load the applicant's cached portal session into the client if it is still valid.
+
+    Args:
+        client: HTTP client to load the cookies into
+        applicant_id: ID of the applicant
+        email: Applicant email, the request governor's account
+        appointment_url: Appointment page, used to check the session
+        re_schedule_id: ID of the re-schedule process
+
+    Returns:
+        True if the client now holds an authenticated session
+    """
+    cookies = await asyncio.to_thread(applicant_session_services.get_applicant_session, applicant_id)
+    if not cookies:
+        return False
+
+    client.cookies.clear()
+    portal_http.load_cookies(client.cookies, cookies)
+    try:
+        r = await portal_resilience.request(client, "GET", appointment_url, email, PRIORITY_LOGIN,
+                                            headers={"Accept": portal_http.HTML_ACCEPT}, timeout=15)
+        if portal_http.is_portal_error(r):
+            # An overloaded portal says nothing about the session, keep it cached for the next monitor
+            logger.warning(f"Could not check cached session for re-schedule {re_schedule_id}: portal answered {r.status_code}")
+            client.cookies.clear()
+            return False
+        # Only the appointment page itself proves the session; 401/403 and other pages do not
+        if (r.is_success and not portal_http.is_session_expired(r, expect_json=False)
+                and urlsplit(str(r.url)).path.rstrip("/") == urlsplit(appointment_url).path.rstrip("/")):
+            logger.info(f"Re-schedule {re_schedule_id}: reusing cached session of applicant {applicant_id}")
+            return True
+    except (httpx.HTTPError, PortalUnavailableException) as e:
+        logger.warning(f"Could not check cached session for re-schedule {re_schedule_id}: {e}")
+        client.cookies.clear()
+        return False
+
+    # The portal ended the cached session before its recorded expiry
+    logger.info(f"Cached session of applicant {applicant_id} has expired")
+    client.cookies.clear()
+    await asyncio.to_thread(applicant_session_services.delete_applicant_session, applicant_id)
+    return False
+
+async def __save_session(applicant_id: int, client: httpx.AsyncClient):
+    await asyncio.to_thread(
+        applicant_session_services.save_applicant_session,
+        applicant_id,
+        portal_http.export_cookies(client.cookies)
     )
 
-def __copy_cookies(driver, session):
-    for c in driver.get_cookies():
-        session.cookies.set(c['name'], c['value'], domain=c.get('domain'), path=c.get('path', '/'))
+def __build_http_client(driver, appointment_url: str) -> httpx.AsyncClient:
+    """
+    Build the async HTTP client a monitor uses for portal data calls.
 
-def __get_dates(driver, appointment_url: str, date_url: str, re_schedule_id: int):
-    session = requests.Session()
-    __copy_cookies(driver, session)
+    Args:
+        driver: Logged in Selenium WebDriver instance
+        appointment_url: Appointment page, sent as Referer
 
-    headers = {
-        "Accept": "application/json, text/javascript, */*; q=0.01",
-        "X-Requested-With": "XMLHttpRequest",
-        "Referer": appointment_url,
-        "User-Agent": driver.execute_script("return navigator.userAgent;")
-    }
+    Returns:
+        httpx.AsyncClient with the browser cookies and user agent
+    """
+    client = portal_http.new_client(appointment_url, driver.execute_script("return navigator.userAgent;"))
+    __copy_cookies(driver, client)
+    return client
+
+async def __http_login(client: httpx.AsyncClient, login_url: str, appointment_url: str,
+                       email: str, password: str, re_schedule_id: int) -> bool:
+    """
+    Log the monitor in over HTTP and open the appointment page.
+
+    Args:
+        client: HTTP client that keeps the session cookies
+        login_url: URL for login page
+        appointment_url: Appointment page of the applicant
+        email: User email
+        password: User password
+        re_schedule_id: ID of the re-schedule process
+
+    Returns:
+        True if the client holds an authenticated session, False to fall back to Selenium
+
+    Raises:
+        PortalLoginException: If the portal rejected the credentials
+    """
+    try:
+        await portal_http.http_login(client, login_url, email, password)
+        r = await portal_resilience.request(client, "GET", appointment_url, email, PRIORITY_LOGIN,
+                                            headers={"Accept": portal_http.HTML_ACCEPT}, timeout=15)
+        if portal_http.is_sign_in_url(str(r.url)):
+            raise PortalLoginException(email, "Appointment page redirected to sign in")
+    except PortalLoginException as e:
+        if e.invalid_credentials:
+            raise
+        logger.warning(f"{e.message} - falling back to Selenium")
+        await __log_async(re_schedule_id, f"HTTP login failed ({e.reason}), using browser login", LogState.WARNING)
+        return False
+    except httpx.HTTPError as e:
+        logger.warning(f"HTTP login failed for re-schedule {re_schedule_id}: {e} - falling back to Selenium")
+        await __log_async(re_schedule_id, "HTTP login failed, using browser login", LogState.WARNING)
+        return False
+
+    await __log_async(re_schedule_id, "Login successful", LogState.INFO)
+    return True
+
+async def __http_relogin_with_retry(client: httpx.AsyncClient, login_url: str, appointment_url: str,
+                                    email: str, password: str, re_schedule_id: int, max_retries: int = 3) -> bool:
+    await __log_async(re_schedule_id, "Session expired during process. Attempting automatic re-login.", LogState.WARNING)
+    for attempt in range(1, max_retries + 1):
+        logger.info(f"HTTP re-login attempt {attempt}/{max_retries} for re-schedule {re_schedule_id}")
+        client.cookies.clear()
+        try:
+            if await __http_login(client, login_url, appointment_url, email, password, re_schedule_id):
+                await __log_async(re_schedule_id, f"Successfully re-logged in after {attempt} attempt(s)", LogState.INFO)
+                return True
+        except PortalLoginException as e:
+            logger.error(e.message)
+            return False
+
+        if attempt < max_retries:
+            await asyncio.sleep(2)
+
+    logger.error(f"All {max_retries} re-login attempts failed for re-schedule {re_schedule_id}")
+    await __log_async(re_schedule_id, f"Failed to re-login after {max_retries} attempts. Session cannot be recovered.", LogState.ERROR)
+    return False
 
+async def __get_dates(client: httpx.AsyncClient, date_url: str, account: str, re_schedule_id: int, tracker: DaysTracker):
+    """
+    Fetch the days list, conditionally when the portal sent validators before
+
+    Returns:
+        Tuple with the days list (the response text if it was not JSON, [] on
+        request errors) and the hash of the list, None when there is no list
+
+    Raises:
+        PortalSessionExpiredException: If the portal answered as if the session had ended
+    """
     try:
-        r = session.get(date_url, headers=headers, allow_redirects=True, timeout=15)
+        r = await portal_resilience.request(client, "GET", date_url, account, headers=tracker.request_headers(date_url), timeout=15)
         logger.info(f"Get dates - status: {r.status_code}")
         logger.debug(f"Get dates - response preview: {r.text[:200]}")
-    except requests.exceptions.Timeout:
+    except PortalUnavailableException as e:
+        # Every monitor of the host holds off together; the breaker logged why
+        logger.info(f"Skipping dates for re-schedule {re_schedule_id}: {e.message}")
+        return [], None
+    except httpx.TimeoutException:
         logger.warning(f"Timeout getting dates for re-schedule {re_schedule_id} - server took too long to respond")
-        log_re_schedule(re_schedule_id, "Timeout while fetching available dates - will retry", LogState.WARNING)
-        return []
-    except requests.exceptions.ConnectionError as e:
+        await __log_async(re_schedule_id, "Timeout while fetching available dates - will retry", LogState.WARNING)
+        return [], None
+    except httpx.NetworkError as e:
         logger.warning(f"Connection error getting dates for re-schedule {re_schedule_id}: {e}")
-        log_re_schedule(re_schedule_id, "Network connection error while fetching dates - will retry", LogState.WARNING)
-        return []
+        await __log_async(re_schedule_id, "Network connection error while fetching dates - will retry", LogState.WARNING)
+        return [], None
     except Exception as e:
         logger.error(f"Unexpected error getting dates for re-schedule {re_schedule_id}: {e}")
-        log_re_schedule(re_schedule_id, f"Error fetching dates: {str(e)}", LogState.ERROR)
-        return []
+        await __log_async(re_schedule_id, f"Error fetching dates: {str(e)}", LogState.ERROR)
+        return [], None
+
+    # An error page of an overloaded or failing portal is not a sign of an ended session
+    if portal_http.is_portal_error(r):
+        logger.warning(f"Portal error getting dates for re-schedule {re_schedule_id} (status: {r.status_code})")
+        await __log_async(re_schedule_id, f"Portal unavailable while fetching dates (status: {r.status_code}) - will retry", LogState.WARNING)
+        return [], None
+
+    if r.status_code != 304 and portal_http.is_session_expired(r):
+        raise PortalSessionExpiredException(date_url, r.status_code)
 
     try:
-        data = r.json()
-        return data
+        data = tracker.update(r)
+        return data, tracker.digest
     except ValueError:
-        log_re_schedule(re_schedule_id, f"The request did not return JSON. status: {r.status_code}", LogState.ERROR)
+        await __log_async(re_schedule_id, f"The request did not return JSON. status: {r.status_code}", LogState.ERROR)
         logger.warning("The request did not return JSON")
-        return r.text
-
-def __get_times(driver, appointment_url: str, time_url: str, re_schedule_id: int):
-    session = requests.Session()
-    __copy_cookies(driver, session)
-
-    headers = {
-        "Accept": "application/json, text/javascript, */*; q=0.01",
-        "X-Requested-With": "XMLHttpRequest",
-        "Referer": appointment_url,
-        "User-Agent": driver.execute_script("return navigator.userAgent;")
-    }
+        return r.text, None
 
+async def __get_times(client: httpx.AsyncClient, time_url: str, account: str, re_schedule_id: int):
     try:
-        r = session.get(time_url, headers=headers, allow_redirects=True, timeout=15)
+        r = await portal_resilience.request(client, "GET", time_url, account, timeout=15)
         logger.info(f"Get times - status: {r.status_code}")
         logger.debug(f"Get times - response preview: {r.text[:200]}")
-    except requests.exceptions.Timeout:
+    except PortalUnavailableException as e:
+        logger.info(f"Skipping times for re-schedule {re_schedule_id}: {e.message}")
+        return []
+    except httpx.TimeoutException:
         logger.warning(f"Timeout getting times for re-schedule {re_schedule_id} - server took too long to respond")
-        log_re_schedule(re_schedule_id, "Timeout while fetching available times - will retry", LogState.WARNING)
+        await __log_async(re_schedule_id, "Timeout while fetching available times - will retry", LogState.WARNING)
         return []
-    except requests.exceptions.ConnectionError as e:
+    except httpx.NetworkError as e:
         logger.warning(f"Connection error getting times for re-schedule {re_schedule_id}: {e}")
-        log_re_schedule(re_schedule_id, "Network connection error while fetching times - will retry", LogState.WARNING)
+        await __log_async(re_schedule_id, "Network connection error while fetching times - will retry", LogState.WARNING)
         return []
     except Exception as e:
         logger.error(f"Unexpected error getting times for re-schedule {re_schedule_id}: {e}")
-        log_re_schedule(re_schedule_id, f"Error fetching times: {str(e)}", LogState.ERROR)
+        await __log_async(re_schedule_id, f"Error fetching times: {str(e)}", LogState.ERROR)
         return []
 
+    if portal_http.is_portal_error(r):
+        logger.warning(f"Portal error getting times for re-schedule {re_schedule_id} (status: {r.status_code})")
+        await __log_async(re_schedule_id, f"Portal unavailable while fetching times (status: {r.status_code}) - will retry", LogState.WARNING)
+        return []
+
+    if portal_http.is_session_expired(r):
+        raise PortalSessionExpiredException(time_url, r.status_code)
+
     try:
         data = r.json()
         available_times = data.get("available_times") or []
         return available_times
     except ValueError:
-        log_re_schedule(re_schedule_id, f"The request did not return JSON. status: {r.status_code}", LogState.ERROR)
+        await __log_async(re_schedule_id, f"The request did not return JSON. status: {r.status_code}", LogState.ERROR)
         logger.warning("The request did not return JSON")
         return r.text
 
-def __get_available_date(dates: List[dict], applicant: dict) :
-    min_date: datetime = datetime.strptime(applicant.get('min_date'), '%Y-%m-%d')
-    max_date: datetime = datetime.strptime(applicant.get('max_date'), '%Y-%m-%d')
+async def __get_facility_dates(client: httpx.AsyncClient, days_urls: Dict[str, str], account: str, re_schedule_id: int,
+                               trackers: Dict[str, DaysTracker]) -> List[Tuple[str, Any, Optional[str]]]:
+    """
+    Fetch the days lists of several facilities concurrently over the monitor's client
 
-    if not min_date or not max_date:
-        log_re_schedule(
-            re_schedule_id,
-            "Applicant missing date boundaries.",
-            LogState.ERROR
-        )
+    Args:
+        client: Monitor HTTP client
+        days_urls: days.json URL by facility id
+        account: Applicant email, the request governor's account
+        re_schedule_id: Re-schedule ID
+        trackers: Days tracker by facility id
 
-        logger.warning(f"Applicant {applicant.get('id')} missing date boundaries.")
-        return None
+    Returns:
+        (facility, days list, hash) for every facility, as returned by __get_dates
 
-    for d in dates:
-        current_date: datetime = datetime.strptime(d.get('date'), '%Y-%m-%d')
+    Raises:
+        PortalSessionExpiredException: If the portal answered any request as if the session had ended
+    """
+    results = await asyncio.gather(
+        *(__get_dates(client, days_url, account, re_schedule_id, trackers[facility]) for facility, days_url in days_urls.items()),
+        return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return [(facility, dates, digest) for facility, (dates, digest) in zip(days_urls, results)]
+
+async def __get_candidate_times(client: httpx.AsyncClient, times_url_tmpls: Dict[str, str], candidates: List[Tuple[str, str]],
+                                account: str, re_schedule_id: int) -> List[Tuple[Tuple[str, str], Any]]:
+    """
+    Fetch the times of several dates concurrently over the monitor's client
 
-        if current_date >= min_date and current_date <= max_date:
-            logger.info(f"Match found: {current_date}")
-            return current_date.strftime('%Y-%m-%d')
-    return None
+    Args:
+        client: Monitor HTTP client
+        times_url_tmpls: times.json URL with a %s for the date, by facility id
+        candidates: (date, facility) pairs in order of preference
+        account: Applicant email, the request governor's account
+        re_schedule_id: Re-schedule ID
+
+    Returns:
+        ((date, facility), times) pairs in the order of ``candidates``, times as returned by __get_times
 
+    Raises:
+        PortalSessionExpiredException: If the portal answered any request as if the session had ended
+    """
+    results = await asyncio.gather(
+        *(__get_times(client, times_url_tmpls[facility] % day, account, re_schedule_id) for day, facility in candidates),
+        return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return list(zip(candidates, results))
 
 def __safe_quit_driver(driver):
     """
@@ -505,6 +1073,7 @@ def __safe_quit_driver(driver):
         try:
             logger.info("Attempting to quit Selenium driver")
             driver.quit()
+            grid_admission.released()
             logger.info("Driver quit successfully")
         except Exception as e:
             logger.warning(f"Error quitting driver (may already be closed): {e}")
@@ -574,11 +1143,11 @@ def __attempt_relogin_with_retry(driver, login_url: str, email: str, password: s
                 LogState.INFO
             )
             
-            # Attempt login
+            # Attempt login - returns once the signed in page is showing
             __do_login(driver, login_url, email, password)
             
             # Verify login was successful
-            time.sleep(2)
+            BrowserFlow.pause(2)
             if not __is_session_expired(driver):
                 logger.info(f"Re-login successful on attempt {attempt}/{max_retries}")
                 log_re_schedule(
@@ -613,6 +1182,109 @@ def __attempt_relogin_with_retry(driver, login_url: str, email: str, password: s
     return False
 
 
+async def __ensure_session(driver, client: httpx.AsyncClient, login_url: str, appointment_url: str,
+                           email: str, password: str, applicant_id: int, re_schedule_id: int, suspect: bool = False):
+    """
+    Re-login when the session expired and refresh the HTTP client cookies.
+
+    Nothing is checked unless the last data call hinted at an expired session,
+    so a healthy poll costs no extra portal or WebDriver round trips.
+
+    Args:
+        driver: Selenium WebDriver instance, None for monitors logged in over HTTP
+        client: HTTP client used for portal data calls
+        login_url: URL for login page
+        appointment_url: Appointment page to return to after re-login
+        email: User email
+        password: User password
+        applicant_id: ID of the applicant, whose cached session is refreshed
+        re_schedule_id: ID of the re-schedule process
+        suspect: Whether the last data call hinted at an expired session
+
+    Returns:
+        True if a re-login happened and the client cookies were refreshed
+
+    Raises:
+        Exception: If the session could not be recovered
+    """
+    if not suspect:
+        return False
+
+    if not driver:
+        logger.warning(f"Session may have expired for re-schedule {re_schedule_id}")
+        # Another monitor of the applicant may already have cached a fresh session
+        if await __restore_session(client, applicant_id, email, appointment_url, re_schedule_id):
+            return True
+        if not await __http_relogin_with_retry(client, login_url, appointment_url, email, password, re_schedule_id):
+            raise Exception("Session expired and could not be recovered after 3 attempts")
+        await __save_session(applicant_id, client)
+        return True
+
+    # The browser still shows the page it loaded at login; reload it to see the portal's current answer
+    await asyncio.to_thread(__open_appointment_page, driver, appointment_url)
+    if not await asyncio.to_thread(__is_session_expired, driver):
+        # The browser session is alive, the client only holds outdated cookies
+        await asyncio.to_thread(__copy_cookies, driver, client)
+        return True
+
+    logger.warning(f"Session expired for re-schedule {re_schedule_id}")
+    await asyncio.to_thread(applicant_session_services.delete_applicant_session, applicant_id)
+    if not await asyncio.to_thread(__attempt_relogin_with_retry, driver, login_url, email, password, re_schedule_id):
+        # Failed to recover session - terminate process
+        raise Exception("Session expired and could not be recovered after 3 attempts")
+
+    # After successful re-login, navigate back to appointment page
+    logger.info(f"Navigating back to appointment page after re-login")
+    await asyncio.to_thread(__open_appointment_page, driver, appointment_url)
+    await asyncio.to_thread(__copy_cookies, driver, client)
+    await __save_session(applicant_id, client)
+    return True
+
+
+async def __wait_for_start(start_value: Optional[str], warm_seconds: float, token: CancellationToken, prewarmed: bool):
+    """
+    Wait with an authenticated session until the re-schedule start time.
+
+    For monitors started by the prewarm job, records how long the warm-up
+    took and how much of the configured lead time was left, so
+    PREWARM_LEAD_SECONDS can be tuned.
+
+    Args:
+        start_value: start_datetime of the re-schedule
+        warm_seconds: Seconds spent opening and authenticating the session
+        token: Cancellation token of the monitor
+        prewarmed: Started by the prewarm job
+    """
+    if not start_value:
+        return
+
+    re_schedule_id = token.re_schedule_id
+    start_datetime = datetime.strptime(str(start_value).replace("T", " ")[:19], "%Y-%m-%d %H:%M:%S")
+    slack = (start_datetime - datetime.now()).total_seconds()
+
+    if slack >= 0:
+        message = f"Session pre-warmed in {warm_seconds:.1f}s, polling starts in {slack:.1f}s"
+        state = LogState.INFO
+    elif not prewarmed:
+        # Manual starts, takeovers and restarts begin late by design, their lag says nothing about the lead time
+        message = f"Session ready in {warm_seconds:.1f}s, polling starts now"
+        state = LogState.INFO
+    else:
+        message = (f"Session warm-up took {warm_seconds:.1f}s and finished {-slack:.1f}s after start time. "
+                   f"Consider increasing PREWARM_LEAD_SECONDS")
+        state = LogState.WARNING
+
+    logger.info(f"Re-schedule {re_schedule_id}: {message}")
+    await __log_async(re_schedule_id, message, state)
+
+    if slack > 0:
+        await token.guard(asyncio.sleep(slack))
+
+
+async def __log_async(re_schedule_id: int, content: str, state: LogState):
+    await asyncio.to_thread(log_re_schedule, re_schedule_id, content, state)
+
+
 def log_re_schedule(re_schedule_id: int, content: str, state: LogState):
 
     try:
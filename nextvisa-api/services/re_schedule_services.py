@@ -3,6 +3,7 @@ from lib.scheduler import scheduler
 from models.re_schedule import ReScheduleCreate, ReScheduleUpdate
 from lib.exceptions import DatabaseException
 import logging
+from datetime import datetime, timedelta, timezone
 from typing import List, Optional
 from lib.scheduler import scheduler
 
@@ -244,6 +245,21 @@ def update_re_schedule(re_schedule_id: int, re_schedule_data: ReScheduleUpdate)
         raise DatabaseException("update_re_schedule", str(e))
 
 
+def stop_re_schedule(re_schedule_id: int, reason: str):
+    """
+    Stop the pending job and any running monitor of a re-schedule
+    
+    Args:
+        re_schedule_id: The ID of the re-schedule
+        reason: Why the re-schedule is being stopped
+    """
+    try:
+        scheduler.remove_job(re_schedule_id, reason=reason)
+        logger.info(f"Stopped re-schedule {re_schedule_id}: {reason}")
+    except Exception as e:
+        logger.warning(f"Could not stop re-schedule {re_schedule_id}: {e}")
+
+
 def delete_re_schedule(re_schedule_id: int) -> bool:
     """
     Delete a re-schedule record
@@ -264,13 +280,9 @@ def delete_re_schedule(re_schedule_id: int) -> bool:
     # First check if re-schedule exists
     re_schedule = get_re_schedule_by_id(re_schedule_id)
     
-    # Remove job from scheduler if it's scheduled or processing
+    # Remove job from scheduler and stop the monitor if it's scheduled or processing
     if re_schedule.get("status") in ["SCHEDULED", "PROCESSING"]:
-        try:
-            scheduler.remove_job(re_schedule_id)
-            logger.info(f"Removed job for re-schedule {re_schedule_id} from scheduler")
-        except Exception as e:
-            logger.warning(f"Could not remove job from scheduler for re-schedule {re_schedule_id}: {e}")
+        stop_re_schedule(re_schedule_id, "Re-schedule deleted")
 
     try:
         db = _get_db()
@@ -282,3 +294,137 @@ def delete_re_schedule(re_schedule_id: int) -> bool:
     except Exception as e:
         logger.error(f"Failed to delete re-schedule {re_schedule_id}: {str(e)}", exc_info=True)
         raise DatabaseException("delete_re_schedule", str(e))
+
+
+def _lease_timestamp(moment: datetime) -> str:
+    """Format a UTC moment for lease columns and PostgREST filters"""
+    return moment.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def claim_re_schedule(re_schedule_id: int, node_id: str, lease_seconds: int) -> bool:
+    """
+    Claim (or renew) the lease on a re-schedule for a scheduler node
+
+    The update only matches a row that is unclaimed, already owned by the node
+    or whose lease expired, so two nodes can never both win the same row.
+    
+    Args:
+        re_schedule_id: The ID of the re-schedule to claim
+        node_id: Identifier of the claiming scheduler node
+        lease_seconds: Lease duration in seconds
+        
+    Returns:
+        True if the node now owns the re-schedule
+        
+    Raises:
+        DatabaseException: If database operation fails
+    """
+    now = datetime.now(timezone.utc)
+    try:
+        db = _get_db()
+        response = (
+            db.table(TABLE_NAME)
+            .update({
+                "claimed_by": node_id,
+                "lease_expires_at": _lease_timestamp(now + timedelta(seconds=lease_seconds))
+            })
+            .eq("id", re_schedule_id)
+            .or_(f'claimed_by.is.null,claimed_by.eq."{node_id}",lease_expires_at.lt."{_lease_timestamp(now)}"')
+            .execute()
+        )
+        return bool(response.data)
+    except Exception as e:
+        logger.error(f"Failed to claim re-schedule {re_schedule_id}: {str(e)}", exc_info=True)
+        raise DatabaseException("claim_re_schedule", str(e))
+
+
+def renew_leases(re_schedule_ids: List[int], node_id: str, lease_seconds: int) -> List[dict]:
+    """
+    Extend the leases a scheduler node still holds
+    
+    Args:
+        re_schedule_ids: IDs the node believes it owns
+        node_id: Identifier of the scheduler node
+        lease_seconds: Lease duration in seconds
+        
+    Returns:
+        Renewed rows (id and status); missing IDs were deleted or taken over by another node
+        
+    Raises:
+        DatabaseException: If database operation fails
+    """
+    if not re_schedule_ids:
+        return []
+
+    lease_expires_at = _lease_timestamp(datetime.now(timezone.utc) + timedelta(seconds=lease_seconds))
+    try:
+        db = _get_db()
+        response = (
+            db.table(TABLE_NAME)
+            .update({"lease_expires_at": lease_expires_at})
+            .in_("id", re_schedule_ids)
+            .eq("claimed_by", node_id)
+            .execute()
+        )
+        return [{"id": row.get("id"), "status": row.get("status")} for row in response.data]
+    except Exception as e:
+        logger.error(f"Failed to renew leases for node {node_id}: {str(e)}", exc_info=True)
+        raise DatabaseException("renew_leases", str(e))
+
+
+def release_re_schedule(re_schedule_id: int, node_id: str) -> bool:
+    """
+    Give up the lease on a re-schedule owned by a scheduler node
+    
+    Args:
+        re_schedule_id: The ID of the re-schedule to release
+        node_id: Identifier of the scheduler node
+        
+    Returns:
+        True if the lease was released
+        
+    Raises:
+        DatabaseException: If database operation fails
+    """
+    try:
+        db = _get_db()
+        response = (
+            db.table(TABLE_NAME)
+            .update({"claimed_by": None, "lease_expires_at": None})
+            .eq("id", re_schedule_id)
+            .eq("claimed_by", node_id)
+            .execute()
+        )
+        return bool(response.data)
+    except Exception as e:
+        logger.error(f"Failed to release re-schedule {re_schedule_id}: {str(e)}", exc_info=True)
+        raise DatabaseException("release_re_schedule", str(e))
+
+
+def get_orphaned_re_schedules(statuses: List[str], unclaimed: bool = True) -> List[dict]:
+    """
+    Fetch re-schedules in the given statuses that no live node owns
+    
+    Args:
+        statuses: Status values to consider
+        unclaimed: Include rows that were never claimed, False for expired leases only
+        
+    Returns:
+        List of unclaimed or lease-expired re-schedule dictionaries
+        
+    Raises:
+        DatabaseException: If database operation fails
+    """
+    now = _lease_timestamp(datetime.now(timezone.utc))
+    try:
+        db = _get_db()
+        query = db.table(TABLE_NAME).select("*").in_("status", statuses)
+        if unclaimed:
+            query = query.or_(f'claimed_by.is.null,lease_expires_at.lt."{now}"')
+        else:
+            query = query.lt("lease_expires_at", now)
+        response = query.order("start_datetime").execute()
+        return response.data
+    except Exception as e:
+        logger.error(f"Failed to fetch orphaned re-schedules: {str(e)}", exc_info=True)
+        raise DatabaseException("fetch_orphaned_re_schedules", str(e))
@@ -7,6 +7,7 @@ import {
   faEnvelope,
   faCalendar,
   faLock,
+  faBuilding,
 } from "@fortawesome/free-solid-svg-icons";
 import { useForm } from "@tanstack/react-form";
 import { useCreateApplicant, useUpdateApplicant } from "../hooks/useApplicants";
@@ -55,6 +56,7 @@ const ApplicantModal: React.FC<ApplicantModalProps> = ({
       schedule_date: applicant?.schedule_date || "",
       min_date: applicant?.min_date || "",
       max_date: applicant?.max_date || "",
+      facilities: applicant?.facilities || "",
       schedule: applicant?.schedule || "",
     },
     onSubmit: async ({ value }) => {
@@ -106,6 +108,7 @@ const ApplicantModal: React.FC<ApplicantModalProps> = ({
       form.setFieldValue("schedule_date", applicant?.schedule_date || "");
       form.setFieldValue("min_date", applicant?.min_date || "");
       form.setFieldValue("max_date", applicant?.max_date || "");
+      form.setFieldValue("facilities", applicant?.facilities || "");
       form.setFieldValue("schedule", applicant?.schedule || "");
     }
   }, [applicant, isOpen, form]);
@@ -448,6 +451,43 @@ const ApplicantModal: React.FC<ApplicantModalProps> = ({
             />
           </div>
 
+          <form.Field
+            name="facilities"
+            validators={{
+              onBlur: ({ value }) => {
+                if (value && !/^\s*\d+(\s*,\s*\d+)*\s*$/.test(value)) {
+                  return "Facilities must be facility ids separated by commas";
+                }
+              },
+            }}
+            children={(field) => (
+              <div className="form-group">
+                <label htmlFor={field.name}>
+                  <FontAwesomeIcon icon={faBuilding} />
+                  Facilities
+                </label>
+                <input
+                  type="text"
+                  id={field.name}
+                  name={field.name}
+                  value={field.state.value}
+                  onBlur={field.handleBlur}
+                  onChange={(e) => field.handleChange(e.target.value)}
+                  className={
+                    field.state.meta.errors.length > 0 ? "error" : ""
+                  }
+                  disabled={isPending}
+                  placeholder="143 (default), most preferred first, e.g. 143, 144"
+                />
+                {field.state.meta.errors.length > 0 && (
+                  <span className="error-message">
+                    {field.state.meta.errors[0]}
+                  </span>
+                )}
+              </div>
+            )}
+          />
+
           {isError && error && (
             <div className="form-error">
               <span>
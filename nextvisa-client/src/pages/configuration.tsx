@@ -144,6 +144,7 @@ const ConfigurationForm: React.FC<ConfigurationFormProps> = ({ config }) => {
                     type="text"
                     id={field.name}
                     name={field.name}
+                    placeholder="http://grid-a:4444|2, http://grid-b:4444"
                     value={field.state.value}
                     onBlur={field.handleBlur}
                     onChange={(e) => field.handleChange(e.target.value)}
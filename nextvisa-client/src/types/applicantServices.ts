@@ -8,6 +8,7 @@ export interface Applicant {
     schedule_date?: string;
     min_date?: string;
     max_date?: string;
+    facilities?: string;
     schedule?: string;
     re_schedule_status?: ScheduleStatus;
     created_at: string;
@@ -22,6 +23,7 @@ export interface ApplicantCreate {
     schedule_date?: string;
     min_date?: string;
     max_date?: string;
+    facilities?: string;
     schedule?: string;
 }
 
@@ -33,5 +35,6 @@ export interface ApplicantUpdate {
     schedule_date?: string;
     min_date?: string;
     max_date?: string;
+    facilities?: string;
     schedule?: string;
 }
\ No newline at end of file